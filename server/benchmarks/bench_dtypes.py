@@ -0,0 +1,102 @@
+"""Benchmark memory and load time with and without dtype optimization.
+
+Loads the same CSV with ``DatasetLoader(optimize=False)``, the default
+category/downcast conversion and ``backend="pyarrow"`` (Arrow strings for
+high-cardinality text columns), and reports the in-memory size of the cached
+DataFrame, the warm (sidecar) load time and the time of a categorical
+``value_counts``.
+
+Usage:
+    cd server
+    poetry run python benchmarks/bench_dtypes.py --rows 1000000 --cols 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.dataset_cache import DatasetCache, frame_nbytes  # noqa: E402
+from modules.loader import DatasetLoader  # noqa: E402
+from modules.sidecar import SidecarStore  # noqa: E402
+
+
+def make_csv(path: Path, rows: int, cols: int) -> None:
+    rng = np.random.default_rng(0)
+    data = {"id": np.arange(rows)}
+    for i in range(1, cols):
+        if i % 4 == 1:
+            data[f"cat_{i}"] = rng.choice(["red", "green", "blue", "yellow"], rows)
+        elif i % 4 == 2:
+            data[f"int_{i}"] = rng.integers(0, 100, size=rows)
+        elif i % 8 == 3:
+            data[f"text_{i}"] = [f"user-{v}" for v in rng.integers(0, rows, rows)]
+        else:
+            data[f"num_{i}"] = rng.normal(size=rows)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40}{elapsed * 1000:>10.1f} ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--cols", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = Path(tmp) / "data"
+        data_root.mkdir()
+        csv_path = data_root / "bench.csv"
+        make_csv(csv_path, args.rows, args.cols)
+        size_mb = csv_path.stat().st_size / 1e6
+        print(f"{args.rows} rows x {args.cols} cols, {size_mb:.1f} MB CSV")
+
+        sidecars = SidecarStore(data_root, Path(tmp) / ".mcp_cache")
+        sidecars.write(
+            DatasetLoader(data_root, sidecars=sidecars).fingerprint(csv_path),
+            pd.read_csv(csv_path),
+        )
+
+        baseline = None
+        for label, optimize, backend in (
+            ("object / int64", False, "numpy"),
+            ("category + downcast", True, "numpy"),
+            ("category + downcast + pyarrow", True, "pyarrow"),
+        ):
+            print(f"-- {label}")
+            # プロセス内キャッシュを空にしてサイドカーからの読み込みを測る
+            loader = DatasetLoader(
+                data_root,
+                cache=DatasetCache(max_bytes=1 << 40),
+                sidecars=sidecars,
+                optimize=optimize,
+                backend=backend,
+            )
+            timed("warm load (sidecar)", lambda: loader.load(csv_path))
+            df = loader.load(csv_path)
+            timed("value_counts, cat_1", lambda: df["cat_1"].value_counts())
+            nbytes = frame_nbytes(df)
+            baseline = baseline or nbytes
+            print(
+                f"{'memory':<40}{nbytes / 1e6:>10.1f} MB "
+                f"({1 - nbytes / baseline:.0%} smaller)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark full vs column-projected loads on a wide dataset.
+
+Each measurement runs in a fresh process and reports the growth of peak RSS
+during the load.
+
+Usage:
+    cd server
+    poetry run python benchmarks/bench_projection.py --rows 100000 --cols 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SERVER_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SERVER_ROOT))
+
+from modules.dataset_cache import DatasetCache  # noqa: E402
+from modules.loader import DatasetLoader  # noqa: E402
+from modules.sidecar import SidecarStore  # noqa: E402
+
+
+def make_csv(path: Path, rows: int, cols: int) -> None:
+    rng = np.random.default_rng(0)
+    data = {f"num_{i}": rng.normal(size=rows) for i in range(cols)}
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def peak_rss_mb() -> float:
+    """プロセスのピークRSS（VmHWM）をMBで返す"""
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(
+    data_root: str, cache_dir: Optional[str], columns: Optional[List[str]]
+) -> Tuple[float, float]:
+    """新しいプロセス内で読み込み時間とピークRSS(MB)を測る"""
+    loader = DatasetLoader(Path(data_root), cache=DatasetCache(max_bytes=1 << 40))
+    # cache_dirなしの計測ではサイドカーを使わずCSVのusecolsで読ませる
+    loader.sidecars = (
+        SidecarStore(Path(data_root), Path(cache_dir)) if cache_dir else None
+    )
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    loader.load(Path(data_root) / "wide.csv", columns=columns)
+    elapsed = time.perf_counter() - start
+    return elapsed, peak_rss_mb() - baseline
+
+
+def run_isolated(*args) -> Tuple[float, float]:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure, *args).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = Path(tmp) / "data"
+        data_root.mkdir()
+        cache_dir = Path(tmp) / ".mcp_cache"
+        make_csv(data_root / "wide.csv", args.rows, args.cols)
+        one_column = ["num_0"]
+
+        # サイドカーを事前に作成しておく
+        run_isolated(str(data_root), str(cache_dir), None)
+
+        print(f"{args.rows} rows x {args.cols} cols")
+        print(f"{'variant':<36}{'time':>12}{'peak RSS +':>12}")
+        for label, cache_arg, columns in [
+            ("CSV, all columns", None, None),
+            ("CSV, usecols=1 column", None, one_column),
+            ("sidecar, all columns", str(cache_dir), None),
+            ("sidecar, 1 column projection", str(cache_dir), one_column),
+        ]:
+            elapsed, rss = run_isolated(str(data_root), cache_arg, columns)
+            print(f"{label:<36}{elapsed * 1000:>9.1f} ms{rss:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
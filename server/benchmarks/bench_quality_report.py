@@ -0,0 +1,144 @@
+"""Benchmark generate_quality_report against the former per-column loop.
+
+The dataset is loaded into the in-process cache first, so all timings
+exclude CSV parsing. Since the report is read from the stored column
+profile, the vectorized column pass is timed as ``profile_frame`` (which
+also computes describe, value counts and duplicate rows), and the report
+built from an already stored profile is reported separately.
+
+Usage:
+    cd server
+    poetry run python benchmarks/bench_quality_report.py --rows 20000 --cols 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.data_quality import DataQualityAnalyzer  # noqa: E402
+from modules.dataset_cache import DatasetCache  # noqa: E402
+from modules.loader import DatasetLoader  # noqa: E402
+from modules.profile_store import profile_frame  # noqa: E402
+
+
+def make_frame(rows: int, cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(cols):
+        if i % 5 == 4:
+            data[f"cat_{i}"] = rng.choice([f"v{j}" for j in range(50)], size=rows)
+        else:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.1] = np.nan
+            data[f"num_{i}"] = values
+    return pd.DataFrame(data)
+
+
+def legacy_column_quality(df: pd.DataFrame) -> Dict[str, Any]:
+    """以前の実装（カラムごとに isna/nunique/mode/value_counts を繰り返す）"""
+    total_rows = len(df)
+    missing_summary = {}
+    for column in df.columns:
+        missing_count = df[column].isna().sum()
+        missing_summary[column] = {
+            "missing_count": int(missing_count),
+            "missing_percentage": float(missing_count / total_rows * 100),
+        }
+
+    column_quality = {}
+    for column in df.columns:
+        series = df[column]
+        info = {
+            "data_type": str(series.dtype),
+            "non_null_count": int(series.notna().sum()),
+            "null_count": int(series.isna().sum()),
+            "unique_count": int(series.nunique()),
+        }
+        if pd.api.types.is_numeric_dtype(series):
+            all_missing = series.isna().all()
+            info.update(
+                {
+                    "mean": float(series.mean()) if not all_missing else None,
+                    "std": float(series.std()) if not all_missing else None,
+                    "min": float(series.min()) if not all_missing else None,
+                    "max": float(series.max()) if not all_missing else None,
+                    "zero_count": int((series == 0).sum()),
+                    "negative_count": int((series < 0).sum()),
+                }
+            )
+        elif pd.api.types.is_object_dtype(series):
+            info.update(
+                {
+                    "most_frequent": str(series.mode().iloc[0]),
+                    "most_frequent_count": int(series.value_counts().iloc[0]),
+                    "cardinality_ratio": float(series.nunique() / len(series)),
+                }
+            )
+        column_quality[column] = info
+    df.duplicated().sum()
+    df.memory_usage(deep=True).sum()
+    return {"missing": missing_summary, "columns": column_quality}
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--cols", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = Path(tmp) / "data"
+        data_root.mkdir()
+        csv_path = data_root / "wide.csv"
+        make_frame(args.rows, args.cols).to_csv(csv_path, index=False)
+
+        loader = DatasetLoader(
+            data_root,
+            cache=DatasetCache(max_bytes=1 << 40),
+            cache_dir=Path(tmp) / ".mcp_cache",
+        )
+        analyzer = DataQualityAnalyzer(data_root, loader=loader)
+        # 以前の実装はCSVでのdtypeのDataFrameを対象にしていた
+        df = loader.source_frame(csv_path, loader.load(csv_path))
+
+        legacy = legacy_column_quality(df)
+        report = analyzer.generate_quality_report("wide.csv")
+        assert legacy["columns"] == report.column_quality
+        assert legacy["missing"] == report.metrics.missing_data_summary
+
+        fingerprint = loader.fingerprint(csv_path)
+        memory_usage = loader.memory_usage(csv_path, loader.load(csv_path))
+        old = best_of(lambda: legacy_column_quality(df), args.repeat)
+        new = best_of(lambda: profile_frame(df, fingerprint, memory_usage), args.repeat)
+        stored = best_of(
+            lambda: analyzer.generate_quality_report("wide.csv"), args.repeat
+        )
+        print(f"{args.rows} rows x {args.cols} cols")
+        print(f"per-column loop      {old * 1000:>10.1f} ms")
+        print(f"vectorized profile   {new * 1000:>10.1f} ms")
+        print(f"speedup              {old / new:>10.1f}x")
+        print(f"report from profile  {stored * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark per-value vs column-wise conversion of tool outputs to JSON.
+
+Compares the former per-cell conversion (``where`` + ``to_dict`` and a Python
+loop over every value) with ``modules.serialization`` on a wide frame. Also
+reports the size and encoding time of the ``format="records"`` and
+``format="columnar"`` responses.
+
+Usage:
+    cd server
+    poetry run python benchmarks/bench_serialization.py --rows 5000 --cols 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.serialization import (  # noqa: E402
+    frame_columns,
+    frame_matrix,
+    frame_records,
+    frame_rows,
+)
+
+
+def make_frame(rows: int, cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(cols):
+        if i % 4 == 3:
+            data[f"cat_{i}"] = rng.choice(["a", "b", "c", None], size=rows)
+        else:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.05] = np.nan
+            data[f"num_{i}"] = values
+    return pd.DataFrame(data)
+
+
+# 以前の実装（1値ずつ変換）
+def legacy_serializable(values: Iterable[Any]) -> List[Optional[Any]]:
+    result: List[Optional[Any]] = []
+    for value in values:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            result.append(None)
+        elif isinstance(value, (np.floating, np.integer)):
+            result.append(value.item())
+        else:
+            result.append(value)
+    return result
+
+
+def legacy_matrix(corr: pd.DataFrame) -> dict:
+    return {
+        column: dict(zip(corr.index, legacy_serializable(corr[column].tolist())))
+        for column in corr.columns
+    }
+
+
+def legacy_records(df: pd.DataFrame) -> list:
+    return df.where(lambda d: ~d.isna(), other=None).to_dict(orient="records")
+
+
+def timed(label: str, fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40}{best * 1000:>10.1f} ms")
+    return best
+
+
+def compare_formats(
+    label: str, records: Callable[[], Any], columnar: Callable[[], Any], repeat: int
+) -> None:
+    """records / columnar の出力をJSONにするまでの時間とバイト数を比較"""
+    sizes = []
+    times = []
+    for name, build in (("records", records), ("columnar", columnar)):
+        sizes.append(len(json.dumps(build()).encode()))
+        times.append(timed(f"{label}, {name}", lambda: json.dumps(build()), repeat))
+    print(
+        f"{'':<4}{sizes[0] / 1e3:.1f} kB -> {sizes[1] / 1e3:.1f} kB "
+        f"({1 - sizes[1] / sizes[0]:.0%} smaller, {times[0] / times[1]:.1f}x faster)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000)
+    parser.add_argument("--cols", type=int, default=200)
+    parser.add_argument("--preview-rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.cols)
+    corr = df.select_dtypes(include=[np.number]).corr()
+    print(f"{args.rows} rows x {args.cols} cols, corr {corr.shape[0]}x{corr.shape[1]}")
+
+    before = timed("correlation matrix, per value", lambda: legacy_matrix(corr), 1)
+    after = timed("correlation matrix, column-wise", lambda: frame_matrix(corr), 1)
+    print(f"speedup: {before / after:.1f}x")
+
+    before = timed("records, where + to_dict", lambda: legacy_records(df), 1)
+    after = timed("records, column-wise", lambda: frame_records(df), 1)
+    print(f"speedup: {before / after:.1f}x")
+
+    preview = df.head(args.preview_rows)
+    compare_formats(
+        f"preview {len(preview)} rows",
+        lambda: frame_records(preview),
+        lambda: frame_columns(preview),
+        args.repeat,
+    )
+    compare_formats(
+        "correlation matrix",
+        lambda: frame_matrix(corr),
+        lambda: frame_rows(corr),
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
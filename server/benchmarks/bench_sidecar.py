@@ -0,0 +1,85 @@
+"""Benchmark cold (CSV) vs warm (Arrow sidecar) dataset loads.
+
+Usage:
+    cd server
+    poetry run python benchmarks/bench_sidecar.py --rows 1000000 --cols 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.dataset_cache import DatasetCache  # noqa: E402
+from modules.loader import DatasetLoader  # noqa: E402
+from modules.sidecar import SidecarStore  # noqa: E402
+
+
+def make_csv(path: Path, rows: int, cols: int) -> None:
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(cols):
+        if i % 4 == 3:
+            data[f"cat_{i}"] = rng.choice(["a", "b", "c", "d"], size=rows)
+        else:
+            data[f"num_{i}"] = rng.normal(size=rows)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32}{elapsed * 1000:>10.1f} ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--cols", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = Path(tmp) / "data"
+        data_root.mkdir()
+        csv_path = data_root / "bench.csv"
+        make_csv(csv_path, args.rows, args.cols)
+        size_mb = csv_path.stat().st_size / 1e6
+        print(f"{args.rows} rows x {args.cols} cols, {size_mb:.1f} MB CSV")
+
+        sidecars = SidecarStore(data_root, Path(tmp) / ".mcp_cache")
+
+        def fresh_loader() -> DatasetLoader:
+            # プロセス内キャッシュを空にしてディスクからの読み込みだけを測る
+            return DatasetLoader(
+                data_root, cache=DatasetCache(max_bytes=1 << 40), sidecars=sidecars
+            )
+
+        timed("pd.read_csv (baseline)", lambda: pd.read_csv(csv_path))
+        cold = timed(
+            "cold load (CSV + sidecar write)", lambda: fresh_loader().load(csv_path)
+        )
+        warm = timed("warm load (sidecar)", lambda: fresh_loader().load(csv_path))
+        fingerprint = fresh_loader().fingerprint(csv_path)
+        first_column = pd.read_csv(csv_path, nrows=0).columns[0]
+        timed(
+            "warm load, 1 column projection",
+            lambda: sidecars.read(fingerprint, columns=[first_column]),
+        )
+        loader = fresh_loader()
+        loader.load(csv_path)
+        timed("in-memory cache hit", lambda: loader.load(csv_path))
+        print(f"speedup cold/warm: {cold / warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 """MCP server for EDA functionality."""
 
+import argparse
 from pathlib import Path
 from typing import List, Optional
 
@@ -7,12 +8,18 @@ from mcp.server.fastmcp import FastMCP
 from modules.dataclass import (
     ColumnInfoOutput,
     CorrelationMatrixOutput,
+    DatasetCacheStats,
     DescribeCSVOutput,
     ListDatasetsOutput,
     MissingValuesOutput,
     PreviewCSVOutput,
+    RefreshProfileOutput,
+    ResultCacheStats,
+    ToolExecutorStats,
 )
 from modules.eda_analyzer import EDAAnalyzer
+from modules.execution import ToolExecutor
+from modules.pagination import page_preview
 
 DATA_ROOT = (Path(__file__).resolve().parents[1] / "data").resolve()
 
@@ -26,48 +33,179 @@ mcp = FastMCP(
 # Initialize analyzer instance
 analyzer = EDAAnalyzer(DATA_ROOT)
 
+# Blocking analyzer work runs in a worker pool, off the event loop; CPU-bound
+# tools can use a pre-warmed process pool (MCP_PROCESS_WORKERS)
+executor = ToolExecutor(analyzer=analyzer)
+
 
 @mcp.tool()
-def list_datasets() -> ListDatasetsOutput:
-    """List CSV files available under the data directory."""
-    return analyzer.list_datasets()
+async def list_datasets(
+    pattern: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = 1000,
+    refresh: bool = False,
+) -> ListDatasetsOutput:
+    """List CSV files available under the data directory.
+
+    Results come from an indexed catalog (size, mtime, estimated rows, schema
+    hash) that is refreshed in the background by diffing file stats.
+    ``pattern`` filters relative paths with a glob such as ``"sales/*.csv"``;
+    page with ``offset``/``limit`` and follow ``next_offset``. ``refresh``
+    rescans the directory before answering.
+    """
+    return await executor.run(
+        "list_datasets", analyzer.list_datasets, pattern, offset, limit, refresh
+    )
 
 
 @mcp.tool()
-def preview_csv(path: str, n_rows: int = 5) -> PreviewCSVOutput:
-    """Return the first ``n_rows`` rows from the CSV file."""
-    return analyzer.preview_csv(path, n_rows)
+async def preview_csv(
+    path: str,
+    n_rows: int = 5,
+    mode: str = "head",
+    format: str = "records",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> PreviewCSVOutput:
+    """Return ``n_rows`` rows from the CSV file without parsing the whole file.
+
+    ``mode`` selects the first rows ("head"), the last rows ("tail") or a
+    uniform random sample ("sample"). ``format="columnar"`` returns the rows as
+    ``data`` (column name -> list of values) instead of one dict per row, which
+    is much smaller for wide files. ``limit`` pages through the ``n_rows`` rows;
+    pass ``next_cursor`` back as ``cursor`` with the same arguments to get the
+    next page from the cached result.
+    """
+    output, key, offset = await executor.run_page(
+        "preview_csv",
+        analyzer.preview_csv,
+        path,
+        n_rows,
+        mode,
+        format=format,
+        cursor=cursor,
+    )
+    return page_preview(output, key, offset, limit)
 
 
 @mcp.tool()
-def column_info(path: str) -> ColumnInfoOutput:
-    """Return dtype and basic counts for each column."""
-    return analyzer.column_info(path)
+async def column_info(
+    path: str,
+    streaming: Optional[bool] = None,
+    approximate: bool = False,
+    precision: int = 14,
+) -> ColumnInfoOutput:
+    """Return dtype and basic counts for each column.
+
+    Exact counts are answered from the persisted dataset profile, which is
+    built once per dataset version. ``streaming`` aggregates the file chunk by chunk so that files larger than
+    memory can be profiled; by default it is enabled for large files.
+    ``approximate`` estimates unique counts with a HyperLogLog sketch of
+    ``2**precision`` registers; the relative standard error is reported in
+    ``unique_relative_error`` and sketches are persisted for later calls.
+    """
+    return await executor.run(
+        "column_info", analyzer.column_info, path, streaming, approximate, precision
+    )
 
 
 @mcp.tool()
-def missing_values(path: str) -> MissingValuesOutput:
-    """Summarise missing value counts and ratios."""
-    return analyzer.missing_values(path)
+async def missing_values(
+    path: str, streaming: Optional[bool] = None
+) -> MissingValuesOutput:
+    """Summarise missing value counts and ratios from the dataset profile.
+
+    ``streaming`` aggregates the file chunk by chunk so that files larger than
+    memory can be profiled; by default it is enabled for large files.
+    """
+    return await executor.run(
+        "missing_values", analyzer.missing_values, path, streaming
+    )
 
 
 @mcp.tool()
-def describe_csv(path: str) -> DescribeCSVOutput:
-    """Return descriptive statistics for the CSV file."""
-    return analyzer.describe_csv(path)
+async def describe_csv(
+    path: str, streaming: Optional[bool] = None
+) -> DescribeCSVOutput:
+    """Return descriptive statistics for the CSV file from the dataset profile.
+
+    ``streaming`` aggregates the file chunk by chunk so that files larger than
+    memory can be profiled; by default it is enabled for large files.
+    """
+    return await executor.run("describe_csv", analyzer.describe_csv, path, streaming)
 
 
 @mcp.tool()
-def correlation_matrix(
+async def correlation_matrix(
     path: str,
     *,
     columns: Optional[List[str]] = None,
     method: str = "pearson",
+    format: str = "records",
 ) -> CorrelationMatrixOutput:
-    """Compute a correlation matrix for numeric columns."""
-    return analyzer.correlation_matrix(path, columns=columns, method=method)
+    """Compute a correlation matrix for numeric columns.
+
+    ``format="columnar"`` returns a dense 2-D array ``values`` ordered by
+    ``columns`` instead of the nested ``matrix`` dict.
+    """
+    return await executor.run(
+        "correlation_matrix",
+        analyzer.correlation_matrix,
+        path,
+        columns=columns,
+        method=method,
+        format=format,
+    )
+
+
+@mcp.tool()
+async def refresh_profile(
+    path: str, streaming: Optional[bool] = None
+) -> RefreshProfileOutput:
+    """Rebuild and persist the column profile used by the EDA and quality tools.
+
+    Profiles are rebuilt automatically when the file changes; call this to
+    force a rebuild, e.g. with ``streaming=False`` to replace a chunked profile
+    (approximate quartiles) with an exact one.
+    """
+    output = await executor.run(
+        "refresh_profile", analyzer.refresh_profile, path, streaming
+    )
+    # Cached outputs may have been built from the previous profile
+    executor.invalidate(path)
+    return output
+
+
+@mcp.tool()
+def dataset_cache_stats() -> DatasetCacheStats:
+    """Return hit/miss/eviction counters of the in-process dataset cache."""
+    return analyzer.loader.cache.stats()
+
+
+@mcp.tool()
+def result_cache_stats() -> ResultCacheStats:
+    """Return hit/miss/eviction counters of the tool result cache."""
+    return executor.results.stats()
+
+
+@mcp.tool()
+def execution_stats() -> ToolExecutorStats:
+    """Return per-tool queue depth, concurrency limits and wait/run times."""
+    return executor.stats()
 
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
-    # mcp.run(transport="streamable-http")
+    parser = argparse.ArgumentParser(description="MCP server for EDA functionality")
+    parser.add_argument(
+        "--transport", choices=["stdio", "streamable-http"], default="stdio"
+    )
+    parser.add_argument("--host", default=None, help="HTTP bind address")
+    parser.add_argument("--port", type=int, default=None, help="HTTP port")
+    args = parser.parse_args()
+    if args.host is not None:
+        mcp.settings.host = args.host
+    if args.port is not None:
+        mcp.settings.port = args.port
+
+    executor.warm_up()
+    mcp.run(transport=args.transport)
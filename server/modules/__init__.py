@@ -2,10 +2,14 @@
 
 from .data_quality import DataQualityAnalyzer
 from .dataclass import (
+    BatchOutlierDetectionOutput,
     CategoricalAnalysisOutput,
     CategoricalInfo,
     DataQualityMetrics,
     DataQualityOutput,
+    DtypeOptimization,
+    DuplicateDetectionOutput,
+    DuplicateGroup,
     OutlierDetectionOutput,
     OutlierInfo,
     ProcessedDataInfo,
@@ -14,10 +18,14 @@ from .dataclass import (
 
 __all__ = [
     "DataQualityAnalyzer",
+    "BatchOutlierDetectionOutput",
     "CategoricalAnalysisOutput",
     "CategoricalInfo",
     "DataQualityMetrics",
     "DataQualityOutput",
+    "DtypeOptimization",
+    "DuplicateDetectionOutput",
+    "DuplicateGroup",
     "OutlierDetectionOutput",
     "OutlierInfo",
     "ProcessedDataInfo",
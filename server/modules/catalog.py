@@ -0,0 +1,268 @@
+"""Incrementally refreshed catalog of the CSV datasets under the data root."""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .dataclass import DatasetEntry, ListDatasetsOutput
+
+DEFAULT_PAGE_SIZE = 1000
+_HEADER_BLOCK_BYTES = 64 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    row_estimate INTEGER NOT NULL,
+    n_columns INTEGER NOT NULL,
+    schema_hash TEXT NOT NULL
+);
+"""
+
+
+def catalog_refresh_seconds() -> float:
+    """カタログをバックグラウンドで更新する間隔（秒）
+
+    環境変数 ``MCP_CATALOG_REFRESH_SECONDS`` で設定する（既定 30秒）。
+    0 の場合はバックグラウンド更新を行わず、一覧の取得ごとに差分を反映する。
+    """
+    return float(os.environ.get("MCP_CATALOG_REFRESH_SECONDS", 30))
+
+
+def inspect_csv(path: Path, size: int) -> Tuple[int, int, str]:
+    """CSVの先頭ブロックだけを読み、推定行数・カラム数・スキーマハッシュを返す"""
+    with open(path, "rb") as f:
+        block = f.read(_HEADER_BLOCK_BYTES)
+    complete = len(block) == size
+    if not complete:
+        # 途中で切れた最終行は除く
+        block = block[: block.rfind(b"\n") + 1]
+
+    try:
+        sample = pd.read_csv(io.BytesIO(block))
+    except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError):
+        return 0, 0, hashlib.sha1(b"").hexdigest()[:16]
+
+    schema = "\n".join(f"{column}:{dtype}" for column, dtype in sample.dtypes.items())
+    schema_hash = hashlib.sha1(schema.encode()).hexdigest()[:16]
+    if complete or not len(sample):
+        return len(sample), len(sample.columns), schema_hash
+
+    # ヘッダーを除いた平均行長からファイル全体の行数を推定
+    header_bytes = block.find(b"\n") + 1
+    bytes_per_row = (len(block) - header_bytes) / len(sample)
+    row_estimate = round((size - header_bytes) / bytes_per_row)
+    return row_estimate, len(sample.columns), schema_hash
+
+
+class DatasetCatalog:
+    """データディレクトリ配下のCSVの索引
+
+    パス・サイズ・更新時刻・推定行数・スキーマハッシュをSQLiteに保存し、
+    一覧はその索引から返す。バックグラウンドのスレッドが定期的に
+    ディレクトリを走査してサイズ・更新時刻の差分を取り、追加・変更された
+    ファイルの先頭だけを読み直す。
+    """
+
+    def __init__(
+        self,
+        data_root: Path,
+        cache_dir: Path,
+        refresh_seconds: Optional[float] = None,
+    ):
+        self.data_root = data_root
+        self.db_path = cache_dir / "catalog.sqlite3"
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else catalog_refresh_seconds()
+        )
+        self._entries: Optional[Dict[str, DatasetEntry]] = None
+        self._paths: List[str] = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._scanned = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def list_datasets(
+        self,
+        pattern: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = DEFAULT_PAGE_SIZE,
+        refresh: bool = False,
+    ) -> ListDatasetsOutput:
+        """索引からCSVの一覧を返す
+
+        Args:
+            pattern: data_rootからの相対パスに対するglobパターン（例: "sales/*.csv"）
+            offset: 先頭から読み飛ばす件数
+            limit: 返す最大件数（Noneの場合は全件）
+            refresh: 返す前にディレクトリを走査して索引を更新するか
+        """
+        if offset < 0:
+            raise ValueError(f"offset must be non-negative: {offset}")
+        if limit is not None and limit < 0:
+            raise ValueError(f"limit must be non-negative: {limit}")
+
+        self._ensure_loaded()
+        # 保存済みの索引がない初回や明示的な指定の場合はその場で走査する
+        if refresh or self.refresh_seconds <= 0 or not (self._entries or self._scanned):
+            self.refresh()
+        if self.refresh_seconds > 0:
+            self._start_background_refresh()
+
+        with self._lock:
+            entries = self._entries or {}
+            paths = self._paths
+        if pattern:
+            paths = [path for path in paths if fnmatch.fnmatch(path, pattern)]
+
+        stop = len(paths) if limit is None else offset + limit
+        page = [entries[path] for path in paths[offset:stop]]
+        return ListDatasetsOutput(
+            data_root=str(self.data_root),
+            datasets=[entry.path for entry in page],
+            entries=page,
+            total=len(paths),
+            next_offset=stop if stop < len(paths) else None,
+        )
+
+    def refresh(self) -> None:
+        """ディレクトリを走査し、サイズ・更新時刻が変わったファイルだけ索引を更新"""
+        with self._refresh_lock:
+            self._ensure_loaded()
+            found = self._scan()
+            with self._lock:
+                current = dict(self._entries or {})
+
+            changed = [
+                path
+                for path, stat in found.items()
+                if path not in current
+                or (current[path].size, current[path].mtime_ns) != stat
+            ]
+            removed = [path for path in current if path not in found]
+            updated: Dict[str, DatasetEntry] = {}
+            for path in changed:
+                size, mtime_ns = found[path]
+                try:
+                    rows, n_columns, schema_hash = inspect_csv(
+                        self.data_root / path, size
+                    )
+                except OSError:
+                    continue
+                updated[path] = DatasetEntry(
+                    path=path,
+                    size=size,
+                    mtime_ns=mtime_ns,
+                    row_estimate=rows,
+                    n_columns=n_columns,
+                    schema_hash=schema_hash,
+                )
+
+            if updated or removed:
+                self._persist(updated, removed)
+            for path in removed:
+                current.pop(path, None)
+            current.update(updated)
+            with self._lock:
+                self._entries = current
+                self._paths = sorted(current)
+                self._scanned = True
+
+    def close(self) -> None:
+        """バックグラウンド更新を停止"""
+        self._stop.set()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """data_root配下の全CSVのサイズと更新時刻"""
+        found: Dict[str, Tuple[int, int]] = {}
+        if not self.data_root.exists():
+            return found
+        for directory, _, filenames in os.walk(self.data_root):
+            for name in filenames:
+                if not name.endswith(".csv"):
+                    continue
+                full_path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                relative = os.path.relpath(full_path, self.data_root)
+                found[relative] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def _ensure_loaded(self) -> None:
+        """初回は保存済みの索引を読み込む"""
+        if self._entries is not None:
+            return
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+                self._paths = sorted(self._entries)
+
+    def _start_background_refresh(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="dataset-catalog", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        # 保存済みの索引だけで応答した場合は、最初の走査をすぐに行う
+        delay = self.refresh_seconds if self._scanned else 0
+        while not self._stop.wait(delay):
+            try:
+                self.refresh()
+            except (OSError, sqlite3.Error):
+                pass
+            delay = self.refresh_seconds
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _load(self) -> Dict[str, DatasetEntry]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT path, size, mtime_ns, row_estimate, n_columns, schema_hash"
+                " FROM datasets"
+            ).fetchall()
+        return {row[0]: DatasetEntry(*row) for row in rows}
+
+    def _persist(self, updated: Dict[str, DatasetEntry], removed: List[str]) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "DELETE FROM datasets WHERE path = ?", [(path,) for path in removed]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        entry.path,
+                        entry.size,
+                        entry.mtime_ns,
+                        entry.row_estimate,
+                        entry.n_columns,
+                        entry.schema_hash,
+                    )
+                    for entry in updated.values()
+                ],
+            )
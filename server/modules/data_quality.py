@@ -2,54 +2,240 @@
 
 from __future__ import annotations
 
+import atexit
+import multiprocessing
+import os
+import threading
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 from scipy import stats
 from sklearn.ensemble import IsolationForest
 
+from .catalog import DatasetCatalog
 from .dataclass import (
+    BatchOutlierDetectionOutput,
     CategoricalAnalysisOutput,
     CategoricalInfo,
     DataQualityMetrics,
     DataQualityOutput,
+    DuplicateDetectionOutput,
     OutlierDetectionOutput,
-    OutlierInfo,
     ProcessedDataInfo,
     ProcessedDataOutput,
+    RankedOutliers,
+    RefreshProfileOutput,
 )
+from .duplicates import (
+    DuplicateCounter,
+    collect_duplicate_groups,
+    estimate_duplicate_rows,
+)
+from .loader import DatasetLoader
+from .model_store import ModelStore
+from .pagination import outlier_page, top_k
+from .profile_store import DatasetProfiler
+from .serialization import check_format, frame_columns, frame_records
+from .sketches import CategoricalSketch, hll_relative_error
 
 # Suppress sklearn warnings for cleaner output
 warnings.filterwarnings("ignore", category=UserWarning)
 
+ISOLATION_FOREST_CONTAMINATION = 0.1
+ZSCORE_THRESHOLD = 3.0
+MAX_REPORTED_OUTLIERS = 20
+
+
+# Isolation Forestの学習に使う最大行数と、スコア計算のチャンク行数
+ISOLATION_FOREST_FIT_ROWS = 1_000_000
+ISOLATION_FOREST_SCORE_ROWS = 1_000_000
+
+
+def _isolation_forest_params(
+    n_estimators: int, max_samples: Union[int, float, str]
+) -> Dict[str, Any]:
+    """モデルのキャッシュキーにも使う学習パラメータ"""
+    return {
+        "contamination": ISOLATION_FOREST_CONTAMINATION,
+        "n_estimators": n_estimators,
+        "max_samples": max_samples,
+        "random_state": 42,
+        "fit_rows": ISOLATION_FOREST_FIT_ROWS,
+    }
+
+
+def _isolation_forest_scores(
+    values: np.ndarray,
+    params: Dict[str, Any],
+    model: Optional[IsolationForest] = None,
+    n_jobs: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray, IsolationForest]:
+    """1カラム分のIsolation Forestのラベル・スコアとモデル（プロセスプールからも呼ぶ）
+
+    ``model`` がなければ学習する。行数が ``fit_rows`` を超える場合は無作為に
+    抽出した行で学習し、スコアは全行をチャンクごとに計算する。
+    """
+    if model is None:
+        model = IsolationForest(
+            contamination=params["contamination"],
+            n_estimators=params["n_estimators"],
+            max_samples=params["max_samples"],
+            random_state=params["random_state"],
+            n_jobs=n_jobs,
+        )
+        fit_values = values
+        if len(values) > params["fit_rows"]:
+            rng = np.random.default_rng(params["random_state"])
+            fit_values = values[
+                rng.choice(len(values), params["fit_rows"], replace=False)
+            ]
+        model.fit(fit_values.reshape(-1, 1))
+    else:
+        model.set_params(n_jobs=n_jobs)
+
+    scores = np.empty(len(values))
+    for start in range(0, len(values), ISOLATION_FOREST_SCORE_ROWS):
+        stop = start + ISOLATION_FOREST_SCORE_ROWS
+        scores[start:stop] = model.score_samples(values[start:stop].reshape(-1, 1))
+    # predictと同じく offset_ を下回るスコアを異常値とする
+    labels = np.where(scores < model.offset_, -1, 1)
+    return labels, scores, model
+
+
+def isolation_forest_workers() -> int:
+    """複数カラムのIsolation Forestを並列に学習するワーカープロセス数
+
+    環境変数 ``MCP_FIT_WORKERS`` で設定する（既定はCPU数、最大4）。
+    """
+    default = min(4, os.cpu_count() or 1)
+    return max(int(os.environ.get("MCP_FIT_WORKERS", default)), 1)
+
+
+# カラムごとのIsolation Forestの学習に使うプロセスプール（プロセス内で共有）
+_fit_pool: Optional[ProcessPoolExecutor] = None
+_fit_pool_lock = threading.Lock()
+
+
+def _isolation_forest_pool() -> Optional[ProcessPoolExecutor]:
+    """複数カラムのIsolation Forestを並列に学習するプロセスプール
+
+    初回の呼び出しで起動し、以降の呼び出しでも使い回す（終了時に停止する）。
+    ツールのワーカープロセスの中ではプロセスを入れ子にせずNone（順に学習する）。
+    """
+    global _fit_pool
+    if multiprocessing.parent_process() is not None:
+        return None
+    with _fit_pool_lock:
+        if _fit_pool is None:
+            # stdioサーバーでは標準入力を読むスレッドがロックを保持しているため、
+            # forkした子プロセスは標準入力を閉じる際にデッドロックする
+            _fit_pool = ProcessPoolExecutor(
+                max_workers=isolation_forest_workers(),
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+            atexit.register(_shutdown_isolation_forest_pool)
+        return _fit_pool
+
+
+def _shutdown_isolation_forest_pool() -> None:
+    global _fit_pool
+    with _fit_pool_lock:
+        if _fit_pool is not None:
+            _fit_pool.shutdown(wait=False, cancel_futures=True)
+            _fit_pool = None
+
+
+def _rank_outliers(
+    csv_path: Path,
+    series: pd.Series,
+    mask: np.ndarray,
+    scores: np.ndarray,
+    method: str,
+    threshold_info: Dict[str, float],
+    max_outliers: Optional[int] = MAX_REPORTED_OUTLIERS,
+) -> RankedOutliers:
+    """欠損を除いた列と異常値マスク・スコアから異常値の順位を求める
+
+    ``mask`` と ``scores`` は ``series`` と同じ位置で対応させ、
+    報告する ``index`` は元のDataFrameの行ラベルを使う。
+    異常値はスコアの大きい順に ``max_outliers`` 個まで。Noneの場合は全件を
+    保持し、順位はページに切り出す際に必要な分だけ求める。
+    """
+    positions = np.flatnonzero(mask)
+    if max_outliers is None:
+        top, order = positions, np.empty(0, dtype=np.intp)
+    else:
+        top = positions[top_k(scores[positions], max_outliers)]
+        order = np.arange(len(top))
+
+    summary = OutlierDetectionOutput(
+        path=str(csv_path),
+        column=str(series.name),
+        method=method,
+        total_outliers=len(positions),
+        outlier_percentage=(
+            float(len(positions) / len(series) * 100) if len(series) else 0.0
+        ),
+        outliers=[],
+        threshold_info=threshold_info,
+    )
+    return RankedOutliers(
+        summary=summary,
+        index=series.index.to_numpy()[top],
+        values=series.to_numpy()[top],
+        scores=scores[top],
+        order=order,
+    )
+
+
+def _categorical_recommendations(
+    unique_count: int, mode_frequency: int, total_count: int
+) -> List[str]:
+    """カテゴリ数と最頻値の頻度から推奨事項を生成"""
+    recommendations = []
+
+    if unique_count > 50:
+        recommendations.append(
+            f"高カーディナリティ ({unique_count} unique values): カテゴリの統合を検討"
+        )
+
+    if mode_frequency / total_count > 0.9:
+        recommendations.append("支配的なカテゴリが存在: データの偏りに注意")
+
+    if unique_count == total_count:
+        recommendations.append("全て異なる値: IDカラムの可能性があります")
+
+    return recommendations
+
 
 class DataQualityAnalyzer:
     """データ品質分析のメインクラス"""
 
-    def __init__(self, data_root: Path):
+    def __init__(self, data_root: Path, loader: Optional[DatasetLoader] = None):
         self.data_root = data_root
+        self.loader = loader if loader is not None else DatasetLoader(data_root)
+        self.models = ModelStore(self.loader.cache_dir)
+        self.profiler = DatasetProfiler(self.loader)
+        self.catalog = DatasetCatalog(data_root, self.loader.cache_dir)
 
     def _resolve_csv_path(self, path: str) -> Path:
-        """CSVパスの解決（server.pyから移植）"""
-        csv_path = Path(path)
-        if not csv_path.is_absolute():
-            csv_path = self.data_root / csv_path
-
-        try:
-            csv_path = csv_path.resolve(strict=True)
-        except FileNotFoundError as exc:
-            raise FileNotFoundError(f"CSV file not found: {path}") from exc
-
-        if self.data_root not in csv_path.parents and csv_path != self.data_root:
-            raise ValueError("CSV path must be located within the data directory")
-
-        return csv_path
+        """CSVパスの解決"""
+        return self.loader.resolve(path)
 
     def detect_outliers(
-        self, path: str, column: str, method: str = "iqr"
+        self,
+        path: str,
+        column: str,
+        method: str = "iqr",
+        n_estimators: int = 100,
+        max_samples: Union[int, float, str] = "auto",
+        n_jobs: Optional[int] = None,
+        max_outliers: Optional[int] = MAX_REPORTED_OUTLIERS,
     ) -> OutlierDetectionOutput:
         """
         異常値検出を実行
@@ -58,20 +244,51 @@ class DataQualityAnalyzer:
             path: CSVファイルパス
             column: 対象カラム名
             method: 検出手法 ("iqr", "zscore", "isolation_forest")
+            n_estimators: Isolation Forestの木の数
+            max_samples: Isolation Forestの各木の学習に使うサンプル数
+            n_jobs: Isolation Forestの並列数
+            max_outliers: 返す異常値の最大数（スコアの大きい順、Noneの場合は全件）
         """
-        csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
+        return outlier_page(
+            self.rank_outliers(
+                path, column, method, n_estimators, max_samples, n_jobs, max_outliers
+            )
+        )
 
-        if column not in df.columns:
+    def rank_outliers(
+        self,
+        path: str,
+        column: str,
+        method: str = "iqr",
+        n_estimators: int = 100,
+        max_samples: Union[int, float, str] = "auto",
+        n_jobs: Optional[int] = None,
+        max_outliers: Optional[int] = None,
+    ) -> RankedOutliers:
+        """
+        異常値を検出し、スコアの大きい順の順位を返す（ページングする場合に使う）
+
+        ``OutlierInfo`` は作らず、行ラベル・値・スコアを配列のまま保持する。
+
+        Args:
+            path: CSVファイルパス
+            column: 対象カラム名
+            method: 検出手法 ("iqr", "zscore", "isolation_forest")
+            n_estimators: Isolation Forestの木の数
+            max_samples: Isolation Forestの各木の学習に使うサンプル数
+            n_jobs: Isolation Forestの並列数
+            max_outliers: 順位を求める異常値の最大数（Noneの場合は全件）
+        """
+        csv_path = self._resolve_csv_path(path)
+        if column not in self.loader.schema(csv_path).columns:
             raise ValueError(f"Column '{column}' not found in dataset")
 
-        series = df[column].dropna()
+        # 対象カラムだけを読み込む
+        series = self.loader.load(csv_path, columns=[column])[column].dropna()
         if not pd.api.types.is_numeric_dtype(series):
             raise ValueError(f"Column '{column}' is not numeric")
 
-        outliers = []
-        threshold_info = {}
-
+        # マスクとスコアは欠損を除いた列の位置で保持する
         if method == "iqr":
             Q1 = series.quantile(0.25)
             Q3 = series.quantile(0.75)
@@ -87,99 +304,200 @@ class DataQualityAnalyzer:
                 "upper_bound": float(upper_bound),
             }
 
-            outlier_mask = (series < lower_bound) | (series > upper_bound)
-            outlier_indices = series[outlier_mask].index.tolist()
-
-            for idx in outlier_indices:
-                value = series.iloc[idx]
-                # IQRメソッドでは距離をスコアとして使用
-                score = min(abs(value - lower_bound), abs(value - upper_bound))
-                outliers.append(
-                    OutlierInfo(
-                        index=int(idx),
-                        value=float(value),
-                        score=float(score),
-                        method=method,
-                    )
-                )
+            values = series.to_numpy(dtype="float64")
+            mask = (values < lower_bound) | (values > upper_bound)
+            # IQRメソッドでは距離をスコアとして使用
+            scores = np.minimum(
+                np.abs(values - lower_bound), np.abs(values - upper_bound)
+            )
 
         elif method == "zscore":
-            z_scores = np.abs(stats.zscore(series))
-            threshold = 3.0
-            threshold_info = {"threshold": threshold}
-
-            outlier_mask = z_scores > threshold
-            outlier_indices = series[outlier_mask].index.tolist()
-
-            for idx in outlier_indices:
-                value = series.iloc[idx]
-                score = z_scores[idx]
-                outliers.append(
-                    OutlierInfo(
-                        index=int(idx),
-                        value=float(value),
-                        score=float(score),
-                        method=method,
-                    )
-                )
+            scores = np.abs(stats.zscore(series.to_numpy(dtype="float64")))
+            threshold_info = {"threshold": ZSCORE_THRESHOLD}
+            mask = scores > ZSCORE_THRESHOLD
 
         elif method == "isolation_forest":
-            # Isolation Forestは2D配列が必要
-            X = series.values.reshape(-1, 1)
+            # 学習済みモデルはデータセットのバージョン・カラム・パラメータ単位で再利用
+            fingerprint = self.loader.fingerprint(csv_path)
+            params = _isolation_forest_params(n_estimators, max_samples)
+            model = self.models.get(fingerprint, column, params)
+            labels, outlier_scores, fitted = _isolation_forest_scores(
+                series.to_numpy(dtype="float64"), params, model, n_jobs
+            )
+            if model is None:
+                self.models.put(fingerprint, column, params, fitted)
+            threshold_info = {"contamination": ISOLATION_FOREST_CONTAMINATION}
+            mask = labels == -1
+            # 異常スコア（負の値）を正の値に変換
+            scores = np.abs(outlier_scores)
+        else:
+            raise ValueError(f"Unsupported method: {method}")
 
-            iso_forest = IsolationForest(contamination=0.1, random_state=42)
-            outlier_labels = iso_forest.fit_predict(X)
-            outlier_scores = iso_forest.score_samples(X)
+        return _rank_outliers(
+            csv_path, series, mask, scores, method, threshold_info, max_outliers
+        )
 
-            threshold_info = {"contamination": 0.1}
+    def detect_outliers_batch(
+        self, path: str, columns: Optional[List[str]] = None, method: str = "iqr"
+    ) -> BatchOutlierDetectionOutput:
+        """
+        複数カラムの異常値検出を1回の読み込みで実行
 
-            outlier_indices = series[outlier_labels == -1].index.tolist()
+        IQR・Zスコアは数値ブロック全体に対してベクトル化して計算し、
+        Isolation Forestは学習済みのモデルがないカラムだけを、プロセス内で
+        共有する常駐のプロセスプールで並列に学習する。
 
-            for idx in outlier_indices:
-                value = series.iloc[idx]
-                # 異常スコア（負の値）を正の値に変換
-                score = abs(outlier_scores[idx])
-                outliers.append(
-                    OutlierInfo(
-                        index=int(idx),
-                        value=float(value),
-                        score=float(score),
-                        method=method,
-                    )
+        Args:
+            path: CSVファイルパス
+            columns: 対象カラム名（Noneの場合は全ての数値カラム）
+            method: 検出手法 ("iqr", "zscore", "isolation_forest")
+        """
+        if method not in ("iqr", "zscore", "isolation_forest"):
+            raise ValueError(f"Unsupported method: {method}")
+
+        csv_path = self._resolve_csv_path(path)
+        schema = self.loader.schema(csv_path)
+        if columns is None:
+            columns = schema.numeric_columns()
+        missing = [column for column in columns if column not in schema.columns]
+        if missing:
+            raise ValueError(f"Columns not found in dataset: {', '.join(missing)}")
+
+        block = self.loader.load(csv_path, columns=columns)
+        non_numeric = [
+            column
+            for column, dtype in block.dtypes.items()
+            if not pd.api.types.is_numeric_dtype(dtype)
+            or pd.api.types.is_bool_dtype(dtype)
+        ]
+        if non_numeric:
+            raise ValueError(f"Columns are not numeric: {', '.join(non_numeric)}")
+        block = block.astype("float64")
+        values = block.to_numpy()
+
+        if method == "iqr":
+            quartiles = block.quantile([0.25, 0.75]).to_numpy()
+            q1, q3 = quartiles[0], quartiles[1]
+            iqr = q3 - q1
+            lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+            masks = (values < lower) | (values > upper)
+            # IQRメソッドでは境界からの距離をスコアとして使用
+            scores = np.minimum(np.abs(values - lower), np.abs(values - upper))
+            threshold_infos = [
+                {
+                    "Q1": float(q1[i]),
+                    "Q3": float(q3[i]),
+                    "IQR": float(iqr[i]),
+                    "lower_bound": float(lower[i]),
+                    "upper_bound": float(upper[i]),
+                }
+                for i in range(len(columns))
+            ]
+        elif method == "zscore":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = np.abs(
+                    (values - block.mean().to_numpy()) / block.std(ddof=0).to_numpy()
                 )
+            masks = scores > ZSCORE_THRESHOLD
+            threshold_infos = [{"threshold": ZSCORE_THRESHOLD}] * len(columns)
         else:
-            raise ValueError(f"Unsupported method: {method}")
+            masks = np.zeros(values.shape, dtype=bool)
+            scores = np.zeros(values.shape)
+            present = [i for i in range(len(columns)) if block.iloc[:, i].notna().any()]
+            fingerprint = self.loader.fingerprint(csv_path)
+            params = _isolation_forest_params(100, "auto")
+            models = {
+                i: self.models.get(fingerprint, block.columns[i], params)
+                for i in present
+            }
+            # 学習が必要なカラムだけをプロセスプールに送り（2つ以上ある場合のみ）、
+            # 学習済みのモデルはその間にこのプロセスでスコアだけを計算する
+            to_fit = [i for i in present if models[i] is None]
+            pool = _isolation_forest_pool() if len(to_fit) > 1 else None
+            fits = (pool.map if pool is not None else map)(
+                _isolation_forest_scores,
+                [values[~np.isnan(values[:, i]), i] for i in to_fit],
+                [params] * len(to_fit),
+            )
+            for i in present:
+                not_null = ~np.isnan(values[:, i])
+                if models[i] is None:
+                    labels, column_scores, fitted = next(fits)
+                    self.models.put(fingerprint, block.columns[i], params, fitted)
+                else:
+                    labels, column_scores, _ = _isolation_forest_scores(
+                        values[not_null, i], params, models[i]
+                    )
+                masks[not_null, i] = labels == -1
+                # 異常スコア（負の値）を正の値に変換
+                scores[not_null, i] = np.abs(column_scores)
+            threshold_infos = [{"contamination": ISOLATION_FOREST_CONTAMINATION}] * len(
+                columns
+            )
 
-        # スコア順でソート
-        outliers.sort(key=lambda x: x.score, reverse=True)
+        results = []
+        for i, column in enumerate(block.columns):
+            not_null = ~np.isnan(values[:, i])
+            results.append(
+                outlier_page(
+                    _rank_outliers(
+                        csv_path,
+                        block[column][not_null],
+                        masks[not_null, i],
+                        scores[not_null, i],
+                        method,
+                        threshold_infos[i],
+                    )
+                )
+            )
 
-        return OutlierDetectionOutput(
-            path=str(csv_path),
-            column=column,
-            method=method,
-            total_outliers=len(outliers),
-            outlier_percentage=float(len(outliers) / len(series) * 100),
-            outliers=outliers[:20],  # 上位20個まで
-            threshold_info=threshold_info,
+        return BatchOutlierDetectionOutput(
+            path=str(csv_path), method=method, results=results
         )
 
-    def analyze_categorical(self, path: str, column: str) -> CategoricalAnalysisOutput:
+    def analyze_categorical(
+        self,
+        path: str,
+        column: str,
+        streaming: Optional[bool] = None,
+        top_k: int = 100,
+        precision: int = 14,
+    ) -> CategoricalAnalysisOutput:
         """
         カテゴリカル変数の詳細分析
 
         Args:
             path: CSVファイルパス
             column: 対象カラム名
+            streaming: チャンク単位の1パスでスケッチから推定するか
+                （Noneの場合は保存済みの頻度がなく、ファイルが大きい場合のみ）
+            top_k: streaming の場合に返す頻出カテゴリの数
+            precision: streaming の場合のHyperLogLogの精度（レジスタ数は2**precision）
         """
         csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
-
-        if column not in df.columns:
+        if column not in self.loader.schema(csv_path).columns:
             raise ValueError(f"Column '{column}' not found in dataset")
 
-        series = df[column].dropna()
-        value_counts = series.value_counts()
-        total_count = len(series)
+        # 保存済みのプロファイルに頻度があれば使い、なければ対象カラムだけを読み込む
+        # （大きいファイルや streaming=True の場合はチャンク単位でスケッチを作る）
+        value_counts = None
+        if not streaming:
+            profile = self.profiler.column(csv_path, column)
+            if profile is not None and profile.value_counts is not None:
+                value_counts = pd.Series(profile.value_counts, dtype="int64")
+        if value_counts is None:
+            if streaming is None:
+                streaming = self.loader.should_stream(csv_path)
+            if streaming:
+                return self._analyze_categorical_sketch(
+                    csv_path, column, top_k, precision
+                )
+            # 同数の値の順序がプロファイルと揃うようCSVでのdtypeで数える
+            df = self.loader.source_frame(
+                csv_path, self.loader.load(csv_path, columns=[column])
+            )
+            value_counts = df[column].dropna().value_counts()
+        total_count = int(value_counts.sum())
 
         # パーセンテージ計算
         value_percentages = {
@@ -190,21 +508,7 @@ class DataQualityAnalyzer:
         probabilities = value_counts / total_count
         entropy = -np.sum(probabilities * np.log2(probabilities))
 
-        # 推奨事項生成
-        recommendations = []
         unique_count = len(value_counts)
-
-        if unique_count > 50:
-            recommendations.append(
-                f"高カーディナリティ ({unique_count} unique values): カテゴリの統合を検討"
-            )
-
-        if value_counts.iloc[0] / total_count > 0.9:
-            recommendations.append("支配的なカテゴリが存在: データの偏りに注意")
-
-        if unique_count == total_count:
-            recommendations.append("全て異なる値: IDカラムの可能性があります")
-
         categorical_info = CategoricalInfo(
             unique_count=unique_count,
             value_counts={str(k): int(v) for k, v in value_counts.items()},
@@ -218,79 +522,179 @@ class DataQualityAnalyzer:
             path=str(csv_path),
             column=column,
             info=categorical_info,
-            recommendations=recommendations,
+            recommendations=_categorical_recommendations(
+                unique_count, int(value_counts.iloc[0]), total_count
+            ),
+        )
+
+    def _analyze_categorical_sketch(
+        self, csv_path: Path, column: str, top_k: int, precision: int
+    ) -> CategoricalAnalysisOutput:
+        """チャンク単位の1パスでスケッチを作り、頻出カテゴリ・異なり数・エントロピーを推定
+
+        メモリはカテゴリ数によらず一定（Misra-Gries・Count-Min・HyperLogLog）。
+        """
+        sketch = CategoricalSketch(top_k=top_k, precision=precision)
+        for chunk in self.loader.iter_chunks(csv_path, columns=[column]):
+            sketch.update(chunk[column])
+        if not sketch.total:
+            raise ValueError(f"Column '{column}' has no non-null values")
+
+        top = sketch.top()
+        total_count = sketch.total
+        unique_count = sketch.unique_count()
+        entropy, lower, upper = sketch.entropy()
+        categorical_info = CategoricalInfo(
+            unique_count=unique_count,
+            value_counts={str(k): int(v) for k, v in top.items()},
+            value_percentages={
+                str(k): float(v / total_count * 100) for k, v in top.items()
+            },
+            mode=str(top.index[0]),
+            mode_frequency=int(top.iloc[0]),
+            entropy=entropy,
+            unique_relative_error=(
+                0.0 if sketch.exact else hll_relative_error(precision)
+            ),
+            count_error=sketch.count_error,
+            entropy_bounds=(lower, upper),
+        )
+
+        return CategoricalAnalysisOutput(
+            path=str(csv_path),
+            column=column,
+            info=categorical_info,
+            recommendations=_categorical_recommendations(
+                unique_count, int(top.iloc[0]), total_count
+            ),
+            method="sketch",
+        )
+
+    def detect_duplicates(
+        self,
+        path: str,
+        columns: Optional[List[str]] = None,
+        approximate: bool = False,
+        max_groups: int = 5,
+        precision: int = 14,
+    ) -> DuplicateDetectionOutput:
+        """
+        重複行の検出（行ハッシュをチャンクごとに集計し、メモリ使用量を抑える）
+
+        Args:
+            path: CSVファイルパス
+            columns: 重複判定に使うカラム（Noneの場合は全カラム）
+            approximate: HyperLogLogで重複行数を近似するか（グループは返さない）
+            max_groups: 返す重複グループの最大数
+            precision: HyperLogLogの精度（レジスタ数は2**precision）
+        """
+        csv_path = self._resolve_csv_path(path)
+        available = self.loader.schema(csv_path).columns
+        if columns is None:
+            columns = available
+        missing = [column for column in columns if column not in available]
+        if missing:
+            raise ValueError(f"Columns not found in dataset: {', '.join(missing)}")
+
+        def chunks():
+            return self.loader.iter_chunks(csv_path, columns=columns)
+
+        relative_error = None
+        groups = []
+        if approximate:
+            total_rows, duplicate_rows, relative_error = estimate_duplicate_rows(
+                chunks(), precision
+            )
+            method = "hyperloglog"
+        else:
+            counter = DuplicateCounter(spill_dir=self.loader.cache_dir)
+            groups = collect_duplicate_groups(chunks, counter, max_groups)
+            total_rows, duplicate_rows = counter.total_rows, counter.duplicate_rows
+            method = "partitioned_hash" if counter.spilled_once else "hash"
+
+        return DuplicateDetectionOutput(
+            path=str(csv_path),
+            columns=list(columns),
+            method=method,
+            total_rows=total_rows,
+            duplicate_rows=duplicate_rows,
+            duplicate_percentage=(
+                float(duplicate_rows / total_rows * 100) if total_rows else 0.0
+            ),
+            groups=groups,
+            relative_error=relative_error,
         )
 
-    def generate_quality_report(self, path: str) -> DataQualityOutput:
+    def generate_quality_report(
+        self, path: str, approximate: bool = False, precision: int = 14
+    ) -> DataQualityOutput:
         """
-        包括的なデータ品質レポートを生成
+        包括的なデータ品質レポートを生成（統計量はプロファイルストアから取得）
 
         Args:
             path: CSVファイルパス
+            approximate: unique_countをHyperLogLogで近似するか
+            precision: HyperLogLogの精度（レジスタ数は2**precision）
         """
         csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
+        # 統計量はデータセットのバージョンごとに保存したプロファイルから求める
+        profile = self.profiler.get(csv_path)
+        columns = profile.columns
+
+        # ユニーク数（近似モードではカラムごとに保存されたスケッチを再利用）
+        if approximate:
+            sketches = self.loader.distinct_sketches(csv_path, list(columns), precision)
+            unique_counts = {
+                column: sketch.estimate() for column, sketch in sketches.items()
+            }
+        else:
+            unique_counts = {column: info.unique for column, info in columns.items()}
 
         # 基本メトリクス
-        total_rows, total_columns = df.shape
-        duplicate_rows = df.duplicated().sum()
+        total_rows, total_columns = profile.n_rows, len(columns)
+        duplicate_rows = profile.duplicate_rows
         duplicate_percentage = float(duplicate_rows / total_rows * 100)
 
-        # メモリ使用量
-        memory_usage_mb = float(df.memory_usage(deep=True).sum() / 1024 / 1024)
+        # メモリ使用量（プロファイル作成時の計測値）
+        memory_usage_mb = float(profile.memory_usage_bytes / 1024 / 1024)
 
         # 欠損データサマリー
-        missing_summary = {}
-        for column in df.columns:
-            missing_count = df[column].isna().sum()
-            missing_percentage = float(missing_count / total_rows * 100)
-            missing_summary[column] = {
-                "missing_count": int(missing_count),
-                "missing_percentage": missing_percentage,
+        missing_summary = {
+            column: {
+                "missing_count": info.null,
+                "missing_percentage": float(info.null / total_rows * 100),
             }
+            for column, info in columns.items()
+        }
 
         # データ型サマリー
-        data_types_summary = {col: str(dtype) for col, dtype in df.dtypes.items()}
+        data_types_summary = {column: info.dtype for column, info in columns.items()}
 
         # カラム別品質分析
         column_quality = {}
-        for column in df.columns:
-            series = df[column]
+        for column, info in columns.items():
             quality_info = {
-                "data_type": str(series.dtype),
-                "non_null_count": int(series.notna().sum()),
-                "null_count": int(series.isna().sum()),
-                "unique_count": int(series.nunique()),
+                "data_type": info.dtype,
+                "non_null_count": info.non_null,
+                "null_count": info.null,
+                "unique_count": int(unique_counts[column]),
             }
 
             # 数値カラムの場合
-            if pd.api.types.is_numeric_dtype(series):
-                quality_info.update(
-                    {
-                        "mean": float(series.mean())
-                        if not series.isna().all()
-                        else None,
-                        "std": float(series.std()) if not series.isna().all() else None,
-                        "min": float(series.min()) if not series.isna().all() else None,
-                        "max": float(series.max()) if not series.isna().all() else None,
-                        "zero_count": int((series == 0).sum()),
-                        "negative_count": int((series < 0).sum()),
-                    }
-                )
+            if info.numeric is not None:
+                quality_info.update(info.numeric)
 
             # カテゴリカルカラムの場合
-            elif pd.api.types.is_object_dtype(series):
+            elif info.top_count is not None:
                 quality_info.update(
                     {
-                        "most_frequent": str(series.mode().iloc[0])
-                        if not series.empty
-                        else None,
-                        "most_frequent_count": int(series.value_counts().iloc[0])
-                        if not series.empty
-                        else 0,
-                        "cardinality_ratio": float(series.nunique() / len(series))
-                        if len(series) > 0
-                        else 0.0,
+                        "most_frequent": info.top,
+                        "most_frequent_count": info.top_count,
+                        "cardinality_ratio": (
+                            float(unique_counts[column] / total_rows)
+                            if total_rows > 0
+                            else 0.0
+                        ),
                     }
                 )
 
@@ -346,6 +750,7 @@ class DataQualityAnalyzer:
             missing_data_summary=missing_summary,
             data_types_summary=data_types_summary,
             memory_usage_mb=memory_usage_mb,
+            dtype_optimization=self.loader.dtype_optimization(csv_path),
         )
 
         return DataQualityOutput(
@@ -354,10 +759,38 @@ class DataQualityAnalyzer:
             column_quality=column_quality,
             recommendations=recommendations,
             severity_score=min(severity_score, 100.0),  # 最大100
+            unique_relative_error=(
+                hll_relative_error(precision) if approximate else None
+            ),
+        )
+
+    def refresh_profile(
+        self, path: str, streaming: Optional[bool] = None
+    ) -> RefreshProfileOutput:
+        """
+        データセットのプロファイルを作り直してプロファイルストアに保存
+
+        Args:
+            path: CSVファイルパス
+            streaming: チャンク単位で集計するか（Noneの場合はファイルサイズで判断）
+        """
+        csv_path = self._resolve_csv_path(path)
+        started = time.perf_counter()
+        profile = self.profiler.refresh(csv_path, streaming)
+        return RefreshProfileOutput(
+            path=str(csv_path),
+            n_rows=profile.n_rows,
+            n_columns=len(profile.columns),
+            exact=profile.exact,
+            build_seconds=time.perf_counter() - started,
         )
 
     def handle_missing_data(
-        self, path: str, strategy: str = "mean", columns: Optional[List[str]] = None
+        self,
+        path: str,
+        strategy: str = "mean",
+        columns: Optional[List[str]] = None,
+        format: str = "records",
     ) -> ProcessedDataOutput:
         """
         欠損値処理を実行
@@ -366,9 +799,13 @@ class DataQualityAnalyzer:
             path: CSVファイルパス
             strategy: 処理戦略 ("mean", "median", "mode", "drop", "fill_zero")
             columns: 対象カラム（Noneの場合は全カラム）
+            format: プレビューの形式 ("records", "columnar")
         """
+        check_format(format)
         csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
+        # キャッシュ上のDataFrameを書き換えないようコピーして処理する
+        # （読み込み時に変換した列は任意の値で補完できるようCSVでのdtypeに戻す）
+        df = self.loader.source_frame(csv_path, self.loader.load(csv_path)).copy()
         original_shape = df.shape
 
         changes_made = []
@@ -414,8 +851,8 @@ class DataQualityAnalyzer:
         processed_shape = df.shape
 
         # プレビューデータの作成
-        preview_df = df.head(5).where(lambda d: ~d.isna(), other=None)
-        processed_data_preview = preview_df.to_dict(orient="records")
+        columnar = format == "columnar"
+        preview_df = df.head(5)
 
         info = ProcessedDataInfo(
             original_shape=original_shape,
@@ -428,5 +865,7 @@ class DataQualityAnalyzer:
             path=str(csv_path),
             strategy=strategy,
             info=info,
-            processed_data_preview=processed_data_preview,
+            processed_data_preview=[] if columnar else frame_records(preview_df),
+            format=format,
+            processed_data_columns=frame_columns(preview_df) if columnar else None,
         )
@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
+
 
 @dataclass
 class OutlierInfo:
@@ -25,8 +27,35 @@ class OutlierDetectionOutput:
     method: str
     total_outliers: int
     outlier_percentage: float
-    outliers: List[OutlierInfo]
+    outliers: List[OutlierInfo]  # スコアの大きい順
     threshold_info: Dict[str, float]
+    offset: int = 0  # outliers の先頭の順位
+    next_cursor: Optional[str] = None  # 続きがある場合の次ページのカーソル
+
+
+@dataclass
+class RankedOutliers:
+    """異常値の全件と、スコアの大きい順に並べ終えた先頭部分の順位
+
+    結果キャッシュにはこれを保持し、順位は返すページの末尾まで必要になった
+    分だけ求め、``OutlierInfo`` は返すページの分だけ作る。
+    """
+
+    summary: OutlierDetectionOutput  # outliers は空
+    index: np.ndarray  # 元のDataFrameの行ラベル
+    values: np.ndarray
+    scores: np.ndarray
+    # スコアの大きい順（同点は行の順）の先頭部分の、index/values/scores上の位置
+    order: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp))
+
+
+@dataclass
+class BatchOutlierDetectionOutput:
+    """複数カラムの異常値検出結果"""
+
+    path: str
+    method: str
+    results: List[OutlierDetectionOutput]
 
 
 @dataclass
@@ -39,6 +68,10 @@ class CategoricalInfo:
     mode: str
     mode_frequency: int
     entropy: float
+    # method="sketch" の場合のみ
+    unique_relative_error: Optional[float] = None  # HyperLogLogの相対標準誤差
+    count_error: Optional[int] = None  # value_counts の過大評価の上限
+    entropy_bounds: Optional[Tuple[float, float]] = None  # (下限, 上限)
 
 
 @dataclass
@@ -49,6 +82,9 @@ class CategoricalAnalysisOutput:
     column: str
     info: CategoricalInfo
     recommendations: List[str]
+    method: str = "exact"  # "exact", "sketch"（チャンク単位のストリーミング推定）
+    offset: int = 0  # value_counts の先頭の順位
+    next_cursor: Optional[str] = None  # 続きがある場合の次ページのカーソル
 
 
 @dataclass
@@ -62,6 +98,8 @@ class DataQualityMetrics:
     missing_data_summary: Dict[str, Dict[str, Union[int, float]]]
     data_types_summary: Dict[str, str]
     memory_usage_mb: float
+    # 読み込み時のdtype変換前後のメモリ使用量（全体がキャッシュにある場合のみ）
+    dtype_optimization: Optional["DtypeOptimization"] = None
 
 
 @dataclass
@@ -73,6 +111,30 @@ class DataQualityOutput:
     column_quality: Dict[str, Dict[str, Any]]
     recommendations: List[str]
     severity_score: float  # 0-100, higher is worse
+    unique_relative_error: Optional[float] = None  # 近似モード時のunique_countの誤差
+
+
+@dataclass
+class DuplicateGroup:
+    """重複行グループ"""
+
+    count: int
+    row_indices: List[int]  # 先頭からの行位置（0始まり、最大5件）
+    values: Dict[str, Any]
+
+
+@dataclass
+class DuplicateDetectionOutput:
+    """重複行検出結果"""
+
+    path: str
+    columns: List[str]
+    method: str  # "hash", "partitioned_hash", "hyperloglog"
+    total_rows: int
+    duplicate_rows: int
+    duplicate_percentage: float
+    groups: List[DuplicateGroup]
+    relative_error: Optional[float] = None  # hyperloglogの場合のみ
 
 
 @dataclass
@@ -93,15 +155,31 @@ class ProcessedDataOutput:
     strategy: str
     info: ProcessedDataInfo
     processed_data_preview: List[Dict[str, Any]]  # First 5 rows
+    format: str = "records"
+    # format="columnar" の場合のみ（列名 → 先頭5行の値）。processed_data_preview は空
+    processed_data_columns: Optional[Dict[str, List[Any]]] = None
 
 
 # EDA Data Models
 
 
+@dataclass
+class DatasetEntry:
+    path: str  # data_rootからの相対パス
+    size: int
+    mtime_ns: int
+    row_estimate: int  # 先頭ブロックの平均行長からの推定（小さいファイルは厳密）
+    n_columns: int
+    schema_hash: str  # カラム名と推定dtypeのハッシュ
+
+
 @dataclass
 class ListDatasetsOutput:
     data_root: str
     datasets: List[str]
+    entries: List[DatasetEntry] = field(default_factory=list)
+    total: int = 0  # フィルタ後の総件数
+    next_offset: Optional[int] = None  # 続きがある場合の次のoffset
 
 
 @dataclass
@@ -110,6 +188,12 @@ class PreviewCSVOutput:
     n_rows: int
     columns: List[str]
     rows: List[Dict[str, Optional[Any]]]
+    mode: str = "head"
+    format: str = "records"
+    # format="columnar" の場合のみ（列名 → 値のリスト）。rows は空
+    data: Optional[Dict[str, List[Optional[Any]]]] = None
+    offset: int = 0  # rows の先頭の行番号（n_rows 行中）
+    next_cursor: Optional[str] = None  # 続きがある場合の次ページのカーソル
 
 
 @dataclass
@@ -124,6 +208,8 @@ class ColumnSummary:
 class ColumnInfoOutput:
     path: str
     columns: Dict[str, ColumnSummary]
+    # approximate=True の場合、uniqueはHyperLogLogによる推定値でこの相対標準誤差を持つ
+    unique_relative_error: Optional[float] = None
 
 
 @dataclass
@@ -152,3 +238,109 @@ class CorrelationMatrixOutput:
     columns: List[str]
     method: str
     matrix: Dict[str, Dict[str, Optional[float]]]
+    format: str = "records"
+    # format="columnar" の場合のみ（columns 順の2次元配列）。matrix は空
+    values: Optional[List[List[Optional[float]]]] = None
+
+
+@dataclass
+class DtypeOptimization:
+    """読み込み時のdtype変換によるメモリ使用量の変化"""
+
+    original_bytes: int
+    optimized_bytes: int
+    converted: Dict[str, str]  # カラム → "object -> category" など
+
+
+@dataclass
+class DatasetCacheStats:
+    entries: int
+    current_bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+@dataclass
+class ResultCacheStats:
+    entries: int
+    current_bytes: int  # pickle後のバイト数
+    max_bytes: int
+    ttl_seconds: float
+    hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    expired: int
+    max_disk_bytes: int  # ディスクに保存しない場合は0
+
+
+@dataclass
+class ColumnProfile:
+    """カラムのプロファイル（プロファイルストアに保存する統計量）"""
+
+    dtype: str
+    non_null: int
+    null: int
+    unique: int
+    describe: Dict[str, Optional[Any]]
+    # 数値・bool列の mean/std/min/max/zero_count/negative_count
+    numeric: Optional[Dict[str, Optional[float]]] = None
+    # カテゴリカル列の最頻値（同数の場合は最小の値）とその件数
+    top: Optional[str] = None
+    top_count: Optional[int] = None
+    # 件数の多い順の頻度（異なり数が多い列は保存しない）
+    value_counts: Optional[Dict[str, int]] = None
+
+
+@dataclass
+class DatasetProfile:
+    """データセットの1バージョン分のプロファイル"""
+
+    path: str
+    mtime_ns: int
+    size: int
+    # Falseの場合はチャンク集計で作成（describeの分位点と、異なり値の多い列の
+    # unique/top/freqは近似値）
+    exact: bool
+    n_rows: int
+    duplicate_rows: int
+    memory_usage_bytes: int
+    columns: Dict[str, ColumnProfile]
+
+
+@dataclass
+class RefreshProfileOutput:
+    path: str
+    n_rows: int
+    n_columns: int
+    exact: bool
+    build_seconds: float
+
+
+@dataclass
+class ToolQueueStats:
+    limit: int  # 同時実行数の上限
+    queued: int  # 実行待ちのリクエスト数（キューの深さ）
+    running: int
+    completed: int
+    failed: int
+    max_queued: int
+    mean_wait_seconds: float
+    mean_run_seconds: float
+    backend: str = "thread"  # "thread" または "process"
+    coalesced: int = 0  # 実行中の同じ呼び出しの結果を共有したリクエスト数
+    dedup_rate: float = 0.0  # coalesced / リクエスト数
+    cache_hits: int = 0  # 結果キャッシュから返したリクエスト数
+
+
+@dataclass
+class ToolExecutorStats:
+    max_workers: int
+    queued: int
+    running: int
+    tools: Dict[str, ToolQueueStats]
+    process_workers: int = 0  # プロセスプールを使わない場合は0
+    coalesced: int = 0
+    dedup_rate: float = 0.0
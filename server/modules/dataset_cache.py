@@ -0,0 +1,164 @@
+"""In-process cache for parsed datasets shared by the analyzers."""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from .dataclass import DatasetCacheStats
+
+DEFAULT_CACHE_MB = 1024
+
+
+@dataclass(frozen=True)
+class DatasetFingerprint:
+    """データセットのバージョンを識別するキー（パス・更新時刻・サイズ）"""
+
+    path: str
+    mtime_ns: int
+    size: int
+
+    @classmethod
+    def from_path(cls, csv_path: Path) -> "DatasetFingerprint":
+        stat = csv_path.stat()
+        return cls(path=str(csv_path), mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+
+_CacheKey = Tuple[DatasetFingerprint, Hashable]
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """DataFrameの実メモリ使用量（object列を含む）"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class DatasetCache:
+    """読み込み済みDataFrameをバイト数ベースのLRUで保持するキャッシュ
+
+    キーは ``(DatasetFingerprint, variant)`` で、ファイルが更新されると
+    fingerprint が変わるため古いエントリは自然に参照されなくなり、
+    LRU で追い出される。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[_CacheKey, Tuple[pd.DataFrame, int]] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(
+        self,
+        fingerprint: DatasetFingerprint,
+        variant: Hashable = None,
+        *,
+        count_miss: bool = True,
+    ) -> Optional[pd.DataFrame]:
+        """キャッシュ済みのDataFrameを返す（なければNone）
+
+        ``count_miss=False`` は別のエントリへのフォールバック前の問い合わせなど、
+        ミスとして数えたくない参照に使う。
+        """
+        key = (fingerprint, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if count_miss:
+                    self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def nbytes(
+        self, fingerprint: DatasetFingerprint, variant: Hashable = None
+    ) -> Optional[int]:
+        """登録時に計測したメモリ使用量（deep）を返す（未登録ならNone）"""
+        with self._lock:
+            entry = self._entries.get((fingerprint, variant))
+            return None if entry is None else entry[1]
+
+    def put(
+        self,
+        fingerprint: DatasetFingerprint,
+        df: pd.DataFrame,
+        variant: Hashable = None,
+    ) -> None:
+        """DataFrameを登録し、予算を超えた分をLRU順に追い出す"""
+        nbytes = frame_nbytes(df)
+        if nbytes > self.max_bytes:
+            # 予算より大きいデータはキャッシュしない
+            return
+
+        key = (fingerprint, variant)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._current_bytes -= previous[1]
+            self._entries[key] = (df, nbytes)
+            self._current_bytes += nbytes
+            self._evict()
+
+    def get_or_load(
+        self,
+        fingerprint: DatasetFingerprint,
+        loader: Callable[[], pd.DataFrame],
+        variant: Hashable = None,
+    ) -> pd.DataFrame:
+        """キャッシュにあればそれを返し、なければ ``loader`` で読み込んで登録"""
+        df = self.get(fingerprint, variant)
+        if df is None:
+            df = loader()
+            self.put(fingerprint, df, variant)
+        return df
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """指定パス（省略時は全て）のエントリを破棄"""
+        with self._lock:
+            for key in list(self._entries):
+                if path is None or key[0].path == path:
+                    _, nbytes = self._entries.pop(key)
+                    self._current_bytes -= nbytes
+
+    def stats(self) -> DatasetCacheStats:
+        """ヒット・ミス・追い出し回数などの統計を返す"""
+        with self._lock:
+            return DatasetCacheStats(
+                entries=len(self._entries),
+                current_bytes=self._current_bytes,
+                max_bytes=self.max_bytes,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+    def _evict(self) -> None:
+        while self._current_bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._current_bytes -= nbytes
+            self._evictions += 1
+
+
+_shared_cache: Optional[DatasetCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_dataset_cache() -> DatasetCache:
+    """プロセス内で共有されるキャッシュを返す
+
+    予算は環境変数 ``MCP_DATASET_CACHE_MB`` で設定する（既定 1024MB）。
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            max_mb = float(os.environ.get("MCP_DATASET_CACHE_MB", DEFAULT_CACHE_MB))
+            _shared_cache = DatasetCache(max_bytes=int(max_mb * 1024 * 1024))
+        return _shared_cache
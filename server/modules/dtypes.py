@@ -0,0 +1,125 @@
+"""Memory-saving dtype conversion applied when datasets are loaded."""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_integer_dtype, is_object_dtype
+
+STRING_BACKENDS = ("numpy", "pyarrow")
+
+# ユニーク数 / 非欠損数 がこの割合以下の文字列列を category に変換する
+CATEGORY_MAX_RATIO = 0.5
+
+
+def dtype_optimization_enabled() -> bool:
+    """環境変数 ``MCP_OPTIMIZE_DTYPES=0`` で読み込み時のdtype変換を無効化できる"""
+    return os.environ.get("MCP_OPTIMIZE_DTYPES", "1") != "0"
+
+
+def string_backend() -> str:
+    """category にしない文字列列の型
+
+    環境変数 ``MCP_DTYPE_BACKEND`` で設定する（既定 numpy = object のまま、
+    pyarrow = Arrow上の文字列 ``string[pyarrow]``）。
+    """
+    backend = os.environ.get("MCP_DTYPE_BACKEND", "numpy")
+    if backend not in STRING_BACKENDS:
+        raise ValueError(f"MCP_DTYPE_BACKEND must be one of {STRING_BACKENDS}")
+    return backend
+
+
+def _dtype_name(dtype) -> str:
+    if isinstance(dtype, pd.StringDtype):
+        return f"string[{dtype.storage}]"
+    return str(dtype)
+
+
+@dataclass
+class DtypeConversion:
+    """:func:`optimize_dtypes` で変換した列の変換前のdtypeとメモリ使用量"""
+
+    original_dtypes: Dict[str, Any] = field(default_factory=dict)  # CSVでのdtype
+    converted: Dict[str, str] = field(default_factory=dict)  # "object -> category" など
+    original_nbytes: int = 0  # 変換した列の変換前のメモリ使用量（deep）
+    optimized_nbytes: int = 0  # 変換した列の変換後のメモリ使用量（deep）
+
+
+def optimize_dtypes(
+    df: pd.DataFrame, backend: str = "numpy"
+) -> Tuple[pd.DataFrame, DtypeConversion]:
+    """メモリ使用量の少ないdtypeに変換したDataFrameと、変換した列の元のdtype
+
+      - 整数列は値の範囲に収まる最小の整数型（値は変わらない）
+      - 文字列（object）列はユニーク数の割合が ``CATEGORY_MAX_RATIO`` 以下なら
+        category、それ以外は ``backend="pyarrow"`` の場合 ``string[pyarrow]``
+
+    浮動小数点列はfloat32にすると平均・分散などの集計結果が変わるため変換しない。
+    変換済みのDataFrameに適用しても何も変わらない。
+    """
+    conversion = DtypeConversion()
+    columns: Dict[str, pd.Series] = {}
+    for column, dtype in df.dtypes.items():
+        series = df[column]
+        if is_integer_dtype(dtype):
+            result = pd.to_numeric(series, downcast="integer")
+        elif is_object_dtype(dtype):
+            # 欠損数・ユニーク数を1回のハッシュで求める
+            codes, uniques = pd.factorize(series)
+            non_null = np.count_nonzero(codes >= 0)
+            if non_null and len(uniques) <= CATEGORY_MAX_RATIO * non_null:
+                result = series.astype("category")
+            elif (
+                backend == "pyarrow"
+                and pd.api.types.infer_dtype(series, skipna=True) == "string"
+            ):
+                result = series.astype("string[pyarrow]")
+            else:
+                continue
+        else:
+            continue
+        if result.dtype != dtype:
+            columns[column] = result
+            conversion.original_dtypes[column] = dtype
+            conversion.converted[str(column)] = (
+                f"{dtype} -> {_dtype_name(result.dtype)}"
+            )
+
+    if not columns:
+        return df, conversion
+    optimized = df.copy(deep=False)
+    for column, series in columns.items():
+        optimized[column] = series
+    # 変換しなかった列は変換前後で同じなので、変換した列だけを計測する
+    conversion.original_nbytes = int(
+        df[list(columns)].memory_usage(index=False, deep=True).sum()
+    )
+    conversion.optimized_nbytes = int(
+        optimized[list(columns)].memory_usage(index=False, deep=True).sum()
+    )
+    return optimized, conversion
+
+
+def restore_dtypes(df: pd.DataFrame, dtypes: Mapping[str, Any]) -> pd.DataFrame:
+    """:func:`optimize_dtypes` で変換した列を ``dtypes`` （変換前のdtype）に戻す"""
+    columns = [
+        column
+        for column, dtype in dtypes.items()
+        if column in df.columns and df[column].dtype != dtype
+    ]
+    if not columns:
+        return df
+    restored = df.copy(deep=False)
+    for column in columns:
+        series = restored[column]
+        # 欠損はCSVを読んだ場合と同じくNaNにする（string型ではpd.NAになるため）
+        restored[column] = (
+            series.to_numpy(dtype=object, na_value=np.nan)
+            if isinstance(series.dtype, pd.StringDtype)
+            else series.to_numpy(dtype=dtypes[column])
+        )
+    return restored
@@ -0,0 +1,204 @@
+"""Duplicate row detection on row hashes with bounded memory."""
+
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from .dataclass import DuplicateGroup
+from .serialization import frame_records
+from .sketches import HyperLogLog
+
+DEFAULT_HASH_MEMORY_BYTES = 256 * 1024 * 1024
+_BUCKET_BITS = 8
+
+
+def row_hashes(chunk: pd.DataFrame) -> np.ndarray:
+    """各行をuint64ハッシュに変換する
+
+    数値はfloat64、boolはobjectに揃えてからハッシュするため、チャンクごとに
+    推定されたdtypeが異なっても同じ行は同じハッシュになる。
+    """
+    normalized = {}
+    for column in chunk.columns:
+        series = chunk[column]
+        if is_bool_dtype(series.dtype):
+            series = series.astype(object)
+        elif is_numeric_dtype(series.dtype):
+            series = series.astype("float64")
+        normalized[column] = series
+    return pd.util.hash_pandas_object(
+        pd.DataFrame(normalized, index=chunk.index), index=False
+    ).to_numpy()
+
+
+class DuplicateCounter:
+    """行ハッシュから重複行（2回目以降の出現）を数える
+
+    既出ハッシュはソート済みのuint64配列としてメモリに保持し、
+    ``max_memory_bytes`` を超えたら上位ビットで分割したバケットファイルに
+    書き出して、最後にバケットごとに集計する。64bitハッシュのため、
+    衝突による誤検出は実用上無視できる。
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = DEFAULT_HASH_MEMORY_BYTES,
+        spill_dir: Optional[Path] = None,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir
+        self.total_rows = 0
+        self.duplicate_rows = 0
+        self._seen = np.empty(0, dtype=np.uint64)
+        self.spilled_once = False
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self._buckets: List[Path] = []
+
+    @property
+    def spilled(self) -> bool:
+        """既出ハッシュをディスクに書き出し中か"""
+        return self._tmp is not None
+
+    def update(self, hashes: np.ndarray) -> np.ndarray:
+        """ハッシュを追加し、このチャンクで重複と判定された行の位置を返す
+
+        ディスクに書き出した後は最終集計まで判定できないため空配列を返す。
+        """
+        self.total_rows += len(hashes)
+        if self.spilled:
+            self._append_to_buckets(hashes)
+            return np.empty(0, dtype=np.intp)
+
+        unique, first_positions, inverse = np.unique(
+            hashes, return_index=True, return_inverse=True
+        )
+        seen_before = _contains(self._seen, unique)
+        # 既出のハッシュは全ての出現、初出のハッシュは2回目以降の出現が重複
+        is_duplicate = seen_before[inverse.ravel()]
+        repeated = np.ones(len(hashes), dtype=bool)
+        repeated[first_positions] = False
+        is_duplicate |= repeated
+        self.duplicate_rows += int(is_duplicate.sum())
+
+        self._seen = np.union1d(self._seen, unique[~seen_before])
+        if self._seen.nbytes > self.max_memory_bytes:
+            self._spill()
+        return np.flatnonzero(is_duplicate)
+
+    def finish(self) -> int:
+        """重複行数を確定して返す"""
+        if self.spilled:
+            # 書き出し前の重複は確定済み。バケットには既出ハッシュ（重複なし）と
+            # 書き出し後の全ハッシュが入っているので、その重複を加える
+            for bucket in self._buckets:
+                hashes = np.fromfile(bucket, dtype=np.uint64)
+                if len(hashes):
+                    self.duplicate_rows += len(hashes) - len(np.unique(hashes))
+            self._tmp.cleanup()
+            self._tmp = None
+        return self.duplicate_rows
+
+    def _spill(self) -> None:
+        self.spilled_once = True
+        self._tmp = tempfile.TemporaryDirectory(
+            prefix="mcp-duplicates-", dir=self.spill_dir
+        )
+        root = Path(self._tmp.name)
+        self._buckets = [root / f"{i:03d}.bin" for i in range(1 << _BUCKET_BITS)]
+        # 既出ハッシュもバケットに移し、以降の重複は最終集計で数える
+        self._append_to_buckets(self._seen)
+        self._seen = np.empty(0, dtype=np.uint64)
+
+    def _append_to_buckets(self, hashes: np.ndarray) -> None:
+        bucket_ids = (hashes >> np.uint64(64 - _BUCKET_BITS)).astype(np.intp)
+        order = np.argsort(bucket_ids, kind="stable")
+        boundaries = np.searchsorted(
+            bucket_ids[order], np.arange(len(self._buckets) + 1)
+        )
+        for bucket, start, stop in zip(self._buckets, boundaries, boundaries[1:]):
+            if stop > start:
+                with open(bucket, "ab") as f:
+                    hashes[order[start:stop]].tofile(f)
+
+
+def _contains(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """ソート済み配列に各値が含まれるか"""
+    if not len(sorted_values):
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_values, values)
+    positions[positions == len(sorted_values)] = 0
+    return sorted_values[positions] == values
+
+
+def count_duplicate_rows(df: pd.DataFrame) -> int:
+    """メモリ上のDataFrameの重複行数（``df.duplicated().sum()`` 相当）"""
+    hashes = row_hashes(df)
+    return int(len(hashes) - len(np.unique(hashes)))
+
+
+def estimate_duplicate_rows(
+    chunks: Iterable[pd.DataFrame], precision: int = 14
+) -> Tuple[int, int, float]:
+    """HyperLogLogで異なる行数を推定し、重複行数を近似する（メモリはスケッチのみ）
+
+    Returns:
+        (総行数, 推定重複行数, 異なる行数の相対標準誤差)
+    """
+    sketch = HyperLogLog(precision)
+    total_rows = 0
+    for chunk in chunks:
+        total_rows += len(chunk)
+        sketch.add_hashes(row_hashes(chunk))
+    distinct = min(sketch.estimate(), total_rows)
+    return total_rows, total_rows - distinct, sketch.relative_error
+
+
+def collect_duplicate_groups(
+    chunks: Callable[[], Iterable[pd.DataFrame]],
+    counter: DuplicateCounter,
+    max_groups: int,
+    rows_per_group: int = 5,
+) -> List[DuplicateGroup]:
+    """重複行を数えながら、重複グループを最大 ``max_groups`` 個集める
+
+    1回目の走査で ``counter`` を更新しつつ重複ハッシュを選び、重複があれば
+    2回目の走査でそのハッシュを持つ行の位置（先頭 ``rows_per_group`` 個）と
+    値を集める。ハッシュをディスクに書き出した後に初めて現れた重複は
+    サンプルの対象外になる。
+    """
+    targets: List[int] = []
+    for chunk in chunks():
+        hashes = row_hashes(chunk)
+        duplicated = hashes[counter.update(hashes)]
+        if len(targets) < max_groups and len(duplicated):
+            _, first = np.unique(duplicated, return_index=True)
+            for value in duplicated[np.sort(first)]:
+                if len(targets) == max_groups:
+                    break
+                if int(value) not in targets:
+                    targets.append(int(value))
+    counter.finish()
+
+    if not targets:
+        return []
+
+    groups = {h: DuplicateGroup(count=0, row_indices=[], values={}) for h in targets}
+    target_array = np.array(targets, dtype=np.uint64)
+    position = 0
+    for chunk in chunks():
+        hashes = row_hashes(chunk)
+        for offset in np.flatnonzero(np.isin(hashes, target_array)):
+            group = groups[int(hashes[offset])]
+            group.count += 1
+            if len(group.row_indices) < rows_per_group:
+                group.row_indices.append(position + int(offset))
+            if not group.values:
+                group.values = frame_records(chunk.iloc[[offset]])[0]
+        position += len(chunk)
+    return [groups[h] for h in targets]
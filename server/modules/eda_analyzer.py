@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
+import time
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
+from .catalog import DEFAULT_PAGE_SIZE, DatasetCatalog
 from .dataclass import (
     ColumnInfoOutput,
     ColumnSummary,
@@ -16,122 +18,243 @@ from .dataclass import (
     MissingValuesOutput,
     MissingValueSummary,
     PreviewCSVOutput,
+    RefreshProfileOutput,
 )
-
-
-def _ensure_serializable(values: Iterable) -> List[Optional[object]]:
-    """Convert values to JSON-serializable format."""
-    import numpy as np
-
-    serializable: List[Optional[object]] = []
-    for value in values:
-        if pd.isna(value):
-            serializable.append(None)
-        elif isinstance(value, (np.integer, np.floating)):
-            # Convert numpy numeric types to Python types
-            serializable.append(value.item())
-        elif isinstance(value, np.ndarray):
-            # Convert numpy arrays to lists
-            serializable.append(value.tolist())
-        else:
-            serializable.append(value)
-    return serializable
+from .loader import DatasetLoader
+from .profile_store import DatasetProfiler
+from .serialization import (
+    check_format,
+    frame_columns,
+    frame_matrix,
+    frame_records,
+    frame_rows,
+)
+from .sketches import hll_relative_error
+from .streaming_stats import StreamingProfile
 
 
 class EDAAnalyzer:
     """探索的データ分析のメインクラス"""
 
-    def __init__(self, data_root: Path):
+    def __init__(self, data_root: Path, loader: Optional[DatasetLoader] = None):
         self.data_root = data_root
+        self.loader = loader if loader is not None else DatasetLoader(data_root)
+        self.profiler = DatasetProfiler(self.loader)
+        self.catalog = DatasetCatalog(data_root, self.loader.cache_dir)
 
     def _resolve_csv_path(self, path: str) -> Path:
         """CSVパスの解決"""
-        csv_path = Path(path)
-        if not csv_path.is_absolute():
-            csv_path = self.data_root / csv_path
-
-        try:
-            csv_path = csv_path.resolve(strict=True)
-        except FileNotFoundError as exc:
-            raise FileNotFoundError(f"CSV file not found: {path}") from exc
-
-        if self.data_root not in csv_path.parents and csv_path != self.data_root:
-            raise ValueError("CSV path must be located within the data directory")
-
-        return csv_path
-
-    def list_datasets(self) -> ListDatasetsOutput:
-        """データディレクトリ下の利用可能なCSVファイルをリスト"""
-        datasets: List[str] = []
-        if self.data_root.exists():
-            for csv_file in sorted(self.data_root.rglob("*.csv")):
-                try:
-                    datasets.append(str(csv_file.relative_to(self.data_root)))
-                except ValueError:
-                    datasets.append(str(csv_file))
-        return ListDatasetsOutput(data_root=str(self.data_root), datasets=datasets)
-
-    def preview_csv(self, path: str, n_rows: int = 5) -> PreviewCSVOutput:
-        """CSVファイルの最初のn行を返す"""
+        return self.loader.resolve(path)
+
+    def _use_streaming(self, csv_path: Path, streaming: Optional[bool]) -> bool:
+        if streaming is not None:
+            return streaming
+        return self.loader.should_stream(csv_path)
+
+    def _streaming_profile(
+        self, csv_path: Path, distinct_precision: Optional[int] = None
+    ) -> StreamingProfile:
+        """チャンク単位で読み込みながらカラムごとの集計を行う"""
+        return StreamingProfile.from_chunks(
+            self.loader.iter_chunks(csv_path), distinct_precision=distinct_precision
+        )
+
+    def list_datasets(
+        self,
+        pattern: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = DEFAULT_PAGE_SIZE,
+        refresh: bool = False,
+    ) -> ListDatasetsOutput:
+        """データディレクトリ下の利用可能なCSVファイルをリスト（カタログの索引から）
+
+        Args:
+            pattern: data_rootからの相対パスに対するglobパターン
+            offset: 先頭から読み飛ばす件数
+            limit: 返す最大件数（Noneの場合は全件）
+            refresh: 返す前にディレクトリを走査して索引を更新するか
+        """
+        return self.catalog.list_datasets(pattern, offset, limit, refresh)
+
+    def preview_csv(
+        self,
+        path: str,
+        n_rows: int = 5,
+        mode: str = "head",
+        random_state: Optional[int] = 42,
+        format: str = "records",
+    ) -> PreviewCSVOutput:
+        """CSVファイルのn行を返す（ファイル全体は読み込まない）
+
+        Args:
+            path: CSVファイルパス
+            n_rows: 返す行数
+            mode: "head"（先頭）、"tail"（末尾）、"sample"（無作為抽出）
+            random_state: mode="sample" の乱数シード
+            format: "records"（行ごとの辞書）、"columnar"（列名 → 値のリスト）
+        """
+        check_format(format)
         csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
-        preview_df = df.head(n_rows).where(lambda d: ~d.isna(), other=None)
-        rows: List[Dict[str, Optional[Any]]] = preview_df.to_dict(orient="records")
+        if mode == "head":
+            df = self.loader.head(csv_path, n_rows)
+        elif mode == "tail":
+            df = self.loader.tail(csv_path, n_rows)
+        elif mode == "sample":
+            df = self.loader.sample(csv_path, n_rows, random_state=random_state)
+        else:
+            raise ValueError(f"Unsupported preview mode: {mode}")
+
+        columnar = format == "columnar"
+        rows: List[Dict[str, Optional[Any]]] = [] if columnar else frame_records(df)
         return PreviewCSVOutput(
             path=str(csv_path),
-            n_rows=len(preview_df),
-            columns=preview_df.columns.tolist(),
+            n_rows=len(df),
+            columns=df.columns.tolist(),
             rows=rows,
+            mode=mode,
+            format=format,
+            data=frame_columns(df) if columnar else None,
         )
 
-    def column_info(self, path: str) -> ColumnInfoOutput:
-        """各カラムのdtypeと基本統計を返す"""
+    def column_info(
+        self,
+        path: str,
+        streaming: Optional[bool] = None,
+        approximate: bool = False,
+        precision: int = 14,
+    ) -> ColumnInfoOutput:
+        """各カラムのdtypeと基本統計を返す
+
+        近似モード以外はプロファイルストアに保存した統計量から返す。
+
+        Args:
+            path: CSVファイルパス
+            streaming: プロファイルをチャンク単位で集計して作成するか
+                （Noneの場合はファイルサイズで判断）
+            approximate: uniqueをHyperLogLogで近似するか（スケッチはカラムごとに保存）
+            precision: HyperLogLogの精度（レジスタ数は2**precision）
+        """
         csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
+        if not approximate:
+            # 保存済みのプロファイルから返す（なければ作成して保存）
+            profile = self.profiler.get(csv_path, streaming)
+            return ColumnInfoOutput(
+                path=str(csv_path),
+                columns={
+                    column: ColumnSummary(
+                        dtype=info.dtype,
+                        non_null=info.non_null,
+                        null=info.null,
+                        unique=info.unique,
+                    )
+                    for column, info in profile.columns.items()
+                },
+            )
 
+        relative_error = hll_relative_error(precision)
+        if self._use_streaming(csv_path, streaming):
+            profile = self._streaming_profile(csv_path, distinct_precision=precision)
+            self.loader.save_distinct_sketches(
+                csv_path, {column: acc.hll for column, acc in profile.columns.items()}
+            )
+            return ColumnInfoOutput(
+                path=str(csv_path),
+                columns={
+                    column: ColumnSummary(
+                        dtype=str(acc.dtype),
+                        non_null=acc.count,
+                        null=acc.nulls,
+                        unique=acc.unique,
+                    )
+                    for column, acc in profile.columns.items()
+                },
+                unique_relative_error=relative_error,
+            )
+
+        df = self.loader.load(csv_path)
+        sketches = self.loader.distinct_sketches(
+            csv_path, df.columns.tolist(), precision, frame=df
+        )
+        source_dtypes = self.loader.source_dtypes(csv_path)
         info: Dict[str, ColumnSummary] = {}
         for column in df.columns:
             series = df[column]
             info[column] = ColumnSummary(
-                dtype=str(series.dtype),
+                dtype=source_dtypes.get(column, str(series.dtype)),
                 non_null=int(series.notna().sum()),
                 null=int(series.isna().sum()),
-                unique=int(series.nunique(dropna=True)),
+                unique=int(sketches[column].estimate()),
             )
-        return ColumnInfoOutput(path=str(csv_path), columns=info)
+        return ColumnInfoOutput(
+            path=str(csv_path), columns=info, unique_relative_error=relative_error
+        )
+
+    def missing_values(
+        self, path: str, streaming: Optional[bool] = None
+    ) -> MissingValuesOutput:
+        """欠損値の数と比率をサマリー（プロファイルストアから返す）
 
-    def missing_values(self, path: str) -> MissingValuesOutput:
-        """欠損値の数と比率をサマリー"""
+        Args:
+            path: CSVファイルパス
+            streaming: プロファイルをチャンク単位で集計して作成するか
+                （Noneの場合はファイルサイズで判断）
+        """
         csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
+        profile = self.profiler.get(csv_path, streaming)
+        total_rows = profile.n_rows
 
-        total_rows = len(df)
         summary: Dict[str, MissingValueSummary] = {}
-        for column, count in df.isna().sum().items():
+        for column, info in profile.columns.items():
             summary[column] = MissingValueSummary(
-                missing=int(count),
-                ratio=float(count / total_rows) if total_rows else 0.0,
+                missing=info.null,
+                ratio=float(info.null / total_rows) if total_rows else 0.0,
             )
         return MissingValuesOutput(
             path=str(csv_path), summary=summary, n_rows=total_rows
         )
 
-    def describe_csv(self, path: str) -> DescribeCSVOutput:
-        """CSVファイルの記述統計を返す"""
-        csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
-        describe_df = df.describe(include="all").transpose()
-        describe: Dict[str, Dict[str, Optional[Any]]] = {}
-        for column, stats in describe_df.iterrows():
-            describe[column] = {
-                key: (None if pd.isna(value) else _ensure_serializable([value])[0])
-                for key, value in stats.items()
-            }
+    def describe_csv(
+        self, path: str, streaming: Optional[bool] = None
+    ) -> DescribeCSVOutput:
+        """CSVファイルの記述統計を返す
 
+        統計量はプロファイルストアに保存して再利用する。プロファイルを
+        ストリーミング集計で作成した場合、分位点（25%/50%/75%）と、異なり値の
+        多い列の unique/top/freq はスケッチによる近似値になる。
+
+        Args:
+            path: CSVファイルパス
+            streaming: プロファイルをチャンク単位で集計して作成するか
+                （Noneの場合はファイルサイズで判断）
+        """
+        csv_path = self._resolve_csv_path(path)
+        profile = self.profiler.get(csv_path, streaming)
         return DescribeCSVOutput(
             path=str(csv_path),
-            shape=list(df.shape),
-            describe=describe,
+            shape=[profile.n_rows, len(profile.columns)],
+            describe={
+                column: info.describe for column, info in profile.columns.items()
+            },
+        )
+
+    def refresh_profile(
+        self, path: str, streaming: Optional[bool] = None
+    ) -> RefreshProfileOutput:
+        """データセットのプロファイルを作り直してプロファイルストアに保存
+
+        Args:
+            path: CSVファイルパス
+            streaming: チャンク単位で集計するか（Noneの場合はファイルサイズで判断）
+        """
+        csv_path = self._resolve_csv_path(path)
+        started = time.perf_counter()
+        profile = self.profiler.refresh(csv_path, streaming)
+        return RefreshProfileOutput(
+            path=str(csv_path),
+            n_rows=profile.n_rows,
+            n_columns=len(profile.columns),
+            exact=profile.exact,
+            build_seconds=time.perf_counter() - started,
         )
 
     def correlation_matrix(
@@ -140,10 +263,22 @@ class EDAAnalyzer:
         *,
         columns: Optional[List[str]] = None,
         method: str = "pearson",
+        format: str = "records",
     ) -> CorrelationMatrixOutput:
-        """数値カラムの相関行列を計算"""
+        """数値カラムの相関行列を計算
+
+        format="columnar" の場合は列名 → 列名 → 値の辞書ではなく、
+        columns 順の2次元配列（values）で返す。
+        """
+        check_format(format)
         csv_path = self._resolve_csv_path(path)
-        df = pd.read_csv(csv_path)
+        schema = self.loader.schema(csv_path)
+        if columns:
+            # 要求されたカラムのうち存在するものだけを読み込む（不足分は後段でエラー）
+            requested = [col for col in columns if col in schema.columns]
+        else:
+            requested = schema.numeric_columns()
+        df = self.loader.load(csv_path, columns=requested)
 
         numeric_df = df.select_dtypes(include="number")
         if columns:
@@ -158,14 +293,12 @@ class EDAAnalyzer:
             raise ValueError("No numeric columns available for correlation computation")
 
         corr = numeric_df.corr(method=method)
-        matrix = {
-            column: dict(zip(corr.index, _ensure_serializable(corr[column].tolist())))
-            for column in corr.columns
-        }
-
+        columnar = format == "columnar"
         return CorrelationMatrixOutput(
             path=str(csv_path),
             columns=corr.columns.tolist(),
             method=method,
-            matrix=matrix,
+            matrix={} if columnar else frame_matrix(corr),
+            format=format,
+            values=frame_rows(corr) if columnar else None,
         )
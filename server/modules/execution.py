@@ -0,0 +1,532 @@
+"""Off-event-loop execution of blocking tool work with per-tool limits.
+
+CPU-bound analyzer methods can optionally run in a pre-warmed process pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from .dataclass import ToolExecutorStats, ToolQueueStats
+from .pagination import decode_cursor
+from .result_cache import (
+    ResultCache,
+    result_cache_bytes,
+    result_cache_disk_bytes,
+    result_key,
+    result_ttl_seconds,
+)
+
+
+def tool_workers() -> int:
+    """ツール処理に使うワーカー数
+
+    環境変数 ``MCP_TOOL_WORKERS`` で設定する（既定は ``ThreadPoolExecutor`` と同じ
+    CPU数+4、最大32）。
+    """
+    default = min(32, (os.cpu_count() or 1) + 4)
+    return int(os.environ.get("MCP_TOOL_WORKERS", default))
+
+
+def tool_concurrency_limits() -> Dict[str, int]:
+    """ツールごとの同時実行数の上限
+
+    環境変数 ``MCP_TOOL_CONCURRENCY`` に ``"data_quality_report=1,describe_csv=4"``
+    の形式で指定する。``"*=2"`` は指定のないツールの既定値になる
+    （省略時はワーカー数の半分）。
+    """
+    limits: Dict[str, int] = {}
+    for item in os.environ.get("MCP_TOOL_CONCURRENCY", "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+DEFAULT_PROCESS_TOOLS = (
+    "correlation_matrix",
+    "data_quality_report",
+    "detect_duplicates",
+    "detect_outliers",
+    "detect_outliers_batch",
+)
+
+
+DEFAULT_CACHED_TOOLS = (
+    "analyze_categorical",
+    "correlation_matrix",
+    "data_quality_report",
+    "describe_csv",
+)
+
+
+def result_cache_tools() -> Set[str]:
+    """出力を結果キャッシュに保持するツール
+
+    環境変数 ``MCP_RESULT_CACHE_TOOLS`` にカンマ区切りで指定する
+    （既定は ``DEFAULT_CACHED_TOOLS``）。
+    """
+    value = os.environ.get("MCP_RESULT_CACHE_TOOLS")
+    if value is None:
+        return set(DEFAULT_CACHED_TOOLS)
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def tool_processes() -> int:
+    """CPUバウンドなツールを実行するワーカープロセス数
+
+    環境変数 ``MCP_PROCESS_WORKERS`` で設定する（既定 0 = プロセスプールを使わず
+    すべてスレッドで実行）。
+    """
+    return int(os.environ.get("MCP_PROCESS_WORKERS", 0))
+
+
+def process_pool_tools() -> Set[str]:
+    """プロセスプールで実行するツール
+
+    環境変数 ``MCP_PROCESS_TOOLS`` にカンマ区切りで指定する
+    （既定は ``DEFAULT_PROCESS_TOOLS``）。
+    """
+    value = os.environ.get("MCP_PROCESS_TOOLS")
+    if value is None:
+        return set(DEFAULT_PROCESS_TOOLS)
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def coalescing_enabled() -> bool:
+    """環境変数 ``MCP_COALESCE_CALLS=0`` で同一呼び出しの集約を無効化できる"""
+    return os.environ.get("MCP_COALESCE_CALLS", "1") != "0"
+
+
+def _freeze(value: Any) -> Hashable:
+    """引数をハッシュ可能な形に正規化する（リストはタプル、辞書はキー順）"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(item) for item in value))
+    hash(value)
+    return value
+
+
+@functools.lru_cache(maxsize=256)
+def _signature(fn: Callable[..., Any]) -> inspect.Signature:
+    return inspect.signature(fn)
+
+
+# ワーカープロセス側のアナライザー（_init_worker で作成）
+_worker_analyzer: Any = None
+
+
+def _init_worker(analyzer_cls: type, data_root: Path) -> None:
+    """ワーカープロセスの初期化
+
+    pandas/scikit-learn/SciPyの読み込みとアナライザーの作成を起動時に済ませ、
+    最初のリクエストでその時間を払わないようにする。
+    """
+    global _worker_analyzer
+    import scipy.stats  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+
+    _worker_analyzer = analyzer_cls(data_root)
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _call_analyzer(method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """ワーカープロセスのアナライザーのメソッドを呼ぶ"""
+    return getattr(_worker_analyzer, method)(*args, **kwargs)
+
+
+class _ToolState:
+    """1ツール分のセマフォと待ち行列の計測値"""
+
+    def __init__(self, limit: int, backend: str):
+        self.limit = limit
+        self.backend = backend
+        self.semaphore = asyncio.Semaphore(limit)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.requests = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+
+class ToolExecutor:
+    """ツールのブロッキング処理をイベントループの外で実行する
+
+    重い処理はワーカープール（既定はスレッドプール）で実行し、
+    イベントループは他のクライアントのリクエストを受け付け続ける。
+    ツールごとのセマフォで同時実行数を制限するため、1つのツールへの
+    リクエストが集中してもプールを占有せず、他のツールの待ち時間は
+    増えにくい。
+
+    ``analyzer`` と ``process_workers`` を指定すると、``process_tools`` の
+    ツールのうち ``analyzer`` のメソッド呼び出しはプロセスプールで実行する。
+    ワーカーは同じクラスのアナライザーを自前で持ち、引数（パス等）だけを
+    受け取る。データセットはDataFrameをpickleして渡すのではなく、
+    呼び出し前に用意したArrow IPCのサイドカーをワーカーがメモリマップで読む。
+
+    実行中の呼び出しと同じツール・同じ引数（既定値を補った上で比較）・
+    同じデータセットのバージョンの呼び出しは、新たに実行せず実行中の
+    結果を共有する（single-flight）。``cached_tools`` のツールの出力は
+    同じキーで結果キャッシュに保持し、次回以降はワーカーを使わずに返す。
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        limits: Optional[Dict[str, int]] = None,
+        executor: Optional[Executor] = None,
+        analyzer: Any = None,
+        process_workers: Optional[int] = None,
+        process_tools: Optional[Iterable[str]] = None,
+        coalesce: Optional[bool] = None,
+        results: Optional[ResultCache] = None,
+        cached_tools: Optional[Iterable[str]] = None,
+    ):
+        self.max_workers = max_workers if max_workers is not None else tool_workers()
+        self.limits = limits if limits is not None else tool_concurrency_limits()
+        self.default_limit = self.limits.get("*", max(self.max_workers // 2, 1))
+        self.analyzer = analyzer
+        self.process_workers = (
+            process_workers if process_workers is not None else tool_processes()
+        )
+        self.process_tools = set(
+            process_tools if process_tools is not None else process_pool_tools()
+        )
+        self._executor = executor
+        self.coalesce = coalesce if coalesce is not None else coalescing_enabled()
+        if results is None:
+            results = ResultCache(
+                max_bytes=result_cache_bytes(),
+                ttl_seconds=result_ttl_seconds(),
+                disk_dir=analyzer.loader.cache_dir if analyzer is not None else None,
+                max_disk_bytes=result_cache_disk_bytes(),
+            )
+        self.results = results
+        self.cached_tools = set(
+            cached_tools if cached_tools is not None else result_cache_tools()
+        )
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._tools: Dict[str, _ToolState] = {}
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="mcp-tool"
+                    )
+        return self._executor
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            with self._lock:
+                if self._process_pool is None:
+                    # 実行中のスレッドを引き継がないようforkではなくspawnで起動する
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.process_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(type(self.analyzer), self.analyzer.data_root),
+                    )
+        return self._process_pool
+
+    def warm_up(self) -> None:
+        """ワーカープロセスをすべて起動し、初期化が終わるまで待つ
+
+        プロセスプールを使わない設定では何もしない。
+        """
+        if not self._uses_processes():
+            return
+        # アイドルなワーカーがない間はsubmitごとに新しいプロセスが起動する
+        futures = [
+            self.process_pool.submit(_worker_ready) for _ in range(self.process_workers)
+        ]
+        wait(futures)
+
+    def uses_process(self, tool: str, fn: Callable[..., Any]) -> bool:
+        """この呼び出しをプロセスプールで実行するか"""
+        return (
+            self._uses_processes()
+            and tool in self.process_tools
+            and getattr(fn, "__self__", None) is self.analyzer
+        )
+
+    async def run(self, tool: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """``fn(*args, **kwargs)`` をワーカープールで実行して結果を返す
+
+        同じ呼び出しが実行中であれば、その完了を待って同じ結果を返す。
+        """
+        cacheable = tool in self.cached_tools
+        key = (
+            self._flight_key(tool, fn, args, kwargs)
+            if self.coalesce or cacheable
+            else None
+        )
+        return await self._run(tool, fn, args, kwargs, key, cacheable)
+
+    async def run_page(
+        self,
+        tool: str,
+        fn: Callable[..., Any],
+        *args,
+        cursor: Optional[str] = None,
+        **kwargs,
+    ) -> Tuple[Any, Optional[str], int]:
+        """ページングするツールの全件の結果を返す
+
+        全件の結果は ``cached_tools`` の指定によらず結果キャッシュに保持し、
+        続きのページ（``cursor`` あり）は再計算せずキャッシュから返す。
+        戻り値は (全件の結果, カーソルに埋め込むキー, ページの先頭位置)。
+        """
+        key = self._flight_key(tool, fn, args, kwargs)
+        token = result_key(key) if key is not None and key[-1] is not None else None
+        offset = decode_cursor(cursor, token)
+        result = await self._run(tool, fn, args, kwargs, key, cacheable=True)
+        return result, token, offset
+
+    async def _run(
+        self,
+        tool: str,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        key: Optional[Hashable],
+        cacheable: bool,
+    ) -> Any:
+        state = self._state(tool, fn)
+        state.requests += 1
+
+        cache_key = path = None
+        if cacheable and key is not None and key[-1] is not None:
+            cache_key, path = result_key(key), key[-1].path
+            cached = self.results.get(cache_key)
+            if cached is None and self.results.disk_enabled:
+                loop = asyncio.get_running_loop()
+                cached = await loop.run_in_executor(
+                    self.executor, self.results.get_from_disk, cache_key
+                )
+            if cached is not None:
+                state.cache_hits += 1
+                return cached
+
+        if key is None or not self.coalesce:
+            return await self._execute(state, fn, args, kwargs, cache_key, path)
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            state.coalesced += 1
+        else:
+            flight = asyncio.ensure_future(
+                self._execute(state, fn, args, kwargs, cache_key, path)
+            )
+            self._inflight[key] = flight
+            flight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 1つの呼び出し元のキャンセルで共有中の処理を止めない
+        return await asyncio.shield(flight)
+
+    async def _execute(
+        self,
+        state: _ToolState,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        cache_key: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        state.queued += 1
+        state.max_queued = max(state.max_queued, state.queued)
+        try:
+            await state.semaphore.acquire()
+        finally:
+            state.queued -= 1
+
+        started = time.perf_counter()
+        state.wait_seconds += started - queued_at
+        state.running += 1
+        try:
+            if state.backend == "process":
+                if args and isinstance(args[0], str):
+                    await loop.run_in_executor(self.executor, self._prepare, args[0])
+                call = functools.partial(_call_analyzer, fn.__name__, args, kwargs)
+                result = await loop.run_in_executor(self.process_pool, call)
+            else:
+                result = await loop.run_in_executor(
+                    self.executor, functools.partial(fn, *args, **kwargs)
+                )
+        except BaseException:
+            state.failed += 1
+            raise
+        else:
+            state.completed += 1
+        finally:
+            state.running -= 1
+            state.run_seconds += time.perf_counter() - started
+            state.semaphore.release()
+
+        if cache_key is not None:
+            await loop.run_in_executor(
+                self.executor, self.results.put, cache_key, result, path
+            )
+        return result
+
+    def stats(self) -> ToolExecutorStats:
+        """ツールごとの待ち行列の長さ・実行数・待ち時間"""
+        with self._lock:
+            tools = dict(self._tools)
+        requests = sum(state.requests for state in tools.values())
+        coalesced = sum(state.coalesced for state in tools.values())
+        return ToolExecutorStats(
+            max_workers=self.max_workers,
+            process_workers=self.process_workers if self._uses_processes() else 0,
+            queued=sum(state.queued for state in tools.values()),
+            running=sum(state.running for state in tools.values()),
+            coalesced=coalesced,
+            dedup_rate=coalesced / requests if requests else 0.0,
+            tools={
+                name: ToolQueueStats(
+                    limit=state.limit,
+                    backend=state.backend,
+                    queued=state.queued,
+                    running=state.running,
+                    completed=state.completed,
+                    failed=state.failed,
+                    max_queued=state.max_queued,
+                    coalesced=state.coalesced,
+                    cache_hits=state.cache_hits,
+                    dedup_rate=(
+                        state.coalesced / state.requests if state.requests else 0.0
+                    ),
+                    mean_wait_seconds=(
+                        state.wait_seconds / (state.completed + state.failed)
+                        if state.completed + state.failed
+                        else 0.0
+                    ),
+                    mean_run_seconds=(
+                        state.run_seconds / (state.completed + state.failed)
+                        if state.completed + state.failed
+                        else 0.0
+                    ),
+                )
+                for name, state in sorted(tools.items())
+            },
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+    def invalidate(self, path: str) -> None:
+        """データセットの結果キャッシュを破棄（プロファイルの再構築後など）"""
+        if self.analyzer is None:
+            self.results.invalidate()
+            return
+        loader = self.analyzer.loader
+        try:
+            self.results.invalidate(str(loader.resolve(path)))
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _uses_processes(self) -> bool:
+        return self.process_workers > 0 and self.analyzer is not None
+
+    def _prepare(self, path: str) -> None:
+        """ワーカーが読み込むデータセットのサイドカーを用意する
+
+        パスの解決に失敗した場合はワーカー側で同じ例外が送出されるため、
+        ここでは無視する。
+        """
+        loader = self.analyzer.loader
+        try:
+            loader.prepare_sidecar(loader.resolve(path))
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _flight_key(
+        self,
+        tool: str,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: Dict[str, Any],
+    ) -> Optional[Hashable]:
+        """ツール名・正規化した引数・プロファイルとデータセットのバージョンからなるキー
+
+        プロファイルのバージョン（作成時刻）はプロファイルストアを共有する
+        サーバー間で共通のため、どちらかで ``refresh_profile`` を呼ぶと
+        両方のサーバー・ディスク上の古い結果が参照されなくなる。
+        引数を正規化できない場合はNone（集約しない）。
+        """
+        try:
+            bound = _signature(fn).bind(*args, **kwargs)
+        except (TypeError, ValueError):
+            return None
+        bound.apply_defaults()
+        try:
+            arguments = _freeze(bound.arguments)
+        except TypeError:
+            return None
+
+        # 実行中にファイルが更新された場合は別の呼び出しとして扱う
+        path = bound.arguments.get("path")
+        fingerprint = profile_version = None
+        if isinstance(path, str) and self.analyzer is not None:
+            loader = self.analyzer.loader
+            try:
+                fingerprint = loader.fingerprint(loader.resolve(path))
+            except (OSError, ValueError):
+                pass
+            profiler = getattr(self.analyzer, "profiler", None)
+            if fingerprint is not None and profiler is not None:
+                profile_version = profiler.store.version(fingerprint)
+        return (
+            tool,
+            getattr(fn, "__qualname__", repr(fn)),
+            arguments,
+            profile_version,
+            fingerprint,
+        )
+
+    def _state(self, tool: str, fn: Optional[Callable[..., Any]] = None) -> _ToolState:
+        with self._lock:
+            if tool not in self._tools:
+                self._tools[tool] = _ToolState(
+                    min(self.limits.get(tool, self.default_limit), self.max_workers),
+                    (
+                        "process"
+                        if fn is not None and self.uses_process(tool, fn)
+                        else "thread"
+                    ),
+                )
+            return self._tools[tool]
@@ -0,0 +1,551 @@
+"""Dataset loading shared by the EDA and data quality analyzers."""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .dataclass import DtypeOptimization
+from .dataset_cache import (
+    DatasetCache,
+    DatasetFingerprint,
+    frame_nbytes,
+    get_dataset_cache,
+)
+from .dtypes import (
+    DtypeConversion,
+    dtype_optimization_enabled,
+    optimize_dtypes,
+    restore_dtypes,
+    string_backend,
+)
+from .sidecar import SidecarStore
+from .sketches import HyperLogLog, SketchStore
+
+
+def default_cache_dir(data_root: Path) -> Path:
+    """サイドカー等を置くキャッシュディレクトリ
+
+    環境変数 ``MCP_CACHE_DIR`` があればそれを、なければ ``data_root`` と
+    同じ階層の ``.mcp_cache`` を使う。
+    """
+    return Path(os.environ.get("MCP_CACHE_DIR", data_root.parent / ".mcp_cache"))
+
+
+def streaming_threshold_bytes() -> int:
+    """このサイズを超えるCSVはチャンク単位のストリーミング集計で処理する
+
+    環境変数 ``MCP_STREAMING_THRESHOLD_MB`` で設定する（既定 512MB）。
+    """
+    return int(float(os.environ.get("MCP_STREAMING_THRESHOLD_MB", 512)) * 1024 * 1024)
+
+
+def sidecars_enabled() -> bool:
+    """環境変数 ``MCP_SIDECARS=0`` でサイドカー変換を無効化できる"""
+    return os.environ.get("MCP_SIDECARS", "1") != "0"
+
+
+SCHEMA_SNIFF_ROWS = 1000
+DEFAULT_CHUNK_ROWS = 100_000
+_TAIL_BLOCK_BYTES = 64 * 1024
+
+# 全体を読み込んだ際のdtype変換の記録（データセットキャッシュと同じくプロセス内で共有）
+_conversions: Dict[DatasetFingerprint, DtypeConversion] = {}
+_conversions_lock = threading.Lock()
+
+
+def _saved_bytes(conversion: DtypeConversion) -> int:
+    return conversion.original_nbytes - conversion.optimized_nbytes
+
+
+@dataclass
+class DatasetSchema:
+    """カラム名とpandasのdtype
+
+    ``exact`` がFalseの場合、dtypeは先頭 ``SCHEMA_SNIFF_ROWS`` 行からの推定。
+    先頭で数値と推定された列が全体では文字列になることはあっても、
+    その逆は起こらないため、数値列の候補としては常に上位集合になる。
+    """
+
+    dtypes: pd.Series
+    exact: bool
+
+    @property
+    def columns(self) -> List[str]:
+        return self.dtypes.index.tolist()
+
+    def numeric_columns(self) -> List[str]:
+        """数値列（bool列を除く）の候補"""
+        return [
+            column
+            for column, dtype in self.dtypes.items()
+            if pd.api.types.is_numeric_dtype(dtype)
+            and not pd.api.types.is_bool_dtype(dtype)
+        ]
+
+
+class DatasetLoader:
+    """データディレクトリ配下のCSVを解決・読み込みするクラス
+
+    読み込み結果は :class:`DatasetCache` に保持され、同じファイルへの
+    連続したツール呼び出しではCSVの再パースを行わない。プロセスを
+    跨いだ再利用のため、初回読み込み時にArrow IPCのサイドカーを書き出し、
+    以降はCSVの代わりにサイドカーを読む。
+
+    キャッシュに載せるDataFrameは :func:`optimize_dtypes` でメモリ使用量の
+    少ないdtype（category・小さい整数型）に変換する。サイドカーはCSVを
+    そのまま読んだ場合のdtypeで保存する。
+    """
+
+    def __init__(
+        self,
+        data_root: Path,
+        cache: Optional[DatasetCache] = None,
+        sidecars: Optional[SidecarStore] = None,
+        cache_dir: Optional[Path] = None,
+        optimize: Optional[bool] = None,
+        backend: Optional[str] = None,
+    ):
+        self.data_root = data_root
+        self.cache = cache if cache is not None else get_dataset_cache()
+        self.cache_dir = (
+            cache_dir if cache_dir is not None else default_cache_dir(data_root)
+        )
+        if sidecars is None and sidecars_enabled():
+            sidecars = SidecarStore(data_root, self.cache_dir)
+        self.sidecars = sidecars
+        self.sketches = SketchStore(self.cache_dir)
+        self._schemas: Dict[DatasetFingerprint, DatasetSchema] = {}
+        self._schemas_lock = threading.Lock()
+        self._prepare_locks: Dict[str, threading.Lock] = {}
+        self.optimize = (
+            optimize if optimize is not None else dtype_optimization_enabled()
+        )
+        self.backend = backend if backend is not None else string_backend()
+
+    def resolve(self, path: str) -> Path:
+        """CSVパスの解決"""
+        csv_path = Path(path)
+        if not csv_path.is_absolute():
+            csv_path = self.data_root / csv_path
+
+        try:
+            csv_path = csv_path.resolve(strict=True)
+        except FileNotFoundError as exc:
+            raise FileNotFoundError(f"CSV file not found: {path}") from exc
+
+        if self.data_root not in csv_path.parents and csv_path != self.data_root:
+            raise ValueError("CSV path must be located within the data directory")
+
+        return csv_path
+
+    def fingerprint(self, csv_path: Path) -> DatasetFingerprint:
+        """解決済みパスの現在のバージョンを返す"""
+        return DatasetFingerprint.from_path(csv_path)
+
+    def schema(self, csv_path: Path) -> DatasetSchema:
+        """カラム構成を返す（データセットのバージョンごとにキャッシュ）"""
+        fingerprint = self.fingerprint(csv_path)
+        with self._schemas_lock:
+            cached = self._schemas.get(fingerprint)
+        if cached is not None:
+            return cached
+
+        full = self.cache.get(fingerprint, count_miss=False)
+        arrow_schema = (
+            self.sidecars.schema(fingerprint) if self.sidecars is not None else None
+        )
+        if full is not None:
+            # 読み込み時に変換した列はCSVでのdtypeを返す
+            dtypes = full.dtypes.copy()
+            conversion = self._conversion(fingerprint)
+            if conversion is not None:
+                for column, dtype in conversion.original_dtypes.items():
+                    dtypes[column] = dtype
+            schema = DatasetSchema(dtypes=dtypes, exact=True)
+        elif arrow_schema is not None:
+            empty = arrow_schema.empty_table().to_pandas()
+            schema = DatasetSchema(dtypes=empty.dtypes, exact=True)
+        else:
+            sample = pd.read_csv(csv_path, nrows=SCHEMA_SNIFF_ROWS)
+            schema = DatasetSchema(dtypes=sample.dtypes, exact=False)
+
+        with self._schemas_lock:
+            # 同じファイルの古いバージョンのスキーマは破棄する
+            for stale in [k for k in self._schemas if k.path == fingerprint.path]:
+                del self._schemas[stale]
+            self._schemas[fingerprint] = schema
+        return schema
+
+    def load(
+        self, csv_path: Path, columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """CSVを読み込む（キャッシュ済みならそれを返す）
+
+        ``columns`` を指定すると、その列だけを読み込む。サイドカーがあれば
+        列の射影、なければ ``usecols`` でパース対象の列を絞る。
+
+        返されるDataFrameはキャッシュと共有されるため、呼び出し側で
+        変更する場合は ``copy()`` すること。
+        """
+        fingerprint = self.fingerprint(csv_path)
+        if columns is None:
+            return self.cache.get_or_load(fingerprint, lambda: self._read(fingerprint))
+
+        columns = list(dict.fromkeys(columns))
+        full = self.cache.get(fingerprint, count_miss=False)
+        if full is not None:
+            return full[columns]
+        return self.cache.get_or_load(
+            fingerprint,
+            lambda: self._read_columns(fingerprint, columns),
+            variant=("columns", tuple(columns)),
+        )
+
+    def prepare_sidecar(self, csv_path: Path) -> bool:
+        """他のプロセスが読み込めるよう、最新のサイドカーを用意する
+
+        このプロセスのキャッシュには載せず、CSVのパースは同じファイルにつき
+        1回だけ行う。サイドカーが使えない（無効・Arrowで表現できない）場合は
+        Falseを返し、読み込み側はCSVをパースする。
+        """
+        if self.sidecars is None:
+            return False
+        with self._schemas_lock:
+            lock = self._prepare_locks.setdefault(str(csv_path), threading.Lock())
+        with lock:
+            fingerprint = self.fingerprint(csv_path)
+            if self.sidecars.is_fresh(fingerprint):
+                return True
+            df = self.cache.get(fingerprint, count_miss=False)
+            if df is None:
+                df = pd.read_csv(fingerprint.path)
+            return self.sidecars.write(fingerprint, df)
+
+    def dtype_optimization(self, csv_path: Path) -> Optional[DtypeOptimization]:
+        """キャッシュ上のDataFrameのdtype変換前後のメモリ使用量
+
+        このプロセスで全体を読み込んでおらず、キャッシュにもない場合はNone。
+        """
+        fingerprint = self.fingerprint(csv_path)
+        conversion = self._conversion(fingerprint)
+        nbytes = self.cache.nbytes(fingerprint)
+        if conversion is None or nbytes is None:
+            return None
+        return DtypeOptimization(
+            original_bytes=nbytes + _saved_bytes(conversion),
+            optimized_bytes=nbytes,
+            converted=conversion.converted,
+        )
+
+    def source_dtypes(self, csv_path: Path) -> Dict[str, str]:
+        """読み込み時に変換した列のCSVでのdtype（カラム → dtype名）
+
+        プロファイルなどユーザーに見せるdtypeは変換前のものを返すために使う。
+        """
+        conversion = self._conversion(self.fingerprint(csv_path))
+        if conversion is None:
+            return {}
+        return {
+            str(column): str(dtype)
+            for column, dtype in conversion.original_dtypes.items()
+        }
+
+    def source_frame(self, csv_path: Path, df: pd.DataFrame) -> pd.DataFrame:
+        """``load`` で得たDataFrameの変換した列をCSVでのdtypeに戻す"""
+        conversion = self._conversion(self.fingerprint(csv_path))
+        if conversion is None:
+            return df
+        return restore_dtypes(df, conversion.original_dtypes)
+
+    def _conversion(self, fingerprint: DatasetFingerprint) -> Optional[DtypeConversion]:
+        with _conversions_lock:
+            return _conversions.get(fingerprint)
+
+    def _read(self, fingerprint: DatasetFingerprint) -> pd.DataFrame:
+        """サイドカーがあればそれを、なければCSVをパースしてサイドカーを作成"""
+        df = self.sidecars.read(fingerprint) if self.sidecars is not None else None
+        if df is None:
+            df = pd.read_csv(fingerprint.path)
+            if self.sidecars is not None:
+                self.sidecars.write(fingerprint, df)
+        return self._optimize(fingerprint, df, record=True)
+
+    def _read_columns(
+        self, fingerprint: DatasetFingerprint, columns: List[str]
+    ) -> pd.DataFrame:
+        """指定列だけをサイドカーまたはCSVから読み込む"""
+        df = (
+            self.sidecars.read(fingerprint, columns=columns)
+            if self.sidecars is not None
+            else None
+        )
+        if df is None:
+            # usecolsはファイル上の順序で返すため、要求された順序に並べ替える
+            df = pd.read_csv(fingerprint.path, usecols=columns)[columns]
+        return self._optimize(fingerprint, df)
+
+    def _optimize(
+        self, fingerprint: DatasetFingerprint, df: pd.DataFrame, record: bool = False
+    ) -> pd.DataFrame:
+        """キャッシュに載せる前にdtypeを変換し、変換した列の元のdtypeを記録する
+
+        ``record`` （全体の読み込み）の場合は変換前後のメモリ使用量も記録する。
+        """
+        if not self.optimize:
+            return df
+        optimized, conversion = optimize_dtypes(df, self.backend)
+        with _conversions_lock:
+            current = _conversions.get(fingerprint)
+            if record or current is None:
+                for stale in [k for k in _conversions if k.path == fingerprint.path]:
+                    del _conversions[stale]
+                # 一部の列の読み込みでは元のdtypeだけを記録する
+                _conversions[fingerprint] = (
+                    conversion
+                    if record
+                    else DtypeConversion(original_dtypes=conversion.original_dtypes)
+                )
+            else:
+                current.original_dtypes.update(conversion.original_dtypes)
+        return optimized
+
+    def memory_usage(self, csv_path: Path, df: pd.DataFrame) -> int:
+        """``load`` で得たDataFrameのCSVでのdtypeでのメモリ使用量（deep）
+
+        キャッシュ登録時に計測済みの値があれば再計算しない。読み込み時に
+        dtypeを変換した場合は、変換で減った分を加えた変換前の値を返す。
+        """
+        fingerprint = self.fingerprint(csv_path)
+        nbytes = self.cache.nbytes(fingerprint)
+        if nbytes is None:
+            nbytes = frame_nbytes(df)
+        conversion = self._conversion(fingerprint)
+        return nbytes + (_saved_bytes(conversion) if conversion is not None else 0)
+
+    def should_stream(self, csv_path: Path) -> bool:
+        """全体を読み込まずにチャンク単位で処理すべきか
+
+        既にキャッシュ済みなら不要、そうでなければファイルサイズで判断する。
+        """
+        fingerprint = self.fingerprint(csv_path)
+        if self.cache.get(fingerprint, count_miss=False) is not None:
+            return False
+        return fingerprint.size > streaming_threshold_bytes()
+
+    def iter_chunks(
+        self,
+        csv_path: Path,
+        columns: Optional[Sequence[str]] = None,
+        chunksize: int = DEFAULT_CHUNK_ROWS,
+    ) -> Iterator[pd.DataFrame]:
+        """データセットを ``chunksize`` 行ずつ読み込む
+
+        キャッシュ済みのDataFrame、サイドカーのレコードバッチ、CSVの
+        ``chunksize`` 読み込みの順に利用できるものを使う。どの場合も
+        チャンクはCSVでのdtypeで返す。
+        """
+        columns = list(dict.fromkeys(columns)) if columns is not None else None
+        fingerprint = self.fingerprint(csv_path)
+        full = self.cache.get(fingerprint, count_miss=False)
+        if full is not None:
+            if columns is not None:
+                full = full[columns]
+            conversion = self._conversion(fingerprint)
+            for start in range(0, len(full), chunksize):
+                chunk = full.iloc[start : start + chunksize]
+                if conversion is not None:
+                    chunk = restore_dtypes(chunk, conversion.original_dtypes)
+                yield chunk
+            return
+
+        table = (
+            self.sidecars.table(fingerprint, columns=columns)
+            if self.sidecars is not None
+            else None
+        )
+        if table is not None:
+            for batch in table.to_batches(max_chunksize=chunksize):
+                yield batch.to_pandas()
+            return
+
+        for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize):
+            yield chunk if columns is None else chunk[columns]
+
+    def distinct_sketches(
+        self,
+        csv_path: Path,
+        columns: Sequence[str],
+        precision: int,
+        frame: Optional[pd.DataFrame] = None,
+    ) -> Dict[str, HyperLogLog]:
+        """カラムごとのHyperLogLogを返す
+
+        保存済みのスケッチがあればそれを使い、ないカラムだけを ``frame``
+        （省略時はチャンク読み込み）から作成して保存する。
+        """
+        fingerprint = self.fingerprint(csv_path)
+        sketches = {
+            column: self.sketches.get(fingerprint, column, precision)
+            for column in columns
+        }
+        missing = [column for column, sketch in sketches.items() if sketch is None]
+        if missing:
+            built = {column: HyperLogLog(precision) for column in missing}
+            chunks = (
+                [frame[missing]]
+                if frame is not None
+                else self.iter_chunks(csv_path, columns=missing)
+            )
+            for chunk in chunks:
+                for column, sketch in built.items():
+                    sketch.update(chunk[column])
+            for column, sketch in built.items():
+                self.sketches.put(fingerprint, column, sketch)
+            sketches.update(built)
+        return sketches
+
+    def save_distinct_sketches(
+        self, csv_path: Path, sketches: Dict[str, HyperLogLog]
+    ) -> None:
+        """ストリーミング集計などで作成したスケッチを保存"""
+        fingerprint = self.fingerprint(csv_path)
+        for column, sketch in sketches.items():
+            self.sketches.put(fingerprint, column, sketch)
+
+    def head(self, csv_path: Path, n_rows: int) -> pd.DataFrame:
+        """先頭 ``n_rows`` 行だけを読み込む（ファイル全体はパースしない）"""
+        fingerprint = self.fingerprint(csv_path)
+        full = self.cache.get(fingerprint, count_miss=False)
+        if full is not None:
+            return full.head(n_rows)
+
+        table = self._sidecar_table(fingerprint)
+        if table is not None:
+            return table.slice(0, n_rows).to_pandas()
+
+        return self._align_dtypes(pd.read_csv(csv_path, nrows=n_rows), csv_path)
+
+    def tail(self, csv_path: Path, n_rows: int) -> pd.DataFrame:
+        """末尾 ``n_rows`` 行を、ファイル末尾からの逆方向スキャンで読み込む"""
+        fingerprint = self.fingerprint(csv_path)
+        full = self.cache.get(fingerprint, count_miss=False)
+        if full is not None:
+            return full.tail(n_rows)
+
+        table = self._sidecar_table(fingerprint)
+        if table is not None:
+            return table.slice(max(table.num_rows - n_rows, 0)).to_pandas()
+
+        df = self._scan_tail(csv_path, n_rows)
+        if df is None:
+            # クォート内の改行などで行単位のスキャンができない場合は
+            # チャンク単位で読み進め、末尾のチャンクだけを保持する
+            chunks: deque = deque(maxlen=2)
+            for chunk in pd.read_csv(csv_path, chunksize=max(n_rows, 1)):
+                chunks.append(chunk)
+            df = pd.concat(chunks).tail(n_rows) if chunks else pd.read_csv(csv_path)
+        return self._align_dtypes(df, csv_path)
+
+    def sample(
+        self, csv_path: Path, n_rows: int, random_state: Optional[int] = None
+    ) -> pd.DataFrame:
+        """非復元で ``n_rows`` 行を無作為抽出する（元の行順で返す）
+
+        CSVはチャンク単位で読み、各行に乱数キーを割り当てて小さい方から
+        ``n_rows`` 件を保持するリザーバーサンプリングで抽出するため、
+        メモリ使用量はチャンクサイズで抑えられる。
+        """
+        rng = np.random.default_rng(random_state)
+        fingerprint = self.fingerprint(csv_path)
+        full = self.cache.get(fingerprint, count_miss=False)
+        if full is not None:
+            positions = rng.choice(len(full), min(n_rows, len(full)), replace=False)
+            return full.iloc[np.sort(positions)]
+
+        table = self._sidecar_table(fingerprint)
+        if table is not None:
+            count = min(n_rows, table.num_rows)
+            positions = rng.choice(table.num_rows, count, replace=False)
+            return table.take(np.sort(positions)).to_pandas()
+
+        kept: Optional[pd.DataFrame] = None
+        kept_keys = np.empty(0)
+        for chunk in pd.read_csv(csv_path, chunksize=DEFAULT_CHUNK_ROWS):
+            keys = rng.random(len(chunk))
+            if kept is not None:
+                chunk = pd.concat([kept, chunk])
+                keys = np.concatenate([kept_keys, keys])
+            if len(chunk) > n_rows:
+                selected = np.argpartition(keys, n_rows)[:n_rows]
+                chunk, keys = chunk.iloc[selected], keys[selected]
+            kept, kept_keys = chunk, keys
+
+        if kept is None:
+            return pd.read_csv(csv_path)
+        return self._align_dtypes(kept.sort_index(), csv_path)
+
+    def _sidecar_table(self, fingerprint: DatasetFingerprint):
+        if self.sidecars is None:
+            return None
+        return self.sidecars.table(fingerprint)
+
+    def _align_dtypes(self, df: pd.DataFrame, csv_path: Path) -> pd.DataFrame:
+        """部分読み込みで推定されたdtypeをスキーマのdtypeに揃える
+
+        例えば先頭数行に欠損がないと整数と推定されるが、全体では
+        float64になる列をプレビューでも同じ型で返すため。
+        """
+        dtypes = self.schema(csv_path).dtypes
+        for column in df.columns:
+            target = dtypes.get(column)
+            if target is None or df[column].dtype == target:
+                continue
+            try:
+                df[column] = df[column].astype(target)
+            except (TypeError, ValueError):
+                pass
+        return df
+
+    def _scan_tail(self, csv_path: Path, n_rows: int) -> Optional[pd.DataFrame]:
+        """ファイル末尾からブロック単位で遡って末尾の行だけをパースする"""
+        with open(csv_path, "rb") as f:
+            header = f.readline()
+            header_end = f.tell()
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            buffer = b""
+            # 末尾の改行の有無にかかわらず n_rows 行分の区切りを含むまで遡る
+            while position > header_end and buffer.count(b"\n") <= n_rows:
+                read_size = min(_TAIL_BLOCK_BYTES, position - header_end)
+                position -= read_size
+                f.seek(position)
+                buffer = f.read(read_size) + buffer
+
+        lines = buffer.splitlines(keepends=True)
+        if position > header_end:
+            # 先頭はブロック境界で切れた不完全な行なので捨てる
+            lines = lines[1:]
+        lines = [line for line in lines if line.strip()][-n_rows:] if n_rows else []
+        if any(line.count(b'"') % 2 for line in lines):
+            # クォート内の改行を含むレコードは行単位では切り出せない
+            return None
+        try:
+            df = pd.read_csv(io.BytesIO(header + b"".join(lines)))
+        except (pd.errors.ParserError, UnicodeDecodeError):
+            return None
+
+        if (
+            len(df) != len(lines)
+            or df.columns.tolist() != self.schema(csv_path).columns
+        ):
+            return None
+        return df
@@ -0,0 +1,68 @@
+"""Persistence of fitted models per dataset version."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import joblib
+
+from .dataset_cache import DatasetFingerprint
+
+
+class ModelStore:
+    """学習済みモデルをデータセットのバージョン単位でディスクに保存する
+
+    ``<cache_dir>/models/<パスのハッシュ>/<mtime>_<size>/<カラムとパラメータのハッシュ>.joblib``
+    に保存し、新しいバージョンを保存する際に古いバージョンは削除する。
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.root = cache_dir / "models"
+        self._lock = threading.Lock()
+
+    def get(
+        self, fingerprint: DatasetFingerprint, column: str, params: Dict[str, Any]
+    ) -> Optional[Any]:
+        try:
+            return joblib.load(self._path(fingerprint, column, params))
+        except (FileNotFoundError, EOFError, ValueError):
+            return None
+
+    def put(
+        self,
+        fingerprint: DatasetFingerprint,
+        column: str,
+        params: Dict[str, Any],
+        model: Any,
+    ) -> None:
+        path = self._path(fingerprint, column, params)
+        with self._lock:
+            self._prune(path.parent)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, path)
+
+    def _path(
+        self, fingerprint: DatasetFingerprint, column: str, params: Dict[str, Any]
+    ) -> Path:
+        dataset_key = hashlib.sha1(fingerprint.path.encode()).hexdigest()[:16]
+        model_key = hashlib.sha1(
+            repr((str(column), sorted(params.items()))).encode()
+        ).hexdigest()[:16]
+        version = f"{fingerprint.mtime_ns}_{fingerprint.size}"
+        return self.root / dataset_key / version / f"{model_key}.joblib"
+
+    @staticmethod
+    def _prune(version_dir: Path) -> None:
+        """同じデータセットの古いバージョンのモデルを削除"""
+        if not version_dir.parent.exists():
+            return
+        for stale in version_dir.parent.iterdir():
+            if stale != version_dir:
+                shutil.rmtree(stale, ignore_errors=True)
@@ -0,0 +1,168 @@
+"""Cursor-based paging of large tool outputs held in the result cache."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import itertools
+from dataclasses import replace
+from typing import Dict, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from .dataclass import (
+    CategoricalAnalysisOutput,
+    OutlierDetectionOutput,
+    OutlierInfo,
+    PreviewCSVOutput,
+    RankedOutliers,
+)
+
+V = TypeVar("V")
+
+
+def encode_cursor(key: str, offset: int) -> str:
+    """結果キャッシュのキーと次ページの先頭位置からカーソルを作る"""
+    return base64.urlsafe_b64encode(f"{key}:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], key: Optional[str]) -> int:
+    """カーソルが指すページの先頭位置（カーソルなしは0）
+
+    カーソルは同じツール・同じ引数・同じバージョンのデータセットの結果にしか
+    使えない。引数が違う・データセットが更新された場合は ValueError。
+    """
+    if not cursor:
+        return 0
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode()).decode()
+        token, _, offset = decoded.rpartition(":")
+        start = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+    if key is None or token != key or start < 0:
+        raise ValueError(
+            "Cursor does not match these arguments or the dataset has changed; "
+            "call again without cursor"
+        )
+    return start
+
+
+def _bounds(total: int, offset: int, limit: Optional[int]) -> Tuple[int, int]:
+    start = min(offset, total)
+    stop = total if limit is None else min(start + max(limit, 0), total)
+    return start, stop
+
+
+def _next_cursor(key: Optional[str], stop: int, total: int) -> Optional[str]:
+    return encode_cursor(key, stop) if key is not None and stop < total else None
+
+
+def _slice_dict(values: Dict[str, V], start: int, stop: int) -> Dict[str, V]:
+    return dict(itertools.islice(values.items(), start, stop))
+
+
+def page_preview(
+    output: PreviewCSVOutput, key: Optional[str], offset: int, limit: Optional[int]
+) -> PreviewCSVOutput:
+    """プレビューの行を offset から limit 行だけ切り出す"""
+    start, stop = _bounds(output.n_rows, offset, limit)
+    data = output.data
+    if data is not None:
+        data = {column: values[start:stop] for column, values in data.items()}
+    return replace(
+        output,
+        rows=output.rows[start:stop],
+        data=data,
+        offset=start,
+        next_cursor=_next_cursor(key, stop, output.n_rows),
+    )
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """スコアの大きい順に上位k個の位置を返す（同点は位置の小さい順）
+
+    全体をソートせず ``np.argpartition`` でk番目のスコアを求め、
+    それ以上のスコアを持つ要素だけを並べ替える。
+    """
+    if len(scores) > k:
+        kth = scores[np.argpartition(scores, len(scores) - k)[len(scores) - k]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[: k - len(above)]
+        candidates = np.sort(np.concatenate([above, ties]))
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _ranked_order(ranked: RankedOutliers, stop: int) -> np.ndarray:
+    """先頭から ``stop`` 位までの順位（足りなければ求めて ``ranked`` に保持）
+
+    次のページに備えて、足りない場合は並べ終えた長さの2倍まで先に求める。
+    順位は決定的なので、並行して求めても同じ結果になる。
+    """
+    order = ranked.order
+    if len(order) < stop:
+        k = min(max(stop, 2 * len(order)), len(ranked.scores))
+        order = ranked.order = top_k(ranked.scores, k)
+    return order
+
+
+def outlier_page(
+    ranked: RankedOutliers, start: int = 0, stop: Optional[int] = None
+) -> OutlierDetectionOutput:
+    """順位が ``[start, stop)`` の異常値だけを ``OutlierInfo`` にした検出結果"""
+    total = len(ranked.scores)
+    stop = total if stop is None else min(stop, total)
+    positions = _ranked_order(ranked, stop)[start:stop]
+    method = ranked.summary.method
+    outliers = [
+        OutlierInfo(
+            index=int(idx), value=float(value), score=float(score), method=method
+        )
+        for idx, value, score in zip(
+            ranked.index[positions],
+            ranked.values[positions],
+            ranked.scores[positions],
+        )
+    ]
+    return replace(ranked.summary, outliers=outliers, offset=start)
+
+
+def page_outliers(
+    ranked: RankedOutliers,
+    key: Optional[str],
+    offset: int,
+    limit: Optional[int],
+) -> OutlierDetectionOutput:
+    """スコアの大きい順の異常値を offset から limit 個だけ切り出す"""
+    total = len(ranked.scores)
+    start, stop = _bounds(total, offset, limit)
+    return replace(
+        outlier_page(ranked, start, stop), next_cursor=_next_cursor(key, stop, total)
+    )
+
+
+def page_categories(
+    output: CategoricalAnalysisOutput,
+    key: Optional[str],
+    offset: int,
+    limit: Optional[int],
+) -> CategoricalAnalysisOutput:
+    """頻度の高い順のカテゴリを offset から limit 個だけ切り出す
+
+    unique_count・最頻値・エントロピーは全カテゴリから計算した値のまま。
+    """
+    info = output.info
+    total = len(info.value_counts)
+    start, stop = _bounds(total, offset, limit)
+    return replace(
+        output,
+        info=replace(
+            info,
+            value_counts=_slice_dict(info.value_counts, start, stop),
+            value_percentages=_slice_dict(info.value_percentages, start, stop),
+        ),
+        offset=start,
+        next_cursor=_next_cursor(key, stop, total),
+    )
@@ -0,0 +1,414 @@
+"""Persistent per-dataset column profiles backed by SQLite."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .dataclass import ColumnProfile, DatasetProfile
+from .dataset_cache import DatasetFingerprint, frame_nbytes
+from .duplicates import DuplicateCounter, count_duplicate_rows, row_hashes
+from .loader import DatasetLoader
+from .serialization import frame_records, to_builtin
+from .streaming_stats import StreamingProfile
+
+# 頻度を保存するカラムの異なり数の上限
+PROFILE_VALUE_COUNTS_LIMIT = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    exact INTEGER NOT NULL,
+    n_rows INTEGER NOT NULL,
+    duplicate_rows INTEGER NOT NULL,
+    memory_usage_bytes INTEGER NOT NULL,
+    built_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS columns (
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    dtype TEXT NOT NULL,
+    non_null INTEGER NOT NULL,
+    null_count INTEGER NOT NULL,
+    unique_count INTEGER NOT NULL,
+    stats TEXT NOT NULL,
+    value_counts TEXT,
+    PRIMARY KEY (path, position)
+);
+CREATE INDEX IF NOT EXISTS columns_by_name ON columns (path, name);
+"""
+
+
+def _most_frequent(value_counts: pd.Series) -> Tuple[Optional[str], int]:
+    """最頻値（同数の場合は ``Series.mode`` と同じく最小の値）とその件数"""
+    if value_counts.empty:
+        return None, 0
+    top_count = value_counts.iloc[0]
+    candidates = value_counts.index[value_counts.to_numpy() == top_count]
+    try:
+        top = min(candidates)
+    except TypeError:
+        top = candidates[0]
+    return str(top), int(top_count)
+
+
+def _nunique(df: pd.DataFrame, value_counts: Dict[str, pd.Series]) -> Dict[str, int]:
+    """カラムごとのユニーク数（欠損を除く）
+
+    数値カラムは同じdtypeの列をまとめて列方向にソートし、値が変わる位置を
+    数えることで一括計算する。集計済みの ``value_counts`` があればその長さを使う。
+    """
+    counts = {column: len(counts) for column, counts in value_counts.items()}
+    numeric_df = df.select_dtypes(include="number")
+    for dtype, columns in numeric_df.columns.groupby(numeric_df.dtypes).items():
+        values = np.sort(numeric_df[columns].to_numpy(), axis=0)
+        valid = (
+            ~np.isnan(values)
+            if values.dtype.kind == "f"
+            else np.ones_like(values, dtype=bool)
+        )
+        changes = (values[1:] != values[:-1]) & valid[1:]
+        distinct = valid[:1].sum(axis=0) + changes.sum(axis=0)
+        counts.update(zip(columns, distinct.tolist()))
+
+    others = [column for column in df.columns if column not in counts]
+    if others:
+        counts.update(df[others].nunique().to_dict())
+    return counts
+
+
+def profile_frame(
+    df: pd.DataFrame, fingerprint: DatasetFingerprint, memory_usage_bytes: int
+) -> DatasetProfile:
+    """メモリ上のDataFrameから厳密なプロファイルを作成"""
+    total_rows = len(df)
+
+    # カテゴリカルカラムの頻度はカラムごとに1回だけ集計して使い回す
+    object_columns = [
+        column
+        for column, dtype in df.dtypes.items()
+        if pd.api.types.is_object_dtype(dtype)
+    ]
+    value_counts = {column: df[column].value_counts() for column in object_columns}
+    unique_counts = _nunique(df, value_counts)
+    null_counts = df.isna().sum()
+
+    # 数値カラムの統計量はブロック単位でまとめて計算
+    numeric_df = df.select_dtypes(include=["number", "bool"])
+    numeric_stats = {
+        "mean": numeric_df.mean(),
+        "std": numeric_df.std(),
+        "min": numeric_df.min(),
+        "max": numeric_df.max(),
+    }
+    zero_counts = (numeric_df == 0).sum()
+    negative_counts = (numeric_df < 0).sum()
+
+    describe_df = (
+        df.describe(include="all").transpose() if len(df.columns) else pd.DataFrame()
+    )
+
+    # describeの結果は列単位でまとめてJSONに変換できる値にする
+    describe_rows = dict(zip(describe_df.index, frame_records(describe_df)))
+
+    columns: Dict[str, ColumnProfile] = {}
+    for column, dtype in df.dtypes.items():
+        profile = ColumnProfile(
+            dtype=str(dtype),
+            non_null=int(total_rows - null_counts[column]),
+            null=int(null_counts[column]),
+            unique=int(unique_counts[column]),
+            describe=describe_rows[column],
+        )
+        if column in numeric_df.columns:
+            all_missing = null_counts[column] == total_rows
+            profile.numeric = {
+                name: None if all_missing else float(values[column])
+                for name, values in numeric_stats.items()
+            }
+            profile.numeric["zero_count"] = int(zero_counts[column])
+            profile.numeric["negative_count"] = int(negative_counts[column])
+        if column in value_counts:
+            profile.top, profile.top_count = _most_frequent(value_counts[column])
+        if profile.unique <= PROFILE_VALUE_COUNTS_LIMIT:
+            counts = value_counts.get(column)
+            if counts is None:
+                counts = df[column].value_counts()
+            profile.value_counts = {str(k): int(v) for k, v in counts.items()}
+        columns[column] = profile
+
+    return DatasetProfile(
+        path=fingerprint.path,
+        mtime_ns=fingerprint.mtime_ns,
+        size=fingerprint.size,
+        exact=True,
+        n_rows=total_rows,
+        duplicate_rows=count_duplicate_rows(df),
+        memory_usage_bytes=int(memory_usage_bytes),
+        columns=columns,
+    )
+
+
+def profile_chunks(
+    chunks: Iterator[pd.DataFrame], fingerprint: DatasetFingerprint
+) -> DatasetProfile:
+    """チャンクを順に集計してプロファイルを作成（describeの分位点は近似値）"""
+    stream = StreamingProfile()
+    duplicates = DuplicateCounter()
+    memory_usage_bytes = 0
+    for chunk in chunks:
+        stream.update(chunk)
+        duplicates.update(row_hashes(chunk))
+        memory_usage_bytes += frame_nbytes(chunk)
+    duplicates.finish()
+
+    describe = stream.describe()
+    columns: Dict[str, ColumnProfile] = {}
+    for column, acc in stream.columns.items():
+        profile = ColumnProfile(
+            dtype=str(acc.dtype),
+            non_null=acc.count,
+            null=acc.nulls,
+            unique=acc.unique,
+            describe={
+                key: to_builtin(value) for key, value in describe[column].items()
+            },
+        )
+        if acc.has_numeric_stats:
+            profile.numeric = {
+                "mean": float(acc.mean) if acc.numeric_count else None,
+                "std": acc.std,
+                "min": acc.minimum,
+                "max": acc.maximum,
+                "zero_count": acc.zeros,
+                "negative_count": acc.negatives,
+            }
+        elif acc.value_counts or acc.heavy is not None:
+            counts = acc.counts()
+            profile.top, profile.top_count = _most_frequent(counts)
+            # Misra-Griesに切り替えた列の頻度（頻出値の下限のみ）は保存しない
+            if acc.heavy is None and len(counts) <= PROFILE_VALUE_COUNTS_LIMIT:
+                profile.value_counts = {str(k): int(v) for k, v in counts.items()}
+        columns[column] = profile
+
+    return DatasetProfile(
+        path=fingerprint.path,
+        mtime_ns=fingerprint.mtime_ns,
+        size=fingerprint.size,
+        exact=False,
+        n_rows=stream.n_rows,
+        duplicate_rows=duplicates.duplicate_rows,
+        memory_usage_bytes=memory_usage_bytes,
+        columns=columns,
+    )
+
+
+class ProfileStore:
+    """データセットのプロファイルをSQLiteに保存する
+
+    データセットごとに最新バージョン（更新時刻とサイズ）の1件だけを保持し、
+    読み込み時にバージョンが一致しないものは無視する。接続は操作ごとに
+    開くため、スレッドやプロセスをまたいで共有できる。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(
+        self, fingerprint: DatasetFingerprint, value_counts: bool = False
+    ) -> Optional[DatasetProfile]:
+        """最新のプロファイルを返す（古い・存在しない場合はNone）"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT exact, n_rows, duplicate_rows, memory_usage_bytes"
+                " FROM datasets WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (fingerprint.path, fingerprint.mtime_ns, fingerprint.size),
+            ).fetchone()
+            if row is None:
+                return None
+            column_rows = conn.execute(
+                "SELECT name, dtype, non_null, null_count, unique_count, stats, "
+                + ("value_counts" if value_counts else "NULL")
+                + " FROM columns WHERE path = ? ORDER BY position",
+                (fingerprint.path,),
+            ).fetchall()
+
+        exact, n_rows, duplicate_rows, memory_usage_bytes = row
+        return DatasetProfile(
+            path=fingerprint.path,
+            mtime_ns=fingerprint.mtime_ns,
+            size=fingerprint.size,
+            exact=bool(exact),
+            n_rows=n_rows,
+            duplicate_rows=duplicate_rows,
+            memory_usage_bytes=memory_usage_bytes,
+            columns={row[0]: self._column(row) for row in column_rows},
+        )
+
+    def version(self, fingerprint: DatasetFingerprint) -> Optional[float]:
+        """最新のプロファイルの作成時刻（ない場合はNone）
+
+        ツールの結果キャッシュのキーに含め、プロファイルを作り直した場合に
+        他のプロセスの結果も参照されなくなるようにする。
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT built_at FROM datasets"
+                " WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (fingerprint.path, fingerprint.mtime_ns, fingerprint.size),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def get_column(
+        self, fingerprint: DatasetFingerprint, column: str
+    ) -> Optional[ColumnProfile]:
+        """1カラム分のプロファイル（頻度を含む）を返す"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT c.name, c.dtype, c.non_null, c.null_count, c.unique_count,"
+                " c.stats, c.value_counts FROM columns c"
+                " JOIN datasets d ON d.path = c.path"
+                " WHERE c.path = ? AND c.name = ? AND d.mtime_ns = ? AND d.size = ?",
+                (fingerprint.path, column, fingerprint.mtime_ns, fingerprint.size),
+            ).fetchone()
+        return None if row is None else self._column(row)
+
+    def put(self, profile: DatasetProfile) -> None:
+        """プロファイルを保存（同じデータセットの古いバージョンは置き換える）"""
+        column_rows = [
+            (
+                profile.path,
+                position,
+                name,
+                column.dtype,
+                column.non_null,
+                column.null,
+                column.unique,
+                json.dumps(
+                    {
+                        "describe": column.describe,
+                        "numeric": column.numeric,
+                        "top": column.top,
+                        "top_count": column.top_count,
+                    }
+                ),
+                (
+                    json.dumps(column.value_counts)
+                    if column.value_counts is not None
+                    else None
+                ),
+            )
+            for position, (name, column) in enumerate(profile.columns.items())
+        ]
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM columns WHERE path = ?", (profile.path,))
+            conn.execute(
+                "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    profile.path,
+                    profile.mtime_ns,
+                    profile.size,
+                    int(profile.exact),
+                    profile.n_rows,
+                    profile.duplicate_rows,
+                    profile.memory_usage_bytes,
+                    time.time(),
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO columns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", column_rows
+            )
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """プロファイルを削除（pathを省略した場合は全て）"""
+        with closing(self._connect()) as conn, conn:
+            if path is None:
+                conn.execute("DELETE FROM columns")
+                conn.execute("DELETE FROM datasets")
+            else:
+                conn.execute("DELETE FROM columns WHERE path = ?", (path,))
+                conn.execute("DELETE FROM datasets WHERE path = ?", (path,))
+
+    @staticmethod
+    def _column(row: Tuple) -> ColumnProfile:
+        _, dtype, non_null, null, unique, stats, value_counts = row
+        stats = json.loads(stats)
+        return ColumnProfile(
+            dtype=dtype,
+            non_null=non_null,
+            null=null,
+            unique=unique,
+            describe=stats["describe"],
+            numeric=stats["numeric"],
+            top=stats["top"],
+            top_count=stats["top_count"],
+            value_counts=json.loads(value_counts) if value_counts else None,
+        )
+
+
+class DatasetProfiler:
+    """データセットのバージョンごとにプロファイルを1回だけ作成して再利用する"""
+
+    def __init__(self, loader: DatasetLoader, store: Optional[ProfileStore] = None):
+        self.loader = loader
+        self.store = (
+            store
+            if store is not None
+            else ProfileStore(loader.cache_dir / "profiles.sqlite3")
+        )
+
+    def get(self, csv_path: Path, streaming: Optional[bool] = None) -> DatasetProfile:
+        """保存済みのプロファイルを返す。なければ作成して保存する
+
+        ``streaming=False`` の場合、チャンク集計で作成した近似プロファイルは
+        使わずに全体を読み込んで作り直す。
+        """
+        profile = self.store.get(self.loader.fingerprint(csv_path))
+        if profile is not None and (profile.exact or streaming is not False):
+            return profile
+        return self.refresh(csv_path, streaming)
+
+    def column(self, csv_path: Path, column: str) -> Optional[ColumnProfile]:
+        """保存済みのプロファイルがあれば1カラム分を返す（作成はしない）"""
+        return self.store.get_column(self.loader.fingerprint(csv_path), column)
+
+    def refresh(
+        self, csv_path: Path, streaming: Optional[bool] = None
+    ) -> DatasetProfile:
+        """プロファイルを作り直して保存する
+
+        ``streaming`` がNoneの場合は、ファイルサイズに応じて全体の読み込みか
+        チャンク集計かを選ぶ。
+        """
+        fingerprint = self.loader.fingerprint(csv_path)
+        if streaming is None:
+            streaming = self.loader.should_stream(csv_path)
+        if streaming:
+            profile = profile_chunks(self.loader.iter_chunks(csv_path), fingerprint)
+        else:
+            df = self.loader.load(csv_path)
+            # 読み込み時にdtypeを変換した列もCSVでのdtypeで集計する
+            profile = profile_frame(
+                self.loader.source_frame(csv_path, df),
+                fingerprint,
+                self.loader.memory_usage(csv_path, df),
+            )
+        self.store.put(profile)
+        return profile
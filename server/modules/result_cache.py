@@ -0,0 +1,240 @@
+"""Memoization of tool outputs keyed by arguments and dataset version."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Hashable, Optional, Tuple
+
+from .dataclass import ResultCacheStats
+
+DEFAULT_RESULT_CACHE_MB = 64
+DEFAULT_RESULT_TTL_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    nbytes INTEGER NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+def result_cache_bytes() -> int:
+    """メモリ上の結果キャッシュの予算
+
+    環境変数 ``MCP_RESULT_CACHE_MB`` で設定する（既定 64MB、0 で無効）。
+    """
+    return int(
+        float(os.environ.get("MCP_RESULT_CACHE_MB", DEFAULT_RESULT_CACHE_MB))
+        * 1024
+        * 1024
+    )
+
+
+def result_cache_disk_bytes() -> int:
+    """ディスク上の結果キャッシュの予算
+
+    環境変数 ``MCP_RESULT_CACHE_DISK_MB`` で設定する（既定 0 = ディスクに保存しない）。
+    """
+    return int(float(os.environ.get("MCP_RESULT_CACHE_DISK_MB", 0)) * 1024 * 1024)
+
+
+def result_ttl_seconds() -> float:
+    """結果キャッシュの有効期間（秒）
+
+    環境変数 ``MCP_RESULT_CACHE_TTL_SECONDS`` で設定する（既定 3600秒）。
+    """
+    return float(
+        os.environ.get("MCP_RESULT_CACHE_TTL_SECONDS", DEFAULT_RESULT_TTL_SECONDS)
+    )
+
+
+def result_key(key: Hashable) -> str:
+    """呼び出しのキー（ツール名・引数・データセットのバージョン）のハッシュ"""
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class ResultCache:
+    """ツールの出力（dataclass）を保持するキャッシュ
+
+    キーにはデータセットのバージョン（更新時刻とサイズ）とプロファイルの
+    作成時刻を含めるため、ファイルの更新やプロファイルの作り直しの後は
+    古い結果は参照されなくなり、LRUかTTLで消える。
+    メモリ上はオブジェクトをそのまま保持し（ヒット時はコピーしない）、
+    予算はpickle後のバイト数で数える。``disk_dir`` を指定すると、メモリから
+    追い出された結果やサーバー再起動後の結果をSQLiteから読み込む。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        disk_dir: Optional[Path] = None,
+        max_disk_bytes: int = 0,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self.db_path = (
+            disk_dir / "results.sqlite3"
+            if disk_dir is not None and max_disk_bytes > 0
+            else None
+        )
+        self._entries: OrderedDict[str, Tuple[Any, str, float, int]] = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+        if self.db_path is not None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self.db_path is not None
+
+    def get(self, key: str) -> Optional[Any]:
+        """メモリ上の結果を返す（なければNone）"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] > self.ttl_seconds:
+                self._drop(key)
+                self._expired += 1
+                entry = None
+            if entry is None:
+                if not self.disk_enabled:
+                    self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def get_from_disk(self, key: str) -> Optional[Any]:
+        """ディスク上の結果を返し、メモリにも載せる（なければNone）"""
+        if not self.disk_enabled:
+            return None
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT path, created, value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                row = None
+            elif row is not None:
+                conn.execute(
+                    "UPDATE results SET accessed = ? WHERE key = ?", (now, key)
+                )
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        path, created, payload = row
+        value = pickle.loads(payload)
+        with self._lock:
+            self._disk_hits += 1
+            self._store(key, value, path, created, len(payload))
+        return value
+
+    def put(self, key: str, value: Any, path: str) -> None:
+        """結果を登録し、予算を超えた分をLRU順に追い出す"""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._store(key, value, path, now, len(payload))
+        if self.disk_enabled and len(payload) <= self.max_disk_bytes:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, path, now, now, len(payload), payload),
+                )
+                self._evict_disk(conn, now)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """指定パス（省略時は全て）の結果を破棄"""
+        with self._lock:
+            for key in [
+                key
+                for key, entry in self._entries.items()
+                if path is None or entry[1] == path
+            ]:
+                self._drop(key)
+        if self.disk_enabled:
+            with closing(self._connect()) as conn, conn:
+                if path is None:
+                    conn.execute("DELETE FROM results")
+                else:
+                    conn.execute("DELETE FROM results WHERE path = ?", (path,))
+
+    def stats(self) -> ResultCacheStats:
+        """ヒット・ミス・追い出し回数などの統計を返す"""
+        with self._lock:
+            return ResultCacheStats(
+                entries=len(self._entries),
+                current_bytes=self._current_bytes,
+                max_bytes=self.max_bytes,
+                ttl_seconds=self.ttl_seconds,
+                hits=self._hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expired=self._expired,
+                max_disk_bytes=self.max_disk_bytes if self.disk_enabled else 0,
+            )
+
+    def _store(
+        self, key: str, value: Any, path: str, created: float, nbytes: int
+    ) -> None:
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, path, created, nbytes)
+        self._current_bytes += nbytes
+        while self._current_bytes > self.max_bytes and self._entries:
+            _, (_, _, _, evicted) = self._entries.popitem(last=False)
+            self._current_bytes -= evicted
+            self._evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, _, _, nbytes = self._entries.pop(key)
+        self._current_bytes -= nbytes
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float) -> None:
+        """期限切れの結果と、予算を超えた分の古い結果を削除"""
+        conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()
+        excess = total[0] - self.max_disk_bytes
+        if excess <= 0:
+            return
+        stale = []
+        for key, nbytes in conn.execute(
+            "SELECT key, nbytes FROM results ORDER BY accessed"
+        ):
+            stale.append((key,))
+            excess -= nbytes
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
@@ -0,0 +1,96 @@
+"""Bulk conversion of pandas/NumPy data to JSON-safe Python values."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+_BUILTIN_TYPES = (str, int, float, bool, type(None))
+
+# 表形式の出力の形式
+#   records  : 行ごとの辞書のリスト（列名が行の数だけ繰り返される）
+#   columnar : 列名 → 値のリスト、相関行列は2次元配列（列名は1回だけ）
+OUTPUT_FORMATS = ("records", "columnar")
+
+
+def to_builtin(value: Any) -> Any:
+    """JSONに保存できる値に変換（欠損はNone、numpyのスカラーはPythonの型）"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return None if pd.isna(value) else str(value)
+
+
+def column_values(values: Union[pd.Series, np.ndarray]) -> List[Optional[Any]]:
+    """1列分の値をJSONに変換できる値のリストに一括で変換する
+
+    数値・bool列は ``tolist()`` でまとめてPythonの型にし、欠損の位置だけを
+    Noneに置き換える。object列などはNumPyのスカラーや日時など組み込み型
+    以外の値だけを :func:`to_builtin` で変換する。
+    """
+    if isinstance(values, pd.Series):
+        # 日時はTimestampとして取り出す（datetime64[ns]のままobjectにすると整数になる）
+        values = values.astype(object) if values.dtype.kind in "mM" else values
+        array = values.to_numpy()
+    else:
+        array = values
+    if array.dtype.kind in "biu":
+        return array.tolist()
+    if array.dtype.kind == "f":
+        result = array.tolist()
+        for i in np.flatnonzero(np.isnan(array)):
+            result[i] = None
+        return result
+
+    if array.dtype != object:
+        array = array.astype(object)
+    result = array.tolist()
+    for i in np.flatnonzero(pd.isna(array)):
+        result[i] = None
+    for i, value in enumerate(result):
+        if type(value) not in _BUILTIN_TYPES:
+            result[i] = to_builtin(value)
+    return result
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, List[Optional[Any]]]:
+    """DataFrameを列名 → 値のリストに変換"""
+    return {
+        str(column): column_values(df.iloc[:, i]) for i, column in enumerate(df.columns)
+    }
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Optional[Any]]]:
+    """DataFrameを行ごとの辞書のリストに変換（``to_dict(orient="records")`` 相当）"""
+    names = df.columns.tolist()
+    columns = [column_values(df.iloc[:, i]) for i in range(len(names))]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def frame_rows(df: pd.DataFrame) -> List[List[Optional[Any]]]:
+    """DataFrameを行ごとの値のリスト（2次元配列）に変換"""
+    columns = [column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [list(row) for row in zip(*columns)]
+
+
+def frame_matrix(df: pd.DataFrame) -> Dict[str, Dict[str, Optional[Any]]]:
+    """DataFrameを列名 → (行ラベル → 値) の辞書に変換（相関行列など）"""
+    index = df.index.tolist()
+    return {
+        column: dict(zip(index, column_values(df.iloc[:, i])))
+        for i, column in enumerate(df.columns)
+    }
+
+
+def check_format(format: str) -> str:
+    """出力形式を検証して返す"""
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unsupported output format: {format} (expected one of {OUTPUT_FORMATS})"
+        )
+    return format
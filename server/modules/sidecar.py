@@ -0,0 +1,110 @@
+"""Columnar (Arrow IPC) sidecar files for CSV datasets."""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from .dataset_cache import DatasetFingerprint
+
+_MTIME_KEY = b"mcp_source_mtime_ns"
+_SIZE_KEY = b"mcp_source_size"
+
+
+class SidecarStore:
+    """CSVと同じ内容を持つArrow IPCファイルをキャッシュディレクトリに保持する
+
+    サイドカーは ``<cache_dir>/sidecars/<data_rootからの相対パス>.arrow`` に
+    非圧縮で書き出すため、メモリマップで読み込み・列の射影ができる。
+    元CSVの更新時刻とサイズをスキーマのメタデータに記録し、一致しない
+    サイドカーは古いものとして無視する。
+    """
+
+    def __init__(self, data_root: Path, cache_dir: Path):
+        self.data_root = data_root
+        self.root = cache_dir / "sidecars"
+
+    def sidecar_path(self, csv_path: Path) -> Path:
+        """CSVに対応するサイドカーのパス"""
+        relative = csv_path.relative_to(self.data_root)
+        return self.root / relative.parent / f"{relative.name}.arrow"
+
+    def is_fresh(self, fingerprint: DatasetFingerprint) -> bool:
+        """サイドカーが現在のCSVと一致しているか"""
+        return self.schema(fingerprint) is not None
+
+    def schema(self, fingerprint: DatasetFingerprint) -> Optional[pa.Schema]:
+        """最新のサイドカーのスキーマを返す（古い・存在しない場合はNone）"""
+        sidecar = self.sidecar_path(Path(fingerprint.path))
+        try:
+            with pa.memory_map(str(sidecar)) as source:
+                schema = pa.ipc.open_file(source).schema
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+        metadata = schema.metadata or {}
+        if metadata.get(_MTIME_KEY) != str(fingerprint.mtime_ns).encode():
+            return None
+        if metadata.get(_SIZE_KEY) != str(fingerprint.size).encode():
+            return None
+        return schema
+
+    def table(
+        self, fingerprint: DatasetFingerprint, columns: Optional[List[str]] = None
+    ) -> Optional[pa.Table]:
+        """サイドカーをメモリマップしたArrowテーブルを返す。使えない場合はNone
+
+        非圧縮のため ``slice`` や ``take`` で一部の行だけをpandasに変換できる。
+        """
+        if not self.is_fresh(fingerprint):
+            return None
+        return feather.read_table(
+            str(self.sidecar_path(Path(fingerprint.path))),
+            columns=columns,
+            memory_map=True,
+        )
+
+    def read(
+        self, fingerprint: DatasetFingerprint, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """サイドカーから（必要な列だけ）読み込む。使えない場合はNone"""
+        table = self.table(fingerprint, columns=columns)
+        return None if table is None else table.to_pandas()
+
+    def write(self, fingerprint: DatasetFingerprint, df: pd.DataFrame) -> bool:
+        """DataFrameをサイドカーとして書き出す。変換・書き込みできない場合はFalse"""
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # 型の混在したobject列などArrowで表現できないデータはCSVのまま扱う
+            return False
+
+        metadata = dict(table.schema.metadata or {})
+        metadata[_MTIME_KEY] = str(fingerprint.mtime_ns).encode()
+        metadata[_SIZE_KEY] = str(fingerprint.size).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        sidecar = self.sidecar_path(Path(fingerprint.path))
+        # 並行して同じサイドカーを書いても壊れないよう一時ファイル経由で置き換える
+        tmp_path = sidecar.with_name(
+            f".{sidecar.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            feather.write_feather(table, str(tmp_path), compression="uncompressed")
+            os.replace(tmp_path, sidecar)
+        except OSError:
+            # キャッシュディレクトリが読み取り専用・容量不足などの場合はCSVのまま扱う
+            return False
+        finally:
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+        return True
@@ -0,0 +1,340 @@
+"""Probabilistic sketches for approximate statistics."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from .dataset_cache import DatasetFingerprint
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+
+def hash_values(series: pd.Series) -> np.ndarray:
+    """値をuint64ハッシュに変換する（数値はfloat64、boolはobjectに揃えてから）
+
+    チャンクによって同じ値が int64 / float64 や、欠損の有無で bool / object と
+    異なる型で読まれても同じハッシュになるようにする。
+    """
+    if is_bool_dtype(series.dtype):
+        series = series.astype(object)
+    elif is_numeric_dtype(series.dtype):
+        series = series.astype("float64")
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+def hll_relative_error(precision: int) -> float:
+    """精度 ``precision`` のHyperLogLogの相対標準誤差"""
+    return 1.04 / np.sqrt(1 << precision)
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """uint64配列の先頭の0ビット数（二分探索をベクトル化したもの）"""
+    counts = np.zeros(len(values), dtype=np.uint8)
+    x = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = x < (np.uint64(1) << np.uint64(64 - shift))
+        counts[mask] += shift
+        x[mask] <<= np.uint64(shift)
+    counts[values == 0] = 64
+    return counts
+
+
+class HyperLogLog:
+    """異なり数を推定するHyperLogLogスケッチ
+
+    レジスタ数は ``2**precision``、相対標準誤差はおよそ
+    ``1.04 / sqrt(2**precision)``（precision=14で約0.8%、16KB）。
+    """
+
+    def __init__(self, precision: int = 14, registers: Optional[np.ndarray] = None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(
+                f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}"
+            )
+        self.precision = precision
+        self.registers = (
+            registers
+            if registers is not None
+            else np.zeros(1 << precision, dtype=np.uint8)
+        )
+
+    @property
+    def relative_error(self) -> float:
+        """推定値の相対標準誤差"""
+        return hll_relative_error(self.precision)
+
+    def update(self, series: pd.Series) -> None:
+        """欠損を除いた値をスケッチに追加"""
+        self.add_hashes(hash_values(series.dropna()))
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if not len(hashes):
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - self.precision + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # 小さい値は線形カウンティングの方が正確
+            raw = m * np.log(m / zeros)
+        return int(round(raw))
+
+
+class CountMinSketch:
+    """値の頻度を推定するCount-Minスケッチ
+
+    ``depth`` 行 × ``width`` 列のカウンタ。推定値は真の頻度以上で、
+    確率 ``1 - exp(-depth)`` 以上で過大評価は ``e / width * N`` 以下
+    （N は追加した件数の合計）。width=2**15, depth=5 で約1.3MB。
+    """
+
+    def __init__(self, width: int = 1 << 15, depth: int = 5):
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._shift = np.uint64(64 - (width.bit_length() - 1))
+        # 行ごとのハッシュ関数（奇数の乗数による乗算ハッシュ）
+        rng = np.random.default_rng(0)
+        self._multipliers = rng.integers(0, 2**63, size=depth, dtype=np.uint64) * 2 + 1
+
+    @property
+    def relative_error(self) -> float:
+        """過大評価の上限（追加した件数の合計に対する割合）"""
+        return float(np.e / self.width)
+
+    def add_hashes(self, hashes: np.ndarray, counts: np.ndarray) -> None:
+        """値のハッシュとその件数を加える"""
+        if not len(hashes):
+            return
+        for row in range(self.depth):
+            index = self._index(hashes, row)
+            self.table[row] += np.bincount(
+                index, weights=counts, minlength=self.width
+            ).astype(np.int64)
+
+    def estimate(self, hashes: np.ndarray) -> np.ndarray:
+        """値のハッシュごとの頻度の推定値"""
+        estimates = np.full(len(hashes), np.iinfo(np.int64).max, dtype=np.int64)
+        for row in range(self.depth):
+            np.minimum(
+                estimates, self.table[row][self._index(hashes, row)], out=estimates
+            )
+        return estimates
+
+    def _index(self, hashes: np.ndarray, row: int) -> np.ndarray:
+        return ((hashes * self._multipliers[row]) >> self._shift).astype(np.intp)
+
+
+class MisraGries:
+    """頻出値（heavy hitters）を ``capacity`` 個のカウンタで追跡する
+
+    チャンクの頻度表をまとめてマージし、カウンタが ``capacity`` 個を超えたら
+    ``capacity + 1`` 番目の値を全カウンタから引いて正のものだけ残す
+    （Agarwal et al. の mergeable summaries）。カウンタは真の頻度の下限で、
+    不足分は ``decrement`` 以下（N / (capacity + 1) 以下）。頻度が
+    N / (capacity + 1) を超える値は必ずカウンタに残る。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.decrement = 0
+
+    @property
+    def exact(self) -> bool:
+        """まだ一度も引いていない（すべての値を正確に数えている）か"""
+        return self.decrement == 0
+
+    def update(self, counts: pd.Series) -> None:
+        """値 → 件数の頻度表を加える"""
+        merged = counts if self.counts.empty else self.counts.add(counts, fill_value=0)
+        if len(merged) > self.capacity:
+            kth = int(merged.nlargest(self.capacity + 1).iloc[-1])
+            merged = merged[merged > kth] - kth
+            self.decrement += kth
+        self.counts = merged.astype("int64")
+
+
+class CategoricalSketch:
+    """カテゴリ列の頻出値・頻度・異なり数・エントロピーを1パスで推定する
+
+    件数・カテゴリ数によらずメモリは一定（チャンク内の頻度表を除く）。
+
+      - Misra-Gries : 頻出値の候補と頻度の下限
+      - Count-Min   : 頻度の推定値（過大評価のみ）
+      - HyperLogLog : 異なり数
+
+    Misra-Griesが一度も引いていない場合（カテゴリ数が ``capacity`` 以下）は
+    頻度・異なり数・エントロピーはすべて正確な値になる。
+    """
+
+    def __init__(
+        self,
+        top_k: int = 100,
+        precision: int = 14,
+        capacity: Optional[int] = None,
+        width: int = 1 << 15,
+        depth: int = 5,
+    ):
+        self.top_k = max(top_k, 1)
+        self.total = 0
+        self.heavy = MisraGries(capacity or max(10 * self.top_k, 1024))
+        self.frequencies = CountMinSketch(width, depth)
+        self.distinct = HyperLogLog(precision)
+
+    @property
+    def exact(self) -> bool:
+        return self.heavy.exact
+
+    @property
+    def count_error(self) -> int:
+        """頻度の推定値の過大評価の上限（Count-Minは確率 1 - exp(-depth) で成立）"""
+        if self.exact:
+            return 0
+        return min(
+            self.heavy.decrement,
+            int(np.ceil(self.frequencies.relative_error * self.total)),
+        )
+
+    def update(self, series: pd.Series) -> None:
+        """チャンクの値（欠損は除く）を追加"""
+        values = series.dropna()
+        if values.empty:
+            return
+        self.total += len(values)
+        counts = values.value_counts(sort=False)
+        hashes = hash_values(pd.Series(counts.index))
+        self.heavy.update(counts)
+        self.frequencies.add_hashes(hashes, counts.to_numpy(dtype=np.float64))
+        self.distinct.add_hashes(hashes)
+
+    def unique_count(self) -> int:
+        if self.exact:
+            return len(self.heavy.counts)
+        return max(self.distinct.estimate(), len(self.heavy.counts))
+
+    def top(self) -> pd.Series:
+        """頻度の推定値の大きい順に上位 ``top_k`` 個（値 → 推定頻度）"""
+        return self._estimates().head(self.top_k)
+
+    def _estimates(self) -> pd.Series:
+        """Misra-Griesが追跡しているすべての値の頻度の推定値（大きい順）
+
+        推定値は Count-Min の推定値と Misra-Gries の上限の小さい方。
+        """
+        counts = self.heavy.counts
+        if counts.empty:
+            return counts
+        if not self.exact:
+            estimates = self.frequencies.estimate(hash_values(pd.Series(counts.index)))
+            upper = counts.to_numpy() + self.heavy.decrement
+            counts = pd.Series(np.minimum(estimates, upper), index=counts.index)
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def entropy(self) -> Tuple[float, float, float]:
+        """エントロピー（bit）の推定値と (下限, 上限)
+
+        追跡中の値の頻度を推定値とみなし、残りの確率 r を HyperLogLog の異なり数から
+        求めた残りのカテゴリ数 m に一様に配分した値を推定値とする。
+        上限は m を異なり数の誤差（2σ）だけ多く見積もった一様配分、
+        下限は残りの各カテゴリの確率が上位の最小値以下であることから
+        r * log2(1 / p_min)（p_min は追跡中の値の最小の確率）。
+        正確に数えている場合は3つとも同じ値。
+        """
+        if self.exact:
+            p = self.heavy.counts.to_numpy(dtype=np.float64) / max(self.total, 1)
+            value = float(np.sum(-p * np.log2(p)))
+            return value, value, value
+
+        head = self._estimates().to_numpy(dtype=np.float64)
+        p = head / self.total
+        head_entropy = float(np.sum(-p * np.log2(p)))
+        rest = max(1.0 - float(p.sum()), 0.0)
+        if rest <= 0.0:
+            return head_entropy, head_entropy, head_entropy
+
+        def uniform(categories: float) -> float:
+            # 各カテゴリは1件以上なので、残りの件数より多くはならない
+            categories = min(max(categories, 1.0), rest * self.total)
+            return rest * float(np.log2(categories / rest))
+
+        distinct = self.distinct.estimate()
+        estimate = head_entropy + uniform(distinct - len(head))
+        upper = head_entropy + uniform(
+            distinct * (1 + 2 * self.distinct.relative_error) - len(head)
+        )
+        lower = head_entropy + rest * float(np.log2(1 / min(p[-1], rest)))
+        return min(max(estimate, lower), upper), lower, max(upper, lower)
+
+
+class SketchStore:
+    """カラムごとのHyperLogLogをデータセットのバージョン単位でディスクに保存する
+
+    ``<cache_dir>/sketches/<パスのハッシュ>/<mtime>_<size>/p<precision>_<カラムのハッシュ>.npy``
+    に保存し、新しいバージョンを保存する際に古いバージョンは削除する。
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.root = cache_dir / "sketches"
+        self._lock = threading.Lock()
+
+    def get(
+        self, fingerprint: DatasetFingerprint, column: str, precision: int
+    ) -> Optional[HyperLogLog]:
+        try:
+            registers = np.load(self._path(fingerprint, column, precision))
+        except (FileNotFoundError, ValueError):
+            return None
+        return HyperLogLog(precision, registers=registers)
+
+    def put(
+        self, fingerprint: DatasetFingerprint, column: str, sketch: HyperLogLog
+    ) -> None:
+        path = self._path(fingerprint, column, sketch.precision)
+        with self._lock:
+            self._prune(path.parent)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, sketch.registers)
+            os.replace(tmp_path, path)
+
+    def _path(
+        self, fingerprint: DatasetFingerprint, column: str, precision: int
+    ) -> Path:
+        dataset_key = hashlib.sha1(fingerprint.path.encode()).hexdigest()[:16]
+        column_key = hashlib.sha1(str(column).encode()).hexdigest()[:16]
+        version = f"{fingerprint.mtime_ns}_{fingerprint.size}"
+        return self.root / dataset_key / version / f"p{precision}_{column_key}.npy"
+
+    @staticmethod
+    def _prune(version_dir: Path) -> None:
+        """同じデータセットの古いバージョンのスケッチを削除"""
+        if not version_dir.parent.exists():
+            return
+        for stale in version_dir.parent.iterdir():
+            if stale != version_dir:
+                shutil.rmtree(stale, ignore_errors=True)
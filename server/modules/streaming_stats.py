@@ -0,0 +1,377 @@
+"""Chunked column statistics with mergeable partial aggregates."""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from .sketches import HyperLogLog, MisraGries, hash_values
+
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+# カラムごとに正確に数える異なり値の数の上限（超えたらスケッチで近似する）
+EXACT_DISTINCT_LIMIT = 1 << 16
+# 上限を超えて異なり数を近似する場合のHyperLogLogの精度
+FALLBACK_PRECISION = 14
+
+
+def combine_dtypes(left: np.dtype, right: np.dtype) -> np.dtype:
+    """チャンクごとに推定されたdtypeを、全体を一度に読んだ場合のdtypeに合わせる
+
+    数値同士は上位の型（int64 + float64 -> float64）、それ以外の組み合わせは
+    ``pd.read_csv`` と同様にobjectになる。
+    """
+    if left == right:
+        return left
+    if _is_number(left) and _is_number(right):
+        return np.result_type(left, right)
+    return np.dtype(object)
+
+
+def _is_number(dtype: np.dtype) -> bool:
+    return is_numeric_dtype(dtype) and not is_bool_dtype(dtype)
+
+
+def _has_numeric_stats(dtype: np.dtype) -> bool:
+    """平均・分散などを集計する型か（厳密なプロファイルと同じく数値とbool）"""
+    return is_numeric_dtype(dtype)
+
+
+class QuantileSketch:
+    """マージ可能な分位点スケッチ（KLL系のコンパクタ階層）
+
+    各レベルは最大 ``k`` 個の値を保持し、溢れたらソートして1つおきに
+    上位レベルへ昇格させる（重みは2倍）。値の数が ``k`` 以下の間は
+    全ての値を保持するため、``np.quantile`` と同じ結果になる。
+    """
+
+    def __init__(self, k: int = 2048, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.n += other.n
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        qs = list(qs)
+        if self.n == 0:
+            return [None] * len(qs)
+        if len(self.levels) == 1:
+            return [float(v) for v in np.quantile(self.levels[0], qs)]
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(level), 2**i) for i, level in enumerate(self.levels)]
+        )
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1])
+        positions = np.clip(positions, 0, len(items) - 1)
+        return [float(v) for v in items[positions]]
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # 奇数個の場合は最大値を現レベルに残し、残りを半分に間引く
+                keep = items[len(items) - len(items) % 2 :]
+                offset = int(self._rng.integers(2))
+                promoted = items[offset : len(items) - len(items) % 2 : 2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted]
+                )
+            level += 1
+
+
+class ColumnAccumulator:
+    """1カラム分の部分集計（件数・欠損・Welford法の平均/分散・最小/最大など）
+
+    異なり数と非数値の値の頻度は、異なり値が ``exact_limit`` 個以下の間は
+    正確に数え、超えたらHyperLogLog（異なり数）とMisra-Gries（頻出値）に
+    切り替える（``exact`` がFalseになる）。``distinct_precision`` を指定すると、
+    異なり数は最初からHyperLogLogによる近似で数える。
+    """
+
+    def __init__(
+        self,
+        distinct_precision: Optional[int] = None,
+        exact_limit: int = EXACT_DISTINCT_LIMIT,
+    ) -> None:
+        self.exact_limit = exact_limit
+        self.precision = (
+            distinct_precision if distinct_precision is not None else FALLBACK_PRECISION
+        )
+        self.dtype: Optional[np.dtype] = None
+        self.count = 0
+        self.nulls = 0
+        # 数値チャンクの集計
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.zeros = 0
+        self.negatives = 0
+        self.sketch = QuantileSketch()
+        # 非数値チャンクの頻度（上限を超えたらMisra-Griesの頻度の下限に切り替える）
+        self.value_counts: Counter = Counter()
+        self.heavy: Optional[MisraGries] = None
+        # 異なり数用のハッシュ（ソート済みuint64配列 + 未マージ分）またはHLL
+        self.hll = (
+            HyperLogLog(distinct_precision) if distinct_precision is not None else None
+        )
+        self._hashes = np.empty(0, dtype="uint64")
+        self._pending: List[np.ndarray] = []
+        self._pending_size = 0
+
+    def update(self, series: pd.Series) -> None:
+        self.dtype = (
+            series.dtype
+            if self.dtype is None
+            else combine_dtypes(self.dtype, series.dtype)
+        )
+        non_null = series.dropna()
+        self.count += len(non_null)
+        self.nulls += len(series) - len(non_null)
+        if not len(non_null):
+            return
+
+        hashes = hash_values(non_null)
+        self._add_hashes(hashes if self.hll is not None else np.unique(hashes))
+        if _has_numeric_stats(non_null.dtype):
+            self._update_numeric(non_null.to_numpy(dtype="float64"))
+        # boolは describe では非数値として扱うため頻度も数える
+        if not _is_number(non_null.dtype):
+            self._add_counts(non_null.value_counts(sort=False))
+
+    def merge(self, other: "ColumnAccumulator") -> None:
+        if other.dtype is not None:
+            self.dtype = (
+                other.dtype
+                if self.dtype is None
+                else combine_dtypes(self.dtype, other.dtype)
+            )
+        self.count += other.count
+        self.nulls += other.nulls
+        self._merge_moments(other.numeric_count, other.mean, other.m2)
+        self.zeros += other.zeros
+        self.negatives += other.negatives
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self._update_range(value, value)
+        self.sketch.merge(other.sketch)
+        if other.heavy is not None:
+            self._to_heavy()
+            self.heavy.update(other.heavy.counts)
+            self.heavy.decrement += other.heavy.decrement
+        elif other.value_counts:
+            self._add_counts(pd.Series(other.value_counts, dtype="int64"))
+        if other.hll is not None:
+            self._to_hll()
+            self.hll.merge(other.hll)
+        else:
+            self._add_hashes(other.distinct_hashes())
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.dtype is not None and _is_number(self.dtype)
+
+    @property
+    def has_numeric_stats(self) -> bool:
+        """mean/std/min/max などを返すか（数値とbool列）"""
+        return self.dtype is not None and _has_numeric_stats(self.dtype)
+
+    @property
+    def exact(self) -> bool:
+        """異なり数・頻度を正確に数えているか（スケッチで近似していないか）"""
+        return self.hll is None and self.heavy is None
+
+    @property
+    def unique(self) -> int:
+        if self.hll is not None:
+            return self.hll.estimate()
+        return len(self.distinct_hashes())
+
+    @property
+    def std(self) -> Optional[float]:
+        if self.numeric_count < 2:
+            return None
+        return float(np.sqrt(self.m2 / (self.numeric_count - 1)))
+
+    def distinct_hashes(self) -> np.ndarray:
+        if self._pending:
+            self._hashes = np.unique(np.concatenate([self._hashes, *self._pending]))
+            self._pending, self._pending_size = [], 0
+        return self._hashes
+
+    def describe(self) -> Dict[str, Any]:
+        """``DataFrame.describe(include="all")`` の1列分に相当する値"""
+        if self.is_numeric:
+            quartiles = self.sketch.quantiles(DESCRIBE_PERCENTILES)
+            return {
+                "count": float(self.count),
+                "mean": float(self.mean) if self.numeric_count else None,
+                "std": self.std,
+                "min": self.minimum,
+                "25%": quartiles[0],
+                "50%": quartiles[1],
+                "75%": quartiles[2],
+                "max": self.maximum,
+            }
+
+        top, freq = (None, None)
+        if self.heavy is not None:
+            if not self.heavy.counts.empty:
+                top = self.heavy.counts.idxmax()
+                freq = int(self.heavy.counts[top])
+        elif self.value_counts:
+            top, freq = self.value_counts.most_common(1)[0]
+        return {"count": self.count, "unique": self.unique, "top": top, "freq": freq}
+
+    def counts(self) -> pd.Series:
+        """非数値の値の頻度（件数の多い順、同数は先に現れた順）
+
+        ``exact`` でない場合はMisra-Griesが追跡している値の頻度の下限。
+        """
+        counts = (
+            self.heavy.counts
+            if self.heavy is not None
+            else pd.Series(self.value_counts, dtype="int64")
+        )
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def _update_numeric(self, values: np.ndarray) -> None:
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        self._merge_moments(len(values), chunk_mean, chunk_m2)
+        self._update_range(float(values.min()), float(values.max()))
+        self.zeros += int(np.count_nonzero(values == 0))
+        self.negatives += int(np.count_nonzero(values < 0))
+        self.sketch.update(values)
+
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        """Chan らの並列版Welford法で平均と偏差平方和を合成する"""
+        if not count:
+            return
+        total = self.numeric_count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.numeric_count * count / total
+        self.numeric_count = total
+
+    def _update_range(self, minimum: float, maximum: float) -> None:
+        self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+
+    def _add_hashes(self, hashes: np.ndarray) -> None:
+        if self.hll is not None:
+            self.hll.add_hashes(hashes)
+            return
+        self._pending.append(hashes)
+        self._pending_size += len(hashes)
+        # 未マージ分が確定済みより大きくなったらまとめて重複除去する
+        if self._pending_size > max(len(self._hashes), 1 << 16):
+            self.distinct_hashes()
+            if len(self._hashes) > self.exact_limit:
+                self._to_hll()
+
+    def _to_hll(self) -> None:
+        """保持しているハッシュをHyperLogLogに移し、以降は異なり数を近似する"""
+        if self.hll is None:
+            self.hll = HyperLogLog(self.precision)
+            self.hll.add_hashes(self.distinct_hashes())
+            self._hashes = np.empty(0, dtype="uint64")
+
+    def _add_counts(self, counts: pd.Series) -> None:
+        if self.heavy is not None:
+            self.heavy.update(counts)
+            return
+        self.value_counts.update(counts.to_dict())
+        if len(self.value_counts) > self.exact_limit:
+            self._to_heavy()
+
+    def _to_heavy(self) -> None:
+        """保持している頻度をMisra-Griesに移し、以降は頻出値だけを追跡する"""
+        if self.heavy is None:
+            self.heavy = MisraGries(self.exact_limit)
+            if self.value_counts:
+                self.heavy.update(pd.Series(self.value_counts, dtype="int64"))
+            self.value_counts = Counter()
+
+
+class StreamingProfile:
+    """チャンクを順に受け取り、カラムごとの部分集計を合成するプロファイラ
+
+    保持するのはカラムごとの集計値だけなので、メモリ使用量はチャンクの
+    大きさと ``EXACT_DISTINCT_LIMIT`` で抑えられる（異なり値がこれを超えた
+    カラムの unique/top/freq は近似値）。チャンク間で型が
+    混在した列（数値と文字列）の ``top``/``freq`` は文字列チャンクの値から求める。
+    """
+
+    def __init__(self, distinct_precision: Optional[int] = None) -> None:
+        self.n_rows = 0
+        self.columns: Dict[str, ColumnAccumulator] = {}
+        self.distinct_precision = distinct_precision
+
+    @classmethod
+    def from_chunks(
+        cls, chunks: Iterable[pd.DataFrame], distinct_precision: Optional[int] = None
+    ) -> "StreamingProfile":
+        profile = cls(distinct_precision)
+        for chunk in chunks:
+            profile.update(chunk)
+        return profile
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.n_rows += len(chunk)
+        for column in chunk.columns:
+            self._accumulator(column).update(chunk[column])
+
+    def merge(self, other: "StreamingProfile") -> None:
+        self.n_rows += other.n_rows
+        for column, accumulator in other.columns.items():
+            self._accumulator(column).merge(accumulator)
+
+    def _accumulator(self, column: str) -> ColumnAccumulator:
+        if column not in self.columns:
+            self.columns[column] = ColumnAccumulator(self.distinct_precision)
+        return self.columns[column]
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """``describe(include="all")`` と同じキー構成の統計量"""
+        stats = {column: acc.describe() for column, acc in self.columns.items()}
+        keys: List[str] = []
+        if any(not acc.is_numeric for acc in self.columns.values()):
+            keys += ["count", "unique", "top", "freq"]
+        if any(acc.is_numeric for acc in self.columns.values()):
+            keys += [k for k in ("count", "mean", "std", "min") if k not in keys]
+            keys += [f"{int(q * 100)}%" for q in DESCRIBE_PERCENTILES] + ["max"]
+        return {
+            column: {key: values.get(key) for key in keys}
+            for column, values in stats.items()
+        }
@@ -1,17 +1,29 @@
 """MCP server for data quality analysis functionality."""
 
 # Import core functionality from src
+import argparse
+from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from mcp.server.fastmcp import FastMCP
 from modules import (
+    BatchOutlierDetectionOutput,
     CategoricalAnalysisOutput,
     DataQualityAnalyzer,
     DataQualityOutput,
+    DuplicateDetectionOutput,
     OutlierDetectionOutput,
     ProcessedDataOutput,
 )
+from modules.dataclass import (
+    DatasetCacheStats,
+    RefreshProfileOutput,
+    ResultCacheStats,
+    ToolExecutorStats,
+)
+from modules.execution import ToolExecutor
+from modules.pagination import page_categories, page_outliers
 
 # Initialize data root and MCP server
 DATA_ROOT = (Path(__file__).resolve().parents[1] / "data").resolve()
@@ -27,21 +39,42 @@ mcp = FastMCP(
 # Initialize analyzer instance
 analyzer = DataQualityAnalyzer(DATA_ROOT)
 
+# Blocking analyzer work runs in a worker pool, off the event loop; CPU-bound
+# tools can use a pre-warmed process pool (MCP_PROCESS_WORKERS)
+executor = ToolExecutor(analyzer=analyzer)
+
 
 # MCP Tool Wrappers
 
 
 @mcp.tool()
-def detect_outliers(
-    path: str, column: str, method: str = "iqr"
+async def detect_outliers(
+    path: str,
+    column: str,
+    method: str = "iqr",
+    n_estimators: int = 100,
+    max_samples: Union[int, float, str] = "auto",
+    n_jobs: Optional[int] = None,
+    limit: Optional[int] = 20,
+    cursor: Optional[str] = None,
 ) -> OutlierDetectionOutput:
     """
     Detect outliers in a numeric column using specified method.
 
+    Fitted IsolationForest models are cached per dataset version, column and
+    parameters, so repeated calls only score the rows. Outliers are ranked by
+    score; the ranking is cached as compact arrays, so following
+    ``next_cursor`` returns the next page without recomputing.
+
     Args:
         path: Path to CSV file
         column: Column name to analyze
         method: Detection method ("iqr", "zscore", "isolation_forest")
+        n_estimators: Number of trees for "isolation_forest"
+        max_samples: Rows drawn to fit each tree for "isolation_forest"
+        n_jobs: Parallel jobs for fitting and scoring "isolation_forest"
+        limit: Maximum number of outliers to return (None for all)
+        cursor: next_cursor of the previous page (same arguments)
 
     Returns:
         OutlierDetectionOutput with detected outliers and statistics
@@ -49,17 +82,75 @@ def detect_outliers(
     Example:
         >>> detect_outliers("sample.csv", "age", "iqr")
     """
-    return analyzer.detect_outliers(path, column, method)
+    ranked, key, offset = await executor.run_page(
+        "detect_outliers",
+        analyzer.rank_outliers,
+        path,
+        column,
+        method,
+        n_estimators,
+        max_samples,
+        n_jobs,
+        cursor=cursor,
+    )
+    return page_outliers(ranked, key, offset, limit)
 
 
 @mcp.tool()
-def analyze_categorical(path: str, column: str) -> CategoricalAnalysisOutput:
+async def detect_outliers_batch(
+    path: str, columns: Optional[List[str]] = None, method: str = "iqr"
+) -> BatchOutlierDetectionOutput:
+    """
+    Detect outliers in many numeric columns with a single dataset load.
+
+    Args:
+        path: Path to CSV file
+        columns: Column names to analyze (None for all numeric columns)
+        method: Detection method ("iqr", "zscore", "isolation_forest")
+
+    Returns:
+        BatchOutlierDetectionOutput with one OutlierDetectionOutput per column
+
+    Example:
+        >>> detect_outliers_batch("sample.csv", ["age", "income"], "zscore")
+    """
+    return await executor.run(
+        "detect_outliers_batch", analyzer.detect_outliers_batch, path, columns, method
+    )
+
+
+@mcp.tool()
+async def analyze_categorical(
+    path: str,
+    column: str,
+    streaming: Optional[bool] = None,
+    top_k: int = 100,
+    precision: int = 14,
+    limit: Optional[int] = 100,
+    cursor: Optional[str] = None,
+) -> CategoricalAnalysisOutput:
     """
     Perform detailed analysis of a categorical variable.
 
+    Categories are returned most frequent first, ``limit`` per page; follow
+    ``next_cursor`` for the rest. unique_count, mode and entropy always cover
+    all categories.
+
+    With ``streaming`` the column is read chunk by chunk in one pass with
+    fixed memory: Misra-Gries finds the ``top_k`` most frequent categories,
+    a Count-Min sketch estimates their counts (overestimating by at most
+    ``count_error``), HyperLogLog estimates unique_count and entropy is
+    reported with ``entropy_bounds``. By default this is used for large files
+    without profiled counts.
+
     Args:
         path: Path to CSV file
         column: Column name to analyze
+        streaming: Estimate from streaming sketches (None for automatic)
+        top_k: Number of most frequent categories kept when streaming
+        precision: HyperLogLog precision (2**precision registers)
+        limit: Maximum number of categories to return (None for all)
+        cursor: next_cursor of the previous page (same arguments)
 
     Returns:
         CategoricalAnalysisOutput with detailed categorical statistics
@@ -67,16 +158,30 @@ def analyze_categorical(path: str, column: str) -> CategoricalAnalysisOutput:
     Example:
         >>> analyze_categorical("sample.csv", "category")
     """
-    return analyzer.analyze_categorical(path, column)
+    output, key, offset = await executor.run_page(
+        "analyze_categorical",
+        analyzer.analyze_categorical,
+        path,
+        column,
+        streaming,
+        top_k,
+        precision,
+        cursor=cursor,
+    )
+    return page_categories(output, key, offset, limit)
 
 
 @mcp.tool()
-def data_quality_report(path: str) -> DataQualityOutput:
+async def data_quality_report(
+    path: str, approximate: bool = False, precision: int = 14
+) -> DataQualityOutput:
     """
     Generate comprehensive data quality report for the entire dataset.
 
     Args:
         path: Path to CSV file
+        approximate: Estimate unique counts with a persisted HyperLogLog sketch
+        precision: HyperLogLog precision (2**precision registers)
 
     Returns:
         DataQualityOutput with comprehensive quality metrics and recommendations
@@ -84,12 +189,56 @@ def data_quality_report(path: str) -> DataQualityOutput:
     Example:
         >>> data_quality_report("sample.csv")
     """
-    return analyzer.generate_quality_report(path)
+    return await executor.run(
+        "data_quality_report",
+        analyzer.generate_quality_report,
+        path,
+        approximate,
+        precision,
+    )
 
 
 @mcp.tool()
-def handle_missing_data(
-    path: str, strategy: str = "mean", columns: Optional[List[str]] = None
+async def detect_duplicates(
+    path: str,
+    columns: Optional[List[str]] = None,
+    approximate: bool = False,
+    max_groups: int = 5,
+    precision: int = 14,
+) -> DuplicateDetectionOutput:
+    """
+    Detect duplicate rows by hashing rows chunk by chunk with bounded memory.
+
+    Args:
+        path: Path to CSV file
+        columns: Columns that define a duplicate (None for all columns)
+        approximate: Estimate the duplicate count with a HyperLogLog sketch only
+        max_groups: Maximum number of sample duplicate groups to return
+        precision: HyperLogLog precision (2**precision registers)
+
+    Returns:
+        DuplicateDetectionOutput with duplicate counts and sample duplicate groups
+
+    Example:
+        >>> detect_duplicates("sample.csv", ["name", "email"])
+    """
+    return await executor.run(
+        "detect_duplicates",
+        analyzer.detect_duplicates,
+        path,
+        columns,
+        approximate,
+        max_groups,
+        precision,
+    )
+
+
+@mcp.tool()
+async def handle_missing_data(
+    path: str,
+    strategy: str = "mean",
+    columns: Optional[List[str]] = None,
+    format: str = "records",
 ) -> ProcessedDataOutput:
     """
     Handle missing values in the dataset using specified strategy.
@@ -98,6 +247,8 @@ def handle_missing_data(
         path: Path to CSV file
         strategy: Handling strategy ("mean", "median", "mode", "drop", "fill_zero")
         columns: Specific columns to process (None for all columns)
+        format: Preview format ("records" for one dict per row, "columnar" for
+            column name -> values in processed_data_columns)
 
     Returns:
         ProcessedDataOutput with information about changes made
@@ -105,24 +256,47 @@ def handle_missing_data(
     Example:
         >>> handle_missing_data("sample.csv", "mean", ["age", "income"])
     """
-    return analyzer.handle_missing_data(path, strategy, columns)
+    return await executor.run(
+        "handle_missing_data",
+        analyzer.handle_missing_data,
+        path,
+        strategy,
+        columns,
+        format,
+    )
 
 
 @mcp.tool()
-def list_data_quality_datasets() -> Dict[str, Any]:
-    """List CSV files available for data quality analysis."""
+async def list_data_quality_datasets(
+    pattern: Optional[str] = None, offset: int = 0, limit: Optional[int] = 1000
+) -> Dict[str, Any]:
+    """
+    List CSV files available for data quality analysis.
 
-    datasets: List[str] = []
-    if DATA_ROOT.exists():
-        for csv_file in sorted(DATA_ROOT.rglob("*.csv")):
-            try:
-                datasets.append(str(csv_file.relative_to(DATA_ROOT)))
-            except ValueError:
-                datasets.append(str(csv_file))
+    Args:
+        pattern: Glob pattern matched against paths relative to the data root
+        offset: Number of datasets to skip
+        limit: Maximum number of datasets to return (None for all)
 
+    Returns:
+        Dictionary with the dataset page, catalog metadata and available methods
+
+    Example:
+        >>> list_data_quality_datasets("titanic*")
+    """
+    listing = await executor.run(
+        "list_data_quality_datasets",
+        analyzer.catalog.list_datasets,
+        pattern,
+        offset,
+        limit,
+    )
     return {
-        "data_root": str(DATA_ROOT),
-        "datasets": datasets,
+        "data_root": listing.data_root,
+        "datasets": listing.datasets,
+        "entries": [asdict(entry) for entry in listing.entries],
+        "total": listing.total,
+        "next_offset": listing.next_offset,
         "server_info": "Data Quality Analysis Server",
         "available_methods": {
             "outlier_detection": ["iqr", "zscore", "isolation_forest"],
@@ -131,6 +305,63 @@ def list_data_quality_datasets() -> Dict[str, Any]:
     }
 
 
+@mcp.tool()
+async def refresh_profile(
+    path: str, streaming: Optional[bool] = None
+) -> RefreshProfileOutput:
+    """
+    Rebuild and persist the column profile used by the quality report.
+
+    Args:
+        path: Path to CSV file
+        streaming: Build the profile chunk by chunk (None decides by file size)
+
+    Returns:
+        RefreshProfileOutput with the profile size and build time
+
+    Example:
+        >>> refresh_profile("sample.csv")
+    """
+    output = await executor.run(
+        "refresh_profile", analyzer.refresh_profile, path, streaming
+    )
+    # Cached outputs may have been built from the previous profile
+    executor.invalidate(path)
+    return output
+
+
+@mcp.tool()
+def dataset_cache_stats() -> DatasetCacheStats:
+    """Return hit/miss/eviction counters of the in-process dataset cache."""
+    return analyzer.loader.cache.stats()
+
+
+@mcp.tool()
+def result_cache_stats() -> ResultCacheStats:
+    """Return hit/miss/eviction counters of the tool result cache."""
+    return executor.results.stats()
+
+
+@mcp.tool()
+def execution_stats() -> ToolExecutorStats:
+    """Return per-tool queue depth, concurrency limits and wait/run times."""
+    return executor.stats()
+
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
-    # Alternative: mcp.run(transport="streamable-http")
+    parser = argparse.ArgumentParser(
+        description="MCP server for data quality functionality"
+    )
+    parser.add_argument(
+        "--transport", choices=["stdio", "streamable-http"], default="stdio"
+    )
+    parser.add_argument("--host", default=None, help="HTTP bind address")
+    parser.add_argument("--port", type=int, default=None, help="HTTP port")
+    args = parser.parse_args()
+    if args.host is not None:
+        mcp.settings.host = args.host
+    if args.port is not None:
+        mcp.settings.port = args.port
+
+    executor.warm_up()
+    mcp.run(transport=args.transport)
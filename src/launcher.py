@@ -0,0 +1,284 @@
+"""
+MCPサーバーの起動方法（ランチャー）
+
+  - poetry : `poetry run python server/xxx.py`（poetry の環境解決に毎回数百ms）
+  - python : server/ の仮想環境の Python を最初に1回だけ解決し、直接起動する
+  - pool   : 起動済みの予備サーバー（streamable-http）を常に用意しておき、
+             セッションの開始・再起動時はそれに接続する（起動待ちがほぼない）
+
+環境変数 MCP_LAUNCH_MODE で切り替える（既定 python）。
+
+  python src/launcher.py
+
+で各モードの起動時間（プロセス起動〜ツール一覧の取得まで）を計測して表示する。
+"""
+
+import atexit
+import collections
+import functools
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Deque, Dict, List, Optional
+
+from mcp_session import MCPSessionManager
+
+LAUNCH_MODES = ("poetry", "python", "pool")
+
+# pool モードでサーバーごとに用意しておく予備プロセスの数
+#   export MCP_SERVER_POOL_SIZE=1
+SERVER_POOL_SIZE = int(os.environ.get("MCP_SERVER_POOL_SIZE", 1))
+
+# 予備プロセスがHTTPで接続を受け付けるまでの待ち時間（秒）
+SERVER_READY_TIMEOUT = 120.0
+
+
+def launch_mode() -> str:
+    """環境変数 MCP_LAUNCH_MODE で指定された起動方法"""
+    mode = os.environ.get("MCP_LAUNCH_MODE", "python")
+    if mode not in LAUNCH_MODES:
+        raise ValueError(f"MCP_LAUNCH_MODE must be one of {LAUNCH_MODES}: {mode}")
+    return mode
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_server_python(server_dir: str) -> Optional[str]:
+    """server/ の仮想環境の Python 実行ファイル（プロセス内で1回だけ解決する）
+
+    環境変数 MCP_SERVER_PYTHON があればそれを使い、なければ
+    `poetry env info --executable` で調べる。解決できない場合は None。
+    """
+    override = os.environ.get("MCP_SERVER_PYTHON")
+    if override:
+        return override
+    try:
+        result = subprocess.run(
+            ["poetry", "env", "info", "--executable"],
+            cwd=server_dir,
+            capture_output=True,
+            text=True,
+            timeout=60,
+            check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def stdio_connections(
+    entries: Dict[str, str], server_dir: str, mode: str
+) -> Dict[str, Dict]:
+    """STDIO で起動するサーバーの接続設定（poetry / python モード）
+
+    python モードで仮想環境の Python を解決できない場合は poetry 経由で起動する。
+    """
+    python = resolve_server_python(server_dir) if mode == "python" else None
+    connections = {}
+    for name, entry in entries.items():
+        if python is not None:
+            command, args = python, [entry, "--transport", "stdio"]
+        else:
+            command, args = "poetry", ["run", "python", entry, "--transport", "stdio"]
+        connections[name] = {
+            "command": command,
+            "args": args,
+            "transport": "stdio",
+            "cwd": server_dir,  # ← server側のpoetryプロジェクトディレクトリ
+            "env": {"PYTHONUNBUFFERED": "1"},
+        }
+    return connections
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class WarmServer:
+    """起動済み（HTTPで接続を受け付ける状態）のサーバープロセス1つ"""
+
+    def __init__(self, name: str, process: subprocess.Popen, port: int):
+        self.name = name
+        self.process = process
+        self.port = port
+        self.launched_at = time.perf_counter()
+        self.ready_seconds: Optional[float] = None  # 起動から接続可能になるまで
+
+    @property
+    def connection(self) -> Dict:
+        return {
+            "transport": "streamable_http",
+            "url": f"http://127.0.0.1:{self.port}/mcp",
+        }
+
+    def wait_ready(self, timeout: float = SERVER_READY_TIMEOUT) -> None:
+        """ポートが接続を受け付けるまで待つ"""
+        deadline = self.launched_at + timeout
+        while self.ready_seconds is None:
+            if self.process.poll() is not None:
+                raise RuntimeError(
+                    f"MCP server '{self.name}' exited with {self.process.returncode}"
+                )
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                    self.ready_seconds = time.perf_counter() - self.launched_at
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(f"MCP server '{self.name}' did not start")
+                time.sleep(0.05)
+
+    def stop(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class ServerPool:
+    """サーバーごとに予備のプロセスを起動しておくプール（pool モード）
+
+    プロセスを取り出すと、次の起動・再起動に備えて代わりのプロセスを
+    すぐに起動する。Python・pandas・scikit-learn の読み込みは予備プロセスが
+    待機中に済ませているため、セッションの開始はHTTP接続だけで済む。
+    """
+
+    def __init__(
+        self,
+        python: str,
+        entries: Dict[str, str],
+        server_dir: str,
+        size: int = SERVER_POOL_SIZE,
+    ):
+        self.python = python
+        self.entries = entries
+        self.server_dir = server_dir
+        self.size = max(size, 1)
+        self.ready_seconds: Dict[str, List[float]] = {name: [] for name in entries}
+        self._spares: Dict[str, Deque[WarmServer]] = {
+            name: collections.deque() for name in entries
+        }
+        self._in_use: List[WarmServer] = []
+        self._lock = threading.Lock()
+        for name in entries:
+            self._fill(name)
+        atexit.register(self.close)
+
+    def acquire(self, name: str) -> WarmServer:
+        """予備プロセスを1つ取り出し、接続可能になるまで待って返す"""
+        with self._lock:
+            spares = self._spares[name]
+            server = spares.popleft() if spares else self._launch(name)
+            self._in_use.append(server)
+            self._fill(name)
+        server.wait_ready()
+        self.ready_seconds[name].append(server.ready_seconds)
+        return server
+
+    def wait_ready(self) -> None:
+        """すべての予備プロセスが接続可能になるまで待つ"""
+        with self._lock:
+            spares = [s for q in self._spares.values() for s in q]
+        for server in spares:
+            server.wait_ready()
+
+    def release(self, server: WarmServer) -> None:
+        """使い終わった（セッションを閉じた）プロセスを停止する"""
+        with self._lock:
+            if server in self._in_use:
+                self._in_use.remove(server)
+        server.stop()
+
+    def close(self) -> None:
+        """予備・使用中のすべてのプロセスを停止する"""
+        with self._lock:
+            servers = self._in_use + [s for q in self._spares.values() for s in q]
+            self._in_use = []
+            for spares in self._spares.values():
+                spares.clear()
+        for server in servers:
+            server.stop()
+
+    def _fill(self, name: str) -> None:
+        spares = self._spares[name]
+        while len(spares) < self.size:
+            spares.append(self._launch(name))
+
+    def _launch(self, name: str) -> WarmServer:
+        port = _free_port()
+        process = subprocess.Popen(
+            [
+                self.python,
+                self.entries[name],
+                "--transport",
+                "streamable-http",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+            ],
+            cwd=self.server_dir,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+        )
+        return WarmServer(name, process, port)
+
+
+def create_session_manager(
+    entries: Dict[str, str], server_dir: str, mode: Optional[str] = None
+) -> MCPSessionManager:
+    """起動方法に応じた MCPSessionManager を作成する
+
+    pool モードで仮想環境の Python を解決できない場合は、
+    現在の Python（sys.executable）で予備プロセスを起動する。
+    """
+    mode = mode or launch_mode()
+    if mode == "pool":
+        python = resolve_server_python(server_dir) or sys.executable
+        connections = {name: {} for name in entries}  # 接続先はプールが割り当てる
+        return MCPSessionManager(
+            connections, pool=ServerPool(python, entries, server_dir)
+        )
+    return MCPSessionManager(stdio_connections(entries, server_dir, mode))
+
+
+# ===============================
+# ■ 起動時間の計測（python src/launcher.py）
+# ===============================
+def _report(entries: Dict[str, str], server_dir: str) -> None:
+    t = time.perf_counter()
+    python = resolve_server_python(server_dir)
+    print(f"venv interpreter: {python} ({time.perf_counter() - t:.2f}s, once)")
+    print(f"{'mode':<8}{'server':<12}{'startup [s]':>12}")
+    for mode in LAUNCH_MODES:
+        manager = create_session_manager(entries, server_dir, mode)
+        try:
+            if manager.pool is not None:
+                # 予備プロセスが待機状態になってから計測する
+                manager.pool.wait_ready()
+            manager.get_tools()
+            for name, seconds in manager.startup_seconds().items():
+                print(f"{mode:<8}{name:<12}{seconds:>12.2f}")
+        except Exception as exc:  # poetry がない環境など
+            print(f"{mode:<8}{'-':<12}{'failed':>12}  ({exc})")
+        finally:
+            manager.close()
+
+
+if __name__ == "__main__":
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    server_root = project_root / "server"
+    _report(
+        {
+            "eda": (server_root / "eda.py").as_posix(),
+            "preprocess": (server_root / "preprocess.py").as_posix(),
+        },
+        server_root.as_posix(),
+    )
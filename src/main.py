@@ -7,7 +7,7 @@ Streamlit + OpenAI + MCP(ローカルSTDIO) の連携サンプル
 
 ※ 前提
   - OpenAI の APIキーを環境変数 OPENAI_API_KEY に設定しておく
-  - Poetry 経由で server/ 配下の MCP サーバーを起動できるよう依存関係をインストールしておく
+  - server/ 配下で poetry install を済ませておく（サーバーは仮想環境の Python で直接起動する）
   - data/ ディレクトリはローカルで共有し、CSV などの入出力に利用する
 """
 
@@ -17,10 +17,9 @@ import pathlib
 
 import streamlit as st
 from langchain_core.messages import HumanMessage  # ユーザー・AIのメッセージ管理
-from langchain_mcp_adapters.client import (
-    MultiServerMCPClient,  # MCPサーバー接続クライアント
-)
 from langchain_openai import ChatOpenAI  # OpenAI APIを使うLangChainラッパ
+from launcher import create_session_manager, launch_mode  # サーバーの起動方法
+from mcp_session import MCPSessionManager  # MCPサーバーとのセッションを使い回す
 
 # ===============================
 # ■ 設定セクション
@@ -41,6 +40,54 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 SERVER_ENTRY_EDA = (PROJECT_ROOT / "server" / "eda.py").as_posix()
 SERVER_ENTRY_PREPROCESS = (PROJECT_ROOT / "server" / "preprocess.py").as_posix()
 
+# 1回の応答に含まれる複数のツール呼び出しを同時に実行する数の上限
+#   export MCP_TOOL_CALL_CONCURRENCY=4
+TOOL_CALL_CONCURRENCY = int(os.environ.get("MCP_TOOL_CALL_CONCURRENCY", 4))
+
+# --- MCPサーバーの設定 ---
+# 複数サーバーを登録したい場合は辞書に追加すればOK。
+SERVER_ENTRIES = {
+    "eda": SERVER_ENTRY_EDA,
+    "preprocess": SERVER_ENTRY_PREPROCESS,
+}
+# server側のpoetryプロジェクトディレクトリ
+SERVER_DIR = (PROJECT_ROOT / "server").as_posix()
+
+# サーバーの起動方法（poetry / python / pool）
+#   export MCP_LAUNCH_MODE=pool
+LAUNCH_MODE = launch_mode()
+
+
+# ===============================
+# ■ MCPセッション（プロセスで1つ）
+# ===============================
+@st.cache_resource
+def get_session_manager() -> MCPSessionManager:
+    """MCPサーバーとのセッションを保持するマネージャーを返す
+
+    Streamlit はメッセージごとにスクリプトを再実行するが、
+    st.cache_resource によりサーバーの起動とツール一覧の取得は
+    プロセスで最初の1回だけになる。
+    """
+    return create_session_manager(SERVER_ENTRIES, SERVER_DIR, LAUNCH_MODE)
+
+
+async def invoke_tool_calls(sessions: MCPSessionManager, tool_calls: list) -> list:
+    """1回の応答に含まれる tool_calls を並行して実行する
+
+    同時に実行する数は TOOL_CALL_CONCURRENCY までに制限し、
+    結果（ToolMessage）は tool_calls と同じ順序で返す。
+    """
+    semaphore = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+
+    async def invoke(call):
+        async with semaphore:
+            # ツール実行（結果は LangChain の ToolMessage として返る）
+            # セッションを保持しているバックグラウンドのループで実行する
+            return await sessions.ainvoke(call)
+
+    return await asyncio.gather(*(invoke(call) for call in tool_calls))
+
 
 # ===============================
 # ■ Streamlit アプリ本体
@@ -84,39 +131,25 @@ async def main():
             api_key=os.environ.get("OPENAI_API_KEY"),
         )
 
-        # --- MCPクライアントを準備 ---
-        # 複数サーバーを登録したい場合は辞書に追加すればOK。
-        client = MultiServerMCPClient(
-            {
-                "eda": {
-                    "command": "poetry",
-                    "args": ["run", "python", SERVER_ENTRY_EDA, "--transport", "stdio"],
-                    "transport": "stdio",
-                    "cwd": (
-                        PROJECT_ROOT / "server"
-                    ).as_posix(),  # ← server側のpoetryプロジェクトディレクトリ
-                    "env": {"PYTHONUNBUFFERED": "1"},
-                },
-                "preprocess": {
-                    "command": "poetry",
-                    "args": [
-                        "run",
-                        "python",
-                        SERVER_ENTRY_PREPROCESS,
-                        "--transport",
-                        "stdio",
-                    ],
-                    "transport": "stdio",
-                    "cwd": (
-                        PROJECT_ROOT / "server"
-                    ).as_posix(),  # ← server側のpoetryプロジェクトディレクトリ
-                    "env": {"PYTHONUNBUFFERED": "1"},
-                },
-            }
+        # --- MCPサーバーのセッションを取得 ---
+        # 起動済みのセッションを使い回し、落ちているサーバーだけ起動し直す
+        sessions = get_session_manager()
+        await asyncio.to_thread(sessions.ensure_healthy)
+
+        # MCPサーバーから利用可能なツール一覧を取得（キャッシュ済み）
+        tools = await asyncio.to_thread(sessions.get_tools)
+        # ツール名は大小文字区別なくマッチさせる（対応表はここで1回だけ作る）
+        tool_names = {t.name.lower(): t.name for t in tools}
+        # サーバーの起動時間を表示（起動方法の比較用）
+        st.sidebar.caption(
+            f"MCPサーバー起動時間（{LAUNCH_MODE}）: "
+            + ", ".join(
+                f"{name} {seconds:.2f}s"
+                for name, seconds in sessions.startup_seconds().items()
+            )
         )
-
-        # MCPサーバーから利用可能なツール一覧を取得
-        tools = await client.get_tools()
+        # ツール情報を渡したモデルもループの外で1回だけ作る
+        model_with_tools = chat_model.bind_tools(tools)
 
         # ===============================
         # ■ チャット＋ツール呼び出しループ
@@ -124,7 +157,7 @@ async def main():
         while True:
             # OpenAIにメッセージとツール情報を渡して推論を実行
             # → AIが「ツールを使うべき」と判断すれば tool_calls に情報が入る
-            ai_response = await chat_model.bind_tools(tools).ainvoke(messages)
+            ai_response = await model_with_tools.ainvoke(messages)
             messages.append(ai_response)
 
             # --- AIの応答を表示 ---
@@ -138,17 +171,16 @@ async def main():
 
             # --- ツールが呼ばれた場合は実行 ---
             if getattr(ai_response, "tool_calls", None):
-                for call in ai_response.tool_calls:
-                    # ツール名は大小文字区別なくマッチさせる
-                    selected = {t.name.lower(): t for t in tools}[call["name"].lower()]
-                    # ツール実行（結果は LangChain の ToolMessage として返る）
-                    tool_msg = await selected.ainvoke(call)
+                # 互いに独立したツール呼び出しは並行して実行する
+                tool_msgs = await invoke_tool_calls(sessions, ai_response.tool_calls)
+                for call, tool_msg in zip(ai_response.tool_calls, tool_msgs):
+                    # ToolMessage は呼び出しの順序どおりに履歴へ追加する
                     messages.append(tool_msg)
 
                     # 実行結果を簡易表示（長文は先頭500文字）
                     with st.chat_message("ai"):
                         st.write(
-                            f"🛠️ `{selected.name}` 実行結果:\n"
+                            f"🛠️ `{tool_names[call['name'].lower()]}` 実行結果:\n"
                             f"{tool_msg.content[:500]}{'...' if len(str(tool_msg.content)) > 500 else ''}"
                         )
             else:
@@ -0,0 +1,235 @@
+"""
+MCPサーバーとのセッションをプロセス内で使い回すためのヘルパー
+
+Streamlit はユーザー入力のたびにスクリプトを再実行するため、そのたびに
+`MultiServerMCPClient` を作ると STDIO サーバー（poetry + Python + pandas/sklearn
+の起動）が毎回立ち上がってしまう。ここではバックグラウンドのイベントループ上で
+各サーバーのセッションを開いたままにし、ツール一覧もキャッシュしておく。
+
+  - セッションはサーバーごとに1つのタスクが開いて保持する
+    （anyio のキャンセルスコープは開いたタスクで閉じる必要があるため）
+  - ping が失敗した・プロセスが終了したサーバーは自動的に起動し直す
+  - pool を渡すと、接続先は起動済みの予備サーバー（launcher.ServerPool）になる
+"""
+
+import asyncio
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
+
+if TYPE_CHECKING:
+    from launcher import ServerPool
+
+# ヘルスチェック（ping）の待ち時間（秒）
+HEALTH_CHECK_TIMEOUT = 5.0
+
+# サーバー起動（セッション初期化とツール一覧の取得）の待ち時間（秒）
+STARTUP_TIMEOUT = 120.0
+
+
+class _ServerHandle:
+    """起動済みサーバー1つ分のセッションとツール"""
+
+    def __init__(self, session: Any, tools: List[BaseTool], startup_seconds: float):
+        self.session = session
+        self.tools = tools
+        self.startup_seconds = startup_seconds
+        self.stop = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class MCPSessionManager:
+    """複数のMCPサーバーとのセッションを保持し、ツールの一覧と実行を仲介する
+
+    セッションはバックグラウンドスレッドのイベントループに属するため、
+    ツールの実行は必ず :meth:`ainvoke` 経由で行う（Streamlit 側の
+    `asyncio.run` のループから直接 `tool.ainvoke` を呼ばない）。
+    """
+
+    def __init__(
+        self,
+        connections: Dict[str, Dict[str, Any]],
+        pool: Optional["ServerPool"] = None,
+    ):
+        self.connections = connections
+        self.client = MultiServerMCPClient(connections)
+        self.pool = pool
+        self.restarts: Dict[str, int] = {name: 0 for name in connections}
+        self._servers: Dict[str, _ServerHandle] = {}
+        self._lookup: Dict[str, str] = {}  # ツール名（小文字）→ サーバー名
+        self._locks: Dict[str, asyncio.Lock] = {}  # 同じサーバーの二重起動を防ぐ
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="mcp-sessions", daemon=True
+        )
+        self._thread.start()
+
+    # ===============================
+    # ■ 呼び出し側（Streamlit）から使うメソッド
+    # ===============================
+    def get_tools(self) -> List[BaseTool]:
+        """全サーバーのツール一覧（未起動・停止中のサーバーは起動する）"""
+        return self._call(self._get_tools(), timeout=STARTUP_TIMEOUT)
+
+    def ensure_healthy(self) -> Dict[str, bool]:
+        """各サーバーに ping を送り、応答しないサーバーは起動し直す
+
+        戻り値はサーバー名 → 起動し直さずに応答できたか。
+        """
+        return self._call(
+            self._ensure_healthy(), timeout=STARTUP_TIMEOUT + HEALTH_CHECK_TIMEOUT
+        )
+
+    async def ainvoke(self, call: Dict[str, Any]) -> Any:
+        """tool_call を対応するサーバーのセッションで実行して ToolMessage を返す
+
+        実行中にサーバーが落ちていた場合は、起動し直して1回だけ再実行する。
+        """
+        future = asyncio.run_coroutine_threadsafe(self._ainvoke(call), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def startup_seconds(self) -> Dict[str, float]:
+        """サーバーごとの直近の起動にかかった時間（秒）"""
+        return {name: s.startup_seconds for name, s in self._servers.items()}
+
+    def close(self) -> None:
+        """全サーバーを停止してバックグラウンドのループを終了"""
+        self._call(self._stop_all(), timeout=STARTUP_TIMEOUT)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self.pool is not None:
+            self.pool.close()
+
+    # ===============================
+    # ■ バックグラウンドのループ上で動く処理
+    # ===============================
+    def _call(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def _get_tools(self) -> List[BaseTool]:
+        # 未起動のサーバーは並行して起動する
+        servers = await asyncio.gather(
+            *(self._server(name) for name in self.connections)
+        )
+        return [tool for server in servers for tool in server.tools]
+
+    async def _ensure_healthy(self) -> Dict[str, bool]:
+        healthy: Dict[str, bool] = {}
+        for name in self.connections:
+            server = self._servers.get(name)
+            healthy[name] = await self._ping(server)
+            if not healthy[name]:
+                await self._restart(name, server)
+        return healthy
+
+    async def _ainvoke(self, call: Dict[str, Any]) -> Any:
+        name = await self._server_for(call["name"])
+        server = await self._server(name)
+        try:
+            return await self._tool(server, call["name"]).ainvoke(call)
+        except Exception:
+            # ツール自体のエラーはそのまま返し、サーバーが落ちた場合だけ再実行する
+            if await self._ping(server):
+                raise
+        server = await self._restart(name, server)
+        return await self._tool(server, call["name"]).ainvoke(call)
+
+    async def _server_for(self, tool_name: str) -> str:
+        if not self._lookup:
+            await self._get_tools()
+        # ツール名は大小文字区別なくマッチさせる
+        return self._lookup[tool_name.lower()]
+
+    def _tool(self, server: _ServerHandle, tool_name: str) -> BaseTool:
+        for tool in server.tools:
+            if tool.name.lower() == tool_name.lower():
+                return tool
+        raise KeyError(tool_name)
+
+    async def _server(self, name: str) -> _ServerHandle:
+        async with self._lock(name):
+            server = self._servers.get(name)
+            if server is None or server.task.done():
+                server = await self._start(name)
+            return server
+
+    def _lock(self, name: str) -> asyncio.Lock:
+        if name not in self._locks:
+            self._locks[name] = asyncio.Lock()
+        return self._locks[name]
+
+    async def _start(self, name: str) -> _ServerHandle:
+        ready: asyncio.Future = self._loop.create_future()
+        task = self._loop.create_task(self._hold(name, ready))
+        server = await asyncio.wait_for(ready, STARTUP_TIMEOUT)
+        server.task = task
+        self._servers[name] = server
+        for tool in server.tools:
+            self._lookup[tool.name.lower()] = name
+        return server
+
+    async def _hold(self, name: str, ready: asyncio.Future) -> None:
+        """セッションを開き、停止を指示されるまで保持する"""
+        started = time.perf_counter()
+        warm = None
+        try:
+            if self.pool is not None:
+                warm = await asyncio.to_thread(self.pool.acquire, name)
+                self.client.connections[name] = warm.connection
+            async with self.client.session(name) as session:
+                tools = await load_mcp_tools(session)
+                server = _ServerHandle(session, tools, time.perf_counter() - started)
+                ready.set_result(server)
+                await server.stop.wait()
+        except Exception as exc:
+            if not ready.done():
+                ready.set_exception(exc)
+        finally:
+            if warm is not None:
+                await asyncio.to_thread(self.pool.release, warm)
+
+    async def _ping(self, server: Optional[_ServerHandle]) -> bool:
+        if server is None or server.task.done():
+            return False
+        try:
+            await asyncio.wait_for(server.session.send_ping(), HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            return False
+        return True
+
+    async def _restart(
+        self, name: str, failed: Optional[_ServerHandle]
+    ) -> _ServerHandle:
+        """``failed`` が現在のセッションであれば再起動する
+
+        並行して失敗した別の呼び出しが先に再起動していれば、そのセッションを返す。
+        """
+        async with self._lock(name):
+            current = self._servers.get(name)
+            if (
+                current is not None
+                and current is not failed
+                and not current.task.done()
+            ):
+                return current
+            if current is not None:
+                self.restarts[name] += 1
+                await self._stop(name)
+            return await self._start(name)
+
+    async def _stop(self, name: str) -> None:
+        server = self._servers.pop(name, None)
+        if server is None:
+            return
+        server.stop.set()
+        try:
+            await asyncio.wait_for(server.task, HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            server.task.cancel()
+
+    async def _stop_all(self) -> None:
+        for name in list(self._servers):
+            await self._stop(name)